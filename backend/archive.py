@@ -0,0 +1,348 @@
+"""Archiving of closed-period stock movements.
+
+Movements dated up to the end of a closed period move from productions, shipments
+and cut_products into yearly archive collections (e.g. productions_archive_2024).
+Their effect on stock is kept as opening-balance documents in stock_openings: one per
+SKU and movement kind (produced, cut, parent rolls used, shipped) holding the summed
+adet and the SKU's first-seen attributes. load_movements() replays the openings ahead
+of the hot movements, so either stock engine gives the same result as over the full
+history, including the 1 cm Kesilmiş shipment tolerance.
+
+Openings are always rebuilt from the archive collections. Archives are a prefix of the
+history: a restore brings back the latest archived year, in front of the hot movements.
+Both jobs compare stock before and after; archiving rolls back on any difference. They
+rewrite whole collections, so while one runs the API refuses writes to the movement
+collections (503) and the job waits for the writes already under way to finish. A job
+that was killed leaves that lock behind; `unlock` lifts it.
+
+    python archive.py verify
+    python archive.py archive --until 2024-12-31
+    python archive.py restore --year 2024
+    python archive.py unlock
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pymongo.errors import DuplicateKeyError
+
+from core import MOVEMENTS_LOCK, change_seq
+from stock import compute_stock, normal_stock_key, cut_stock_key
+
+MOVEMENT_COLLECTIONS = ["productions", "shipments", "cut_products"]
+ARCHIVE_PATTERN = re.compile(r"^(productions|shipments|cut_products)_archive_(\d{4})$")
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_name(collection: str, year: str) -> str:
+    return f"{collection}_archive_{year}"
+
+
+# Roll-up
+def roll_up(productions: list, shipments: list, cut_products: list) -> list:
+    """Collapse movements into opening documents that replay to the same stock."""
+    openings = {}
+
+    def add(kind: str, key: str, movement: dict, amount_field: str):
+        opening = openings.get((kind, key))
+        if opening is None:
+            openings[(kind, key)] = {"kind": kind, "key": key, "movement": dict(movement)}
+        else:
+            opening["movement"][amount_field] += movement[amount_field]
+
+    for prod in productions:
+        if prod.get('urun_tipi', 'Normal') != 'Normal':
+            continue
+        renk_kategori, renk = prod.get('renk_kategori', 'Renksiz'), prod.get('renk', 'Doğal')
+        add("uretim", normal_stock_key(prod['kalinlik'], prod['en'], renk_kategori, renk), {
+            'urun_tipi': 'Normal', 'kalinlik': prod['kalinlik'], 'en': prod['en'],
+            'metre': prod.get('metre', 0), 'metrekare': prod.get('metrekare', 0), 'adet': prod['adet'],
+            'renk_kategori': renk_kategori, 'renk': renk
+        }, 'adet')
+
+    for cut in cut_products:
+        if 'kesim_kalinlik' in cut and 'kesim_en' in cut and 'kesim_boy' in cut:
+            renk_kategori, renk = cut.get('kesim_renk_kategori', 'Renksiz'), cut.get('kesim_renk', 'Doğal')
+            add("kesim", cut_stock_key(cut['kesim_kalinlik'], cut['kesim_en'], cut['kesim_boy'], renk_kategori, renk), {
+                'kesim_kalinlik': cut['kesim_kalinlik'], 'kesim_en': cut['kesim_en'], 'kesim_boy': cut['kesim_boy'],
+                'kesim_renk_kategori': renk_kategori, 'kesim_renk': renk, 'kesim_adet': cut['kesim_adet']
+            }, 'kesim_adet')
+        if 'ana_kalinlik' in cut and 'ana_en' in cut:
+            renk_kategori, renk = cut.get('ana_renk_kategori', 'Renksiz'), cut.get('ana_renk', 'Doğal')
+            add("ana", normal_stock_key(cut['ana_kalinlik'], cut['ana_en'], renk_kategori, renk), {
+                'ana_kalinlik': cut['ana_kalinlik'], 'ana_en': cut['ana_en'],
+                'ana_renk_kategori': renk_kategori, 'ana_renk': renk,
+                'kullanilan_ana_adet': cut.get('kullanilan_ana_adet', 0)
+            }, 'kullanilan_ana_adet')
+
+    for ship in shipments:
+        urun_tipi = ship.get('urun_tipi', 'Normal')
+        renk_kategori, renk = ship.get('renk_kategori', 'Renksiz'), ship.get('renk', 'Doğal')
+        # Kesilmiş shipments are kept per raw boy so the tolerance match is replayed, not pre-resolved
+        if urun_tipi == 'Kesilmiş':
+            key = cut_stock_key(ship['kalinlik'], ship['en'], ship.get('metre', 0), renk_kategori, renk)
+        else:
+            key = normal_stock_key(ship['kalinlik'], ship['en'], renk_kategori, renk)
+        add("sevkiyat", key, {
+            'urun_tipi': urun_tipi, 'kalinlik': ship['kalinlik'], 'en': ship['en'],
+            'metre': ship.get('metre', 0), 'adet': ship['adet'],
+            'renk_kategori': renk_kategori, 'renk': renk
+        }, 'adet')
+
+    return [{**opening, "order": order} for order, opening in enumerate(openings.values())]
+
+
+def expand_openings(openings: list):
+    """Opening documents back into (productions, shipments, cut_products) movements."""
+    productions, shipments, cut_products = [], [], []
+    target = {"uretim": productions, "sevkiyat": shipments, "kesim": cut_products, "ana": cut_products}
+    for opening in sorted(openings, key=lambda o: o['order']):
+        target[opening['kind']].append(opening['movement'])
+    return productions, shipments, cut_products
+
+
+# Loading
+async def load_openings(db) -> list:
+    state = await db.archive_state.find_one({"_id": "stock_openings"})
+    if not state:
+        return []
+    return await db.stock_openings.find({"version": state['version']}, {"_id": 0}).to_list(None)
+
+
+async def load_movements(db):
+    """Opening balances followed by the hot movements, ready for either stock engine."""
+    productions, shipments, cut_products = expand_openings(await load_openings(db))
+    productions += await db.productions.find({}, {"_id": 0}).to_list(None)
+    shipments += await db.shipments.find({}, {"_id": 0}).to_list(None)
+    cut_products += await db.cut_products.find({}, {"_id": 0}).to_list(None)
+    return productions, shipments, cut_products
+
+
+async def current_stock(db) -> dict:
+    return compute_stock(*await load_movements(db))
+
+
+async def archive_years(db) -> dict:
+    years = {}
+    for name in sorted(await db.list_collection_names()):
+        match = ARCHIVE_PATTERN.match(name)
+        if match:
+            years.setdefault(match.group(2), []).append(match.group(1))
+    return years
+
+
+# Openings swap
+async def rebuild_openings(db, exclude_year: str = None) -> int:
+    """Recompute openings from the archive collections and switch readers to them."""
+    movements = {collection: [] for collection in MOVEMENT_COLLECTIONS}
+    for year, collections in sorted((await archive_years(db)).items()):
+        if year == exclude_year:
+            continue
+        for collection in collections:
+            movements[collection] += await db[archive_name(collection, year)].find({}, {"_id": 0}).to_list(None)
+
+    openings = roll_up(movements["productions"], movements["shipments"], movements["cut_products"])
+
+    state = await db.archive_state.find_one({"_id": "stock_openings"})
+    version = (state['version'] if state else 0) + 1
+    if openings:
+        await db.stock_openings.insert_many([{**opening, "version": version} for opening in openings])
+    await db.archive_state.update_one({"_id": "stock_openings"}, {"$set": {"version": version}}, upsert=True)
+    await db.stock_openings.delete_many({"version": {"$ne": version}})
+    return version
+
+
+async def _tombstone(db, collection: str, ids: list):
+    # Archived records leave the list endpoints, so /api/sync clients must drop them too
+    if not ids:
+        return
+    deleted_at = datetime.now(timezone.utc).isoformat()
+    async with change_seq(len(ids), db) as last:
+        first = last - len(ids) + 1
+        await db.tombstones.insert_many([
+            {"collection": collection, "id": doc_id, "seq": first + i, "deleted_at": deleted_at}
+            for i, doc_id in enumerate(ids)
+        ])
+
+
+async def _restamp(db, collection: str, ids: list):
+    # Restored records are upserts again for /api/sync clients
+    if not ids:
+        return
+    async with change_seq(len(ids), db) as last:
+        first = last - len(ids) + 1
+        for i, doc_id in enumerate(ids):
+            await db[collection].update_one({"id": doc_id}, {"$set": {"seq": first + i}})
+
+
+def diff_stock(before: dict, after: dict) -> list:
+    return [key for key in before.keys() | after.keys() if before.get(key) != after.get(key)]
+
+
+# Jobs
+@asynccontextmanager
+async def movements_locked(db):
+    # No movement writes from here on (see core.movements_writable), and none still under way
+    try:
+        await db.maintenance.insert_one({"_id": MOVEMENTS_LOCK, "since": datetime.now(timezone.utc)})
+    except DuplicateKeyError:
+        raise ArchiveError("Another archive job is running (or was killed: python archive.py unlock)")
+    try:
+        while await db.movement_writes.find_one({"expires_at": {"$gt": datetime.now(timezone.utc)}}):
+            await asyncio.sleep(0.1)
+        yield
+    finally:
+        await db.maintenance.delete_one({"_id": MOVEMENTS_LOCK})
+
+
+async def _prepend(db, collection: str, docs: list):
+    # Natural order decides which SKU a tolerant Kesilmiş shipment matches first, so
+    # documents coming back out of an archive go in front of the hot ones
+    hot = await db[collection].find({"id": {"$nin": [doc['id'] for doc in docs]}}).to_list(None)
+    await db[collection].delete_many({})
+    ordered = docs + hot
+    for start in range(0, len(ordered), BATCH_SIZE):
+        await db[collection].insert_many(ordered[start:start + BATCH_SIZE])
+    await _restamp(db, collection, [doc['id'] for doc in docs])
+
+
+async def archive_until(db, until: str) -> dict:
+    first_of_month = datetime.now(timezone.utc).strftime('%Y-%m-01')
+    if until >= first_of_month:
+        raise ArchiveError(f"{until} is not in a closed period; archive up to the end of last month at most")
+
+    async with movements_locked(db):
+        years = await archive_years(db)
+        if years and until[:4] < max(years):
+            raise ArchiveError(f"{max(years)} is already archived; archive up to a later date")
+
+        before = await current_stock(db)
+        moved, positions = {}, {}
+        for collection in MOVEMENT_COLLECTIONS:
+            positions[collection] = {doc['id']: i for i, doc in enumerate(await db[collection].find({}, {"id": 1}).to_list(None))}
+            docs = await db[collection].find({"tarih": {"$lte": until}}).to_list(None)
+            moved[collection] = docs
+            for year in sorted({doc['tarih'][:4] for doc in docs}):
+                target = db[archive_name(collection, year)]
+                await target.create_index("id", unique=True)
+                for doc in docs:
+                    if doc['tarih'][:4] == year:
+                        await target.replace_one({"id": doc['id']}, doc, upsert=True)
+
+        await rebuild_openings(db)
+        for collection, docs in moved.items():
+            ids = [doc['id'] for doc in docs]
+            for start in range(0, len(ids), BATCH_SIZE):
+                await db[collection].delete_many({"id": {"$in": ids[start:start + BATCH_SIZE]}})
+            await _tombstone(db, collection, ids)
+
+        after = await current_stock(db)
+        mismatched = diff_stock(before, after)
+        if mismatched:
+            logger.error(f"Stock changed for {len(mismatched)} SKUs after archiving, rolling back: {mismatched[:10]}")
+            for collection, docs in moved.items():
+                # Back in the original interleaving, which a plain prepend would not give
+                hot = await db[collection].find({}).to_list(None)
+                ordered = sorted(docs + hot, key=lambda doc: positions[collection].get(doc['id'], len(positions[collection])))
+                await db[collection].delete_many({})
+                for start in range(0, len(ordered), BATCH_SIZE):
+                    await db[collection].insert_many(ordered[start:start + BATCH_SIZE])
+                ids = [doc['id'] for doc in docs]
+                await _restamp(db, collection, ids)
+                for year in sorted({doc['tarih'][:4] for doc in docs}):
+                    source = db[archive_name(collection, year)]
+                    await source.delete_many({"id": {"$in": ids}})
+                    if await source.count_documents({}) == 0:
+                        await source.drop()
+            await rebuild_openings(db)
+            raise ArchiveError(f"Archiving would change stock for {len(mismatched)} SKUs; nothing was archived")
+
+        return {collection: len(docs) for collection, docs in moved.items()}
+
+
+async def restore_year(db, year: str) -> dict:
+    async with movements_locked(db):
+        years = await archive_years(db)
+        if year not in years:
+            raise ArchiveError(f"No archive for {year}")
+        if year != max(years):
+            # Openings always precede the hot movements, so only the latest archived year can come back
+            raise ArchiveError(f"Restore {max(years)} first")
+
+        before = await current_stock(db)
+        # Openings first: until the documents are back, stock under-counts rather than double counts
+        await rebuild_openings(db, exclude_year=year)
+        restored = {}
+        for collection in years[year]:
+            source = db[archive_name(collection, year)]
+            docs = await source.find({}).to_list(None)
+            await _prepend(db, collection, docs)
+            await source.drop()
+            restored[collection] = len(docs)
+
+        after = await current_stock(db)
+        mismatched = diff_stock(before, after)
+        if mismatched:
+            raise ArchiveError(f"Stock differs for {len(mismatched)} SKUs after restoring {year}: {mismatched[:10]}")
+        return restored
+
+
+async def verify(db) -> dict:
+    """Stock from openings + hot movements against stock from the full archived history."""
+    movements = {collection: [] for collection in MOVEMENT_COLLECTIONS}
+    for year, collections in sorted((await archive_years(db)).items()):
+        for collection in collections:
+            movements[collection] += await db[archive_name(collection, year)].find({}, {"_id": 0}).to_list(None)
+    for collection in MOVEMENT_COLLECTIONS:
+        movements[collection] += await db[collection].find({}, {"_id": 0}).to_list(None)
+
+    full_history = compute_stock(movements["productions"], movements["shipments"], movements["cut_products"])
+    mismatched = diff_stock(full_history, await current_stock(db))
+    return {"skus": len(full_history), "mismatched": mismatched}
+
+
+async def _main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Archive closed-period stock movements")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_cmd = commands.add_parser("archive", help="move movements dated up to --until into yearly archives")
+    archive_cmd.add_argument("--until", required=True, help="last archived date, YYYY-MM-DD")
+    restore_cmd = commands.add_parser("restore", help="move one archived year back into the hot collections")
+    restore_cmd.add_argument("--year", required=True)
+    commands.add_parser("verify", help="compare stock from openings against the full history")
+    commands.add_parser("unlock", help="let the API write movements again after a killed job")
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if args.command == "archive":
+            print(await archive_until(db, args.until))
+        elif args.command == "restore":
+            print(await restore_year(db, args.year))
+        elif args.command == "unlock":
+            await db.maintenance.delete_one({"_id": MOVEMENTS_LOCK})
+        else:
+            result = await verify(db)
+            print(f"{result['skus']} SKUs, {len(result['mismatched'])} mismatched {result['mismatched'][:10]}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
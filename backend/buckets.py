@@ -0,0 +1,66 @@
+"""Hourly machine buckets.
+
+Production and consumption writes $inc one bucket per (makine, tarih, saat), so the
+machine report reads a few hundred small bucket documents instead of the raw history.
+
+Records carry a production date (tarih) but no time of day, so the hour is taken from
+`timestamp`, when the entry was made, in plant time. Active hours, m²/hour and the
+shift split therefore describe when production was entered; that matches the line only
+as closely as operators record rolls as they come off it.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from config import PLANT_UTC_OFFSET_HOURS
+from database import db
+
+
+def bucket_hour(timestamp) -> int:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return (timestamp + timedelta(hours=PLANT_UTC_OFFSET_HOURS)).hour
+
+def production_bucket_amounts(prod: dict, sign: int = 1) -> dict:
+    return {"metrekare": sign * prod['metrekare'], "adet": sign * prod['adet']}
+
+def consumption_bucket_amounts(cons: dict, sign: int = 1) -> dict:
+    return {
+        "petkim_kg": sign * cons['petkim_kg'],
+        "fire_kg": sign * cons['fire_kg'],
+        "tuketim_kg": sign * cons['toplam_petkim_tuketim']
+    }
+
+def machine_bucket_key(doc: dict) -> dict:
+    return {"makine": doc['makine'], "tarih": doc['tarih'], "saat": bucket_hour(doc['timestamp'])}
+
+async def move_machine_bucket(doc: dict, amounts: dict):
+    await db.machine_buckets.update_one(machine_bucket_key(doc), {"$inc": amounts}, upsert=True)
+
+async def init_machine_buckets():
+    await db.machine_buckets.create_index([("makine", 1), ("tarih", 1), ("saat", 1)], unique=True)
+    await db.machine_buckets.create_index([("tarih", 1)])
+    
+    if await db.machine_buckets.estimated_document_count() > 0:
+        return
+    
+    # First start with buckets: build them from history, written with $setOnInsert so a
+    # second worker seeding at the same time can't double count
+    buckets = {}
+    productions = await db.productions.find({}, {"_id": 0}).to_list(None)
+    consumptions = await db.daily_consumptions.find({}, {"_id": 0}).to_list(None)
+    movements = [(p, production_bucket_amounts(p)) for p in productions if 'makine' in p]
+    movements += [(c, consumption_bucket_amounts(c)) for c in consumptions if 'makine' in c]
+    
+    for doc, amounts in movements:
+        key = machine_bucket_key(doc)
+        bucket = buckets.setdefault(tuple(key.values()), {**key})
+        for field, value in amounts.items():
+            bucket[field] = bucket.get(field, 0) + value
+    
+    for bucket in buckets.values():
+        await db.machine_buckets.update_one(
+            {k: bucket[k] for k in ('makine', 'tarih', 'saat')},
+            {"$setOnInsert": bucket},
+            upsert=True
+        )
+    logging.info(f"Machine analytics seeded with {len(buckets)} hourly buckets")
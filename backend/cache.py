@@ -0,0 +1,224 @@
+"""In-process caches kept coherent across workers.
+
+Every worker holds its own TTLCache instances. The InvalidationBus tails a MongoDB
+change stream on the watched collections and clears the subscribed caches in every
+worker when a document changes. Change streams need a replica set; on a standalone
+mongod the bus logs a warning and the caches fall back to a short TTL instead.
+
+Smoke test against a local single-node replica set:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 &
+    mongosh --eval 'rs.initiate()'
+    MONGO_URL=mongodb://localhost:27017/?replicaSet=rs0 DB_NAME=cache_check python cache.py
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Server error codes meaning "change streams are not available on this deployment"
+CHANGE_STREAM_UNSUPPORTED = {40573, 40324, 136}
+
+
+class TTLCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: Dict[str, tuple] = {}
+
+    def get(self, key: str, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return default
+        return value
+
+    def set(self, key: str, value, generation: Optional[int] = None):
+        # Pass the generation read before computing `value` to drop results that an
+        # invalidation overtook while they were being computed
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation.
+
+    With `window` > 0 the finished result is also served for that many seconds, unless
+    forget() was called while it was being computed.
+    """
+
+    def __init__(self, name: str, window: float = 0.0):
+        self.name = name
+        self.window = window
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._recent: Dict[str, tuple] = {}
+        self.generation = 0
+        self._key_generations: Dict[str, int] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "window_hits": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        self.stats["calls"] += 1
+
+        recent = self._recent.get(key)
+        if recent is not None and time.monotonic() < recent[1]:
+            self.stats["window_hits"] += 1
+            return recent[0]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            # shield: one caller disconnecting must not cancel the others' result
+            return await asyncio.shield(future)
+
+        self.stats["executions"] += 1
+        generation = self._generation(key)
+        future = asyncio.ensure_future(fn())
+        self._in_flight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        if self.window > 0 and self._generation(key) == generation:
+            self._recent[key] = (result, time.monotonic() + self.window)
+        return result
+
+    def _generation(self, key: str) -> tuple:
+        return self.generation, self._key_generations.get(key, 0)
+
+    def forget(self, key: Optional[str] = None):
+        # Later callers start a fresh computation instead of joining a stale one, and a
+        # computation already running is not kept for the window: it may predate the write
+        if key is None:
+            self.generation += 1
+            self._in_flight.clear()
+            self._recent.clear()
+        else:
+            self._key_generations[key] = self._key_generations.get(key, 0) + 1
+            self._in_flight.pop(key, None)
+            self._recent.pop(key, None)
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "window": self.window,
+            "in_flight": len(self._in_flight),
+            **self.stats
+        }
+
+
+class InvalidationBus:
+    def __init__(self, db, collections: List[str], fallback_ttl: float = 5.0):
+        self.db = db
+        self.collections = list(collections)
+        self.fallback_ttl = fallback_ttl
+        self.change_streams_active = False
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {c: [] for c in self.collections}
+        self._caches: List[TTLCache] = []
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token = None
+
+    def subscribe(self, collection: str, callback: Callable[[str], None]):
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def register_cache(self, cache: TTLCache, *collections: str):
+        # Clear the whole cache when any of its source collections changes
+        self._caches.append(cache)
+        for collection in collections:
+            self.subscribe(collection, lambda _c, cache=cache: cache.clear())
+
+    def publish(self, collection: str):
+        # Called directly by the worker that made the write, and by the change stream for everyone else
+        for callback in self._subscribers.get(collection, []):
+            try:
+                callback(collection)
+            except Exception:
+                logger.exception(f"Invalidation subscriber failed for {collection}")
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.change_streams_active = False
+
+    def _fall_back_to_ttl(self, reason: str):
+        logger.warning(f"Change streams unavailable ({reason}); caches fall back to {self.fallback_ttl}s TTL")
+        self.change_streams_active = False
+        for cache in self._caches:
+            cache.ttl = min(cache.ttl, self.fallback_ttl)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": self.collections}}}]
+        backoff = 1.0
+        while True:
+            try:
+                async with self.db.watch(pipeline, resume_after=self._resume_token) as stream:
+                    self.change_streams_active = True
+                    backoff = 1.0
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self.publish(change["ns"]["coll"])
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    self._fall_back_to_ttl(str(e))
+                    return
+                logger.warning(f"Change stream failed, retrying in {backoff}s: {e}")
+            except PyMongoError as e:
+                logger.warning(f"Change stream interrupted, retrying in {backoff}s: {e}")
+            except Exception as e:
+                # Not a server problem worth retrying; never leave caches on the long TTL unwatched
+                logger.exception("Change stream watcher failed")
+                self._fall_back_to_ttl(repr(e))
+                return
+
+            # Events may have been missed while disconnected
+            self.change_streams_active = False
+            for cache in self._caches:
+                cache.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+async def _smoke_test():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    db = AsyncIOMotorClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    bus = InvalidationBus(db, ["currency_rates"])
+    received = asyncio.Event()
+    bus.subscribe("currency_rates", lambda _c: received.set())
+    await bus.start()
+    await asyncio.sleep(1)
+    await db.currency_rates.insert_one({"usd_rate": 1.0, "eur_rate": 1.0, "updated_by": "cache-check"})
+    try:
+        await asyncio.wait_for(received.wait(), timeout=5)
+        print("change stream invalidation OK")
+    except asyncio.TimeoutError:
+        print("no event received; change streams active:", bus.change_streams_active)
+    finally:
+        await db.currency_rates.delete_many({"updated_by": "cache-check"})
+        await bus.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_smoke_test())
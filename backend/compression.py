@@ -0,0 +1,239 @@
+"""Response compression.
+
+ASGI middleware that compresses responses with zstd, brotli or gzip, whichever the
+client accepts and ranks highest (ties go to zstd, then brotli). brotli and zstandard
+are optional: without them only gzip is offered. Small bodies are sent as they are.
+Streaming responses are compressed chunk by chunk and flushed after every chunk, so
+clients still receive exports progressively.
+
+Compare transfer size and CPU cost per codec and level on a synthetic shipment list,
+or on a JSON file saved from the API:
+
+    python compression.py [payload.json]
+"""
+import json
+import random
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Already compressed formats (xlsx is a zip archive)
+INCOMPRESSIBLE_TYPES = (
+    "image/", "video/", "audio/", "application/zip", "application/gzip",
+    "application/vnd.openxmlformats", "application/pdf",
+)
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_codecs(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> Dict[str, Callable]:
+    """Encoding name -> compressor factory, in server preference order."""
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = lambda: _Zstd(zstd_level)
+    if brotli is not None:
+        codecs["br"] = lambda: _Brotli(brotli_quality)
+    codecs["gzip"] = lambda: _Gzip(gzip_level)
+    return codecs
+
+
+def choose_encoding(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name in offered:
+        quality = weights.get(name, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.codecs = available_codecs(gzip_level, brotli_quality, zstd_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = choose_encoding(accept_encoding, list(self.codecs))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressingSender(self, encoding, send).run(scope, receive)
+
+
+class _CompressingSender:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.app = middleware.app
+        self.minimum_size = middleware.minimum_size
+        self.factory = middleware.codecs[encoding]
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def run(self, scope, receive):
+        await self.app(scope, receive, self.on_message)
+
+    async def on_message(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether compression is worth it
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self._skip(start, body, more_body):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers = [(k, v) for k, v in start["headers"] if k != b"content-length"]
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+            self.compressor = self.factory()
+            compressed = self.compressor.compress(body)
+            if not more_body:
+                compressed += self.compressor.finish()
+                headers.append((b"content-length", str(len(compressed)).encode()))
+            await self.send({**start, "headers": headers})
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        compressed = self.compressor.compress(body)
+        if not more_body:
+            compressed += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _skip(self, start, body: bytes, more_body: bool) -> bool:
+        headers = dict(start["headers"])
+        if b"content-encoding" in headers:
+            return True
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        if content_type.startswith(INCOMPRESSIBLE_TYPES) or content_type.startswith("text/event-stream"):
+            return True
+        # Streams are compressed whatever their first chunk; whole bodies only above the threshold
+        return not more_body and len(body) < self.minimum_size
+
+
+# Benchmark
+def sample_payload(count: int = 20000, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    firms = ["ŞİŞECAM", "Özgür Ambalaj", "Çelik Lojistik", "Güneş Plastik", "Anadolu Cam"]
+    shipments = [{
+        "id": f"{rng.getrandbits(128):032x}",
+        "tarih": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "alici_firma": rng.choice(firms),
+        "urun_tipi": rng.choice(["Normal", "Kesilmiş"]),
+        "kalinlik": rng.choice([1.0, 1.5, 2.0, 3.0]),
+        "en": rng.choice([100.0, 120.0, 150.0]),
+        "metre": rng.choice([50.0, 100.0, 200.0]),
+        "metrekare": round(rng.uniform(50, 300), 2),
+        "adet": rng.randint(1, 40),
+        "renk_kategori": "Renksiz",
+        "renk": "Doğal",
+        "irsaliye_no": f"A{rng.randint(100000, 999999)}",
+        "arac_plaka": f"34 {rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')} {rng.randint(100, 9999)}",
+        "sofor": rng.choice(["Ahmet", "Mehmet", "Ayşe", "Fatma"]),
+        "cikis_saati": f"{rng.randint(6, 22):02d}:{rng.randint(0, 59):02d}",
+        "timestamp": "2025-01-01T08:00:00Z",
+    } for _ in range(count)]
+    return json.dumps(shipments, ensure_ascii=False).encode()
+
+
+def _benchmark(payload: bytes):
+    levels = {"gzip": [1, 6, 9], "br": [1, 4, 6, 11], "zstd": [1, 3, 9, 19]}
+    factories = {
+        "gzip": lambda level: _Gzip(level),
+        "br": lambda level: _Brotli(level) if brotli else None,
+        "zstd": lambda level: _Zstd(level) if zstandard else None,
+    }
+    print(f"payload {len(payload) / 1024:,.0f} KiB")
+    for encoding, encoding_levels in levels.items():
+        for level in encoding_levels:
+            compressor = factories[encoding](level)
+            if compressor is None:
+                print(f"{encoding:>5} not installed")
+                break
+            start = time.perf_counter()
+            size = len(compressor.compress(payload) + compressor.finish())
+            ms = (time.perf_counter() - start) * 1000
+            print(f"{encoding:>5} level {level:>2}  {size / 1024:8,.0f} KiB  ratio {len(payload) / size:5.1f}x  {ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark(Path(sys.argv[1]).read_bytes() if len(sys.argv) > 1 else sample_payload())
@@ -0,0 +1,73 @@
+"""Settings read from the environment (and backend/.env).
+
+Importing this module is cheap: it reads variables, nothing connects.
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Security
+SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'sar-ambalaj-secret-key-2025')
+
+# Login throttling (protects bcrypt CPU from bursts and credential stuffing)
+LOGIN_THROTTLE_STORE = os.environ.get('LOGIN_THROTTLE_STORE', 'memory')
+LOGIN_USER_BURST = float(os.environ.get('LOGIN_USER_BURST', '5'))
+LOGIN_USER_PER_MINUTE = float(os.environ.get('LOGIN_USER_PER_MINUTE', '5'))
+LOGIN_IP_BURST = float(os.environ.get('LOGIN_IP_BURST', '20'))
+LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', '30'))
+LOGIN_MAX_CONCURRENT_VERIFY = int(os.environ.get('LOGIN_MAX_CONCURRENT_VERIFY', '4'))
+# Proxies (addresses or CIDR ranges, comma separated) whose X-Forwarded-For is believed,
+# e.g. the ingress; requests from anywhere else are limited by their own address
+TRUSTED_PROXIES = [proxy.strip() for proxy in os.environ.get('TRUSTED_PROXIES', '').split(',') if proxy.strip()]
+
+# Caches
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '300'))
+CACHE_FALLBACK_TTL_SECONDS = float(os.environ.get('CACHE_FALLBACK_TTL_SECONDS', '5'))
+COALESCE_WINDOW_SECONDS = float(os.environ.get('COALESCE_WINDOW_SECONDS', '0'))
+
+# Stock
+STOCK_RESERVE_RETRIES = int(os.environ.get('STOCK_RESERVE_RETRIES', '20'))
+# "python" folds row by row; "pandas" uses the vectorized engine, faster on large histories
+STOCK_ENGINE = os.environ.get('STOCK_ENGINE', 'python')
+
+# Machine analytics
+PLANT_UTC_OFFSET_HOURS = float(os.environ.get('PLANT_UTC_OFFSET_HOURS', '3'))
+SHIFT_LENGTH_HOURS = int(os.environ.get('SHIFT_LENGTH_HOURS', '8'))
+
+# Raw material forecast: consumption rates over the last N days, and purchase lead time
+FORECAST_WINDOW_DAYS = int(os.environ.get('FORECAST_WINDOW_DAYS', '30'))
+REORDER_LEAD_DAYS = int(os.environ.get('REORDER_LEAD_DAYS', '7'))
+
+# HTTP
+CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '4'))
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', '3'))
+
+# Background jobs
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', '50'))
+JOB_RESULT_TTL_HOURS = float(os.environ.get('JOB_RESULT_TTL_HOURS', '24'))
+
+# Slow query log: commands over the threshold are explained and kept in a capped collection
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG_MB = float(os.environ.get('SLOW_QUERY_LOG_MB', '16'))
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+
+# Offline sync: how long a pushed mutation's idempotency key is remembered
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', '168'))
+# A pushed mutation still unfinished after this long is taken over by the client's retry
+# (its worker is assumed to have died)
+IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS = float(os.environ.get('IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS', '30'))
+# A write that has taken a change sequence number but not finished holds delta sync back
+# for at most this long (after that its worker is assumed to have died)
+SEQ_CLAIM_TIMEOUT_SECONDS = float(os.environ.get('SEQ_CLAIM_TIMEOUT_SECONDS', '60'))
+
+# Request tracing: share of requests traced (X-Trace: 1 forces one) and how many traces are kept
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.01'))
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', '200'))
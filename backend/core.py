@@ -0,0 +1,229 @@
+"""State shared by the domain routers: caches, the change sequence and list helpers."""
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache, wraps
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import ConfigDict, TypeAdapter, create_model
+from pymongo import ReturnDocument
+
+from cache import TTLCache, InvalidationBus, SingleFlight
+from config import CACHE_TTL_SECONDS, CACHE_FALLBACK_TTL_SECONDS, COALESCE_WINDOW_SECONDS, SEQ_CLAIM_TIMEOUT_SECONDS
+from database import db
+
+# Caches, kept coherent across workers by tailing MongoDB change streams
+invalidation_bus = InvalidationBus(
+    db,
+    ["productions", "shipments", "cut_products", "stock_ledger", "currency_rates", "daily_consumptions"],
+    fallback_ttl=CACHE_FALLBACK_TTL_SECONDS
+)
+stock_cache = TTLCache(CACHE_TTL_SECONDS)
+rates_cache = TTLCache(CACHE_TTL_SECONDS)
+catalog_cache = TTLCache(CACHE_TTL_SECONDS)
+invalidation_bus.register_cache(stock_cache, "productions", "shipments", "cut_products")
+# Facets are read from the ledger, which changes after the movement that caused it
+invalidation_bus.register_cache(catalog_cache, "stock_ledger")
+invalidation_bus.register_cache(rates_cache, "currency_rates")
+
+# Identical concurrent reads (e.g. every tablet loading stock at shift start) share one computation
+stock_flight = SingleFlight("stock", COALESCE_WINDOW_SECONDS)
+analytics_flight = SingleFlight("analytics_machines", COALESCE_WINDOW_SECONDS)
+for collection in ("productions", "shipments", "cut_products"):
+    invalidation_bus.subscribe(collection, lambda _c: stock_flight.forget())
+for collection in ("productions", "daily_consumptions"):
+    invalidation_bus.subscribe(collection, lambda _c: analytics_flight.forget())
+
+
+# Defaults for records written before these fields existed
+def fill_product_defaults(doc: dict) -> dict:
+    doc.setdefault('urun_tipi', 'Normal')
+    doc.setdefault('renk_kategori', 'Renksiz')
+    doc.setdefault('renk', 'Doğal')
+    return doc
+
+def is_new_format_cut(cut: dict) -> bool:
+    return 'ana_kalinlik' in cut and 'kesim_kalinlik' in cut
+
+def fill_cut_defaults(cut: dict) -> dict:
+    if 'ana_renk_kategori' not in cut:
+        cut['ana_renk_kategori'] = 'Renksiz'
+        cut['ana_renk'] = 'Doğal'
+    if 'kesim_renk_kategori' not in cut:
+        cut['kesim_renk_kategori'] = 'Renksiz'
+        cut['kesim_renk'] = 'Doğal'
+    return cut
+
+
+# Sparse fieldsets: list endpoints take ?fields=tarih,adet,... and return only those
+def parse_fields(model, fields: Optional[str]) -> Optional[tuple]:
+    requested = {name.strip() for name in (fields or '').split(',') if name.strip()}
+    if not requested:
+        return None
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    if 'id' in model.model_fields:
+        requested.add('id')
+    # Model order, so equal selections share one trimmed model
+    return tuple(name for name in model.model_fields if name in requested)
+
+def field_projection(selected: Optional[tuple], *needed: str) -> dict:
+    # `needed` are fields the endpoint reads itself (filters, defaults); the trimmed model drops them again
+    if selected is None:
+        return {"_id": 0}
+    return {"_id": 0, **{name: 1 for name in (*selected, *needed)}}
+
+@lru_cache(maxsize=256)
+def sparse_adapter(model, selected: tuple) -> TypeAdapter:
+    trimmed = create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(extra="ignore"),
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in selected}
+    )
+    return TypeAdapter(List[trimmed])
+
+def sparse_response(model, selected: tuple, docs: list) -> Response:
+    # Serialized straight to JSON; the full response_model would reject the missing fields
+    adapter = sparse_adapter(model, selected)
+    return Response(adapter.dump_json(adapter.validate_python(docs)), media_type="application/json")
+
+
+# Table pages: the record tables fetch one window of rows at a time, sorted and
+# filtered here, so the browser never holds a whole collection
+TABLE_DATE_FIELDS = {
+    "productions": "tarih", "shipments": "tarih", "cut_products": "tarih", "raw_materials": "giris_tarihi"
+}
+
+def date_range(field: str, baslangic: Optional[str], bitis: Optional[str]) -> dict:
+    bounds = {}
+    if baslangic:
+        bounds["$gte"] = baslangic
+    if bitis:
+        bounds["$lte"] = bitis
+    return {field: bounds} if bounds else {}
+
+async def table_page(collection, query: dict, sort: str, sortable: tuple, page: int, page_size: int) -> tuple:
+    # `sort` is a field name, "-" in front for descending; ties broken by id so pages never overlap
+    field = sort.lstrip('-')
+    if field not in sortable:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {field}")
+    direction = -1 if sort.startswith('-') else 1
+    total = await collection.count_documents(query)
+    docs = await collection.find(query, {"_id": 0}).sort(
+        [(field, direction), ("id", direction)]
+    ).skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+    return docs, total
+
+async def init_table_pages():
+    # The default order, newest first, and date filters walk this index
+    for collection, field in TABLE_DATE_FIELDS.items():
+        await db[collection].create_index([(field, 1), ("id", 1)])
+
+
+# Delta sync
+# Every write to a synced collection stamps the document with a value from one global,
+# monotonic change sequence; deletions leave a tombstone carrying their own sequence.
+# A client that remembers the last sequence it saw can fetch just what changed since.
+#
+# Numbers are taken before the write lands, so writes finish out of order. A sync may only
+# hand out a sequence every write up to which has finished: each write holds a claim (in
+# seq_claims) from before it takes its number until it is done, recording the counter as
+# it was then, and a sync stops at the lowest such floor.
+SYNC_COLLECTIONS = ["productions", "shipments", "cut_products", "raw_materials", "daily_consumptions"]
+
+async def next_change_seq(count: int = 1, database=db) -> int:
+    # Reserves `count` sequence numbers and returns the highest
+    counter = await database.counters.find_one_and_update(
+        {"_id": "change_seq"},
+        {"$inc": {"value": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['value']
+
+@asynccontextmanager
+async def change_seq(count: int = 1, database=db):
+    # Reserves `count` sequence numbers (yields the highest) for the write made inside the block
+    counter = await database.counters.find_one({"_id": "change_seq"})
+    claim = await database.seq_claims.insert_one({
+        "floor": counter['value'] if counter else 0,
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=SEQ_CLAIM_TIMEOUT_SECONDS)
+    })
+    try:
+        yield await next_change_seq(count, database)
+    finally:
+        await database.seq_claims.delete_one({"_id": claim.inserted_id})
+
+async def committed_change_seq() -> int:
+    # The counter first, then the claims: a write numbered at or below the counter read
+    # had claimed before it, so it is either finished or holds the result down
+    counter = await db.counters.find_one({"_id": "change_seq"})
+    seq = counter['value'] if counter else 0
+    claim = await db.seq_claims.find_one(
+        {"expires_at": {"$gt": datetime.now(timezone.utc)}}, sort=[("floor", 1)]
+    )
+    return min(seq, claim['floor']) if claim else seq
+
+async def record_tombstone(collection: str, doc_id: str):
+    async with change_seq() as seq:
+        await db.tombstones.insert_one({
+            "collection": collection,
+            "id": doc_id,
+            "seq": seq,
+            "deleted_at": datetime.now(timezone.utc).isoformat()
+        })
+
+async def init_change_seq():
+    await db.tombstones.create_index("seq")
+    await db.seq_claims.create_index("floor")
+    await db.seq_claims.create_index("expires_at", expireAfterSeconds=0)
+    for collection in SYNC_COLLECTIONS:
+        await db[collection].create_index("seq")
+        
+        # Stamp records written before the sequence existed
+        missing = await db[collection].find({"seq": {"$exists": False}}, {"_id": 1}).to_list(None)
+        if not missing:
+            continue
+        async with change_seq(len(missing)) as last:
+            for offset, doc in enumerate(missing):
+                await db[collection].update_one(
+                    {"_id": doc['_id'], "seq": {"$exists": False}},
+                    {"$set": {"seq": last - len(missing) + 1 + offset}}
+                )
+        logging.info(f"Assigned change sequence to {len(missing)} {collection} records")
+
+
+# Archive maintenance
+# Archiving and restoring (archive.py) rewrite productions, shipments and cut_products and
+# compare stock before and after. While one runs, writes to those collections are refused:
+# each write holds a claim (in movement_writes) for its whole run and checks the flag after
+# claiming, and the job sets the flag, then waits for the claims already taken to finish.
+MOVEMENTS_LOCK = "movements"
+
+@asynccontextmanager
+async def movements_writable(database=db):
+    claim = await database.movement_writes.insert_one({
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=SEQ_CLAIM_TIMEOUT_SECONDS)
+    })
+    try:
+        if await database.maintenance.find_one({"_id": MOVEMENTS_LOCK}):
+            raise HTTPException(
+                status_code=503, detail="Stock movements are being archived, please retry shortly",
+                headers={"Retry-After": "30"}
+            )
+        yield
+    finally:
+        await database.movement_writes.delete_one({"_id": claim.inserted_id})
+
+def movement_write(handler):
+    # For the endpoints that write productions, shipments and cut_products
+    @wraps(handler)
+    async def guarded(*args, **kwargs):
+        async with movements_writable():
+            return await handler(*args, **kwargs)
+    return guarded
+
+async def init_movement_writes():
+    await db.movement_writes.create_index("expires_at", expireAfterSeconds=0)
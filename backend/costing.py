@@ -0,0 +1,146 @@
+"""Production cost per m².
+
+`material_costs` holds, per material, the kg and TL of every purchase so far. The
+weighted average TL/kg moves with each purchase, and the TL amount already carries
+the `kur` of its entry date. A consumption record is priced at the averages current
+when it is written. The TL amount is stamped on the record as `maliyet_tl` and added
+to the day's rollup in `cost_days`, one document per (tarih, makine). Edits and
+deletes take back exactly what was booked.
+
+/api/reports/unit-cost reads the rollups and the m² produced from the machine buckets,
+so the history is never rescanned. Records written before this existed are priced by
+replaying purchases and consumption in date order once, at first start.
+"""
+import logging
+from typing import Optional
+
+from database import db
+from forecast import MATERIALS, material_key
+
+
+async def material_prices() -> dict:
+    prices = {material: None for material in MATERIALS}
+    async for doc in db.material_costs.find({}):
+        if doc.get('kg', 0) > 0:
+            prices[doc['_id']] = doc['tl'] / doc['kg']
+    return prices
+
+def price_consumption(cons: dict, prices: dict) -> float:
+    # A material never bought has no price yet and adds nothing
+    return sum(cons.get(field, 0) * (prices[material] or 0) for material, (field, _) in MATERIALS.items())
+
+
+async def move_material_cost(raw: dict, sign: int = 1):
+    material = material_key(raw.get('malzeme_adi'))
+    if material is None or raw.get('birim') != 'Kilogram':
+        return
+    await db.material_costs.update_one(
+        {"_id": material}, {"$inc": {"kg": sign * raw['miktar'], "tl": sign * raw['tl_tutar']}}, upsert=True
+    )
+
+async def book_consumption_cost(cons: dict):
+    cost = price_consumption(cons, await material_prices())
+    await db.daily_consumptions.update_one({"id": cons['id']}, {"$set": {"maliyet_tl": cost}})
+    await move_cost_day(cons, cost)
+
+async def unbook_consumption_cost(cons: dict):
+    cost = cons.get('maliyet_tl')
+    if cost is None:
+        cost = price_consumption(cons, await material_prices())
+    await move_cost_day(cons, cost, -1)
+
+async def move_cost_day(cons: dict, cost: float, sign: int = 1):
+    amounts = {f"{material}_kg": sign * cons.get(field, 0) for material, (field, _) in MATERIALS.items()}
+    await db.cost_days.update_one(
+        {"tarih": cons['tarih'], "makine": cons['makine']},
+        {"$inc": {**amounts, "maliyet_tl": sign * cost}},
+        upsert=True
+    )
+
+
+async def unit_cost_report(baslangic: str, bitis: str, makine: Optional[str]) -> dict:
+    query = {"tarih": {"$gte": baslangic, "$lte": bitis}}
+    if makine:
+        query["makine"] = makine
+    costs = await db.cost_days.find(query, {"_id": 0}).to_list(None)
+    produced = await db.machine_buckets.aggregate([
+        {"$match": query},
+        {"$group": {"_id": {"tarih": "$tarih", "makine": "$makine"}, "metrekare": {"$sum": "$metrekare"}}}
+    ]).to_list(None)
+
+    days = {}
+    for row in produced:
+        key = (row['_id']['tarih'], row['_id']['makine'])
+        days[key] = {"tarih": key[0], "makine": key[1], "metrekare": row['metrekare'] or 0}
+    for row in costs:
+        day = days.setdefault((row['tarih'], row['makine']), {
+            "tarih": row['tarih'], "makine": row['makine'], "metrekare": 0
+        })
+        day.update({field: value for field, value in row.items() if field not in ('tarih', 'makine')})
+
+    totals = {"metrekare": 0.0, "maliyet_tl": 0.0}
+    rows = []
+    for _, day in sorted(days.items()):
+        day.setdefault("maliyet_tl", 0)
+        for material in MATERIALS:
+            day.setdefault(f"{material}_kg", 0)
+        day["m2_maliyet_tl"] = round(day["maliyet_tl"] / day["metrekare"], 4) if day["metrekare"] > 0 else None
+        totals["metrekare"] += day["metrekare"]
+        totals["maliyet_tl"] += day["maliyet_tl"]
+        rows.append(day)
+
+    prices = await material_prices()
+    return {
+        "baslangic": baslangic,
+        "bitis": bitis,
+        "birim_fiyatlar": [
+            {"malzeme": material, "kg_fiyat_tl": None if price is None else round(price, 4)}
+            for material, price in prices.items()
+        ],
+        "gunler": rows,
+        "toplam_metrekare": round(totals["metrekare"], 3),
+        "toplam_maliyet_tl": round(totals["maliyet_tl"], 2),
+        "m2_maliyet_tl": round(totals["maliyet_tl"] / totals["metrekare"], 4) if totals["metrekare"] > 0 else None,
+    }
+
+
+async def init_unit_costs():
+    await db.cost_days.create_index([("tarih", 1), ("makine", 1)], unique=True)
+    if await db.material_costs.estimated_document_count() > 0:
+        return
+
+    # Replay history in date order, purchases of a day before its consumption, so each
+    # consumption gets the average that applied then
+    purchases = await db.raw_materials.find(
+        {"birim": "Kilogram"}, {"_id": 0, "giris_tarihi": 1, "malzeme_adi": 1, "miktar": 1, "tl_tutar": 1}
+    ).to_list(None)
+    consumptions = await db.daily_consumptions.find({"maliyet_tl": {"$exists": False}}, {"_id": 0}).to_list(None)
+    events = [(raw['giris_tarihi'], 0, raw) for raw in purchases]
+    events += [(cons['tarih'], 1, cons) for cons in consumptions]
+    events.sort(key=lambda event: event[:2])
+
+    totals = {material: {"kg": 0, "tl": 0} for material in MATERIALS}
+    days = {}
+    for _, kind, doc in events:
+        if kind == 0:
+            material = material_key(doc.get('malzeme_adi'))
+            if material is not None:
+                totals[material]["kg"] += doc['miktar']
+                totals[material]["tl"] += doc['tl_tutar']
+            continue
+        prices = {m: t["tl"] / t["kg"] if t["kg"] > 0 else None for m, t in totals.items()}
+        cost = price_consumption(doc, prices)
+        await db.daily_consumptions.update_one({"id": doc['id']}, {"$set": {"maliyet_tl": cost}})
+        day = days.setdefault((doc['tarih'], doc['makine']), {"tarih": doc['tarih'], "makine": doc['makine']})
+        day["maliyet_tl"] = day.get("maliyet_tl", 0) + cost
+        for material, (field, _) in MATERIALS.items():
+            day[f"{material}_kg"] = day.get(f"{material}_kg", 0) + doc.get(field, 0)
+
+    # $setOnInsert, like the other seeds, so a second worker starting alongside can't double count
+    for day in days.values():
+        await db.cost_days.update_one(
+            {"tarih": day['tarih'], "makine": day['makine']}, {"$setOnInsert": day}, upsert=True
+        )
+    for material, amounts in totals.items():
+        await db.material_costs.update_one({"_id": material}, {"$setOnInsert": amounts}, upsert=True)
+    logging.info(f"Unit costs seeded: {len(consumptions)} consumption records priced into {len(days)} days")
@@ -0,0 +1,290 @@
+"""Cut planning: which parent rolls to cut, and how, for a list of requested pieces.
+
+A Normal roll (`en` cm wide, `metre` m long) is cut in two stages, as on the slitter:
+first across its width into lanes, each lane as wide as one piece size, then each
+lane along its length into pieces of that width (any mix of lengths). Everything
+not in a piece is scrap.
+
+Plans are built by sequential value correction. Every piece size has a price, at
+first its area. Each pass repeats one step until all pieces are placed or the stock
+runs out. The step finds, for every roll size still in stock, the layout with the
+highest price per m² of roll, takes the best one and repeats it as often as the
+remaining demand allows. After a pass, pieces that ended up in wasteful layouts get
+more expensive, so the next pass places them first, while there is still plenty to
+combine them with. Passes repeat until the time budget is spent and the best plan is
+returned: fewest unplaced pieces, then least scrap, then fewest rolls.
+
+Runs in the job process pool, so the module imports only the standard library.
+Order book size vs. plan quality and time, greedy first pass against the planned result:
+
+    python cutplan.py 20; python cutplan.py 200; python cutplan.py 1000
+
+    20 sizes, 4508 pieces, 4327 m²
+      greedy      45 rolls,   29 layouts, scrap     223.5 m² (4.91%), 1 passes in 7 ms
+      planned     37 rolls,   26 layouts, scrap      98.5 m² (2.23%), 266 passes in 2006 ms
+    200 sizes, 41367 pieces, 47267 m²
+      greedy     442 rolls,  194 layouts, scrap     833.1 m² (1.73%), 1 passes in 73 ms
+      planned    437 rolls,  195 layouts, scrap     208.1 m² (0.44%), 21 passes in 2027 ms
+    1000 sizes, 206718 pieces, 249999 m²
+      greedy    2390 rolls,  476 layouts, scrap    4675.8 m² (1.84%), 1 passes in 174 ms
+      planned   2766 rolls,  447 layouts, scrap     275.8 m² (0.11%), 10 passes in 2016 ms
+
+(Fewer large rolls or more small ones: the roll count follows the sizes chosen.)
+"""
+import random
+import sys
+import time
+from math import gcd
+from typing import List, Optional
+
+MAX_STALE_PASSES = 200  # Stop early once this many passes in a row found nothing better
+
+
+class _Item:
+    __slots__ = ("index", "width", "length", "demand", "area")
+
+    def __init__(self, index: int, width: int, length: int, demand: int):
+        self.index = index
+        self.width = width
+        self.length = length
+        self.demand = demand
+        self.area = width * length
+
+
+def _mm(value: float) -> int:
+    return int(round(float(value) * 10))
+
+
+def plan_cuts(parents: List[dict], pieces: List[dict], budget_ms: int = 1000, seed: int = 0) -> dict:
+    """parents: [{en (cm), metre (m), adet}], pieces: [{kesim_en (cm), kesim_boy (cm), adet}]."""
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000
+
+    # Equal sizes merged; sizes in mm so the width knapsack works on integers
+    demand = {}
+    for piece in pieces:
+        size = (_mm(piece['kesim_en']), _mm(piece['kesim_boy']))
+        demand[size] = demand.get(size, 0) + int(piece['adet'])
+    items = [_Item(i, w, b, d) for i, ((w, b), d) in enumerate(sorted(demand.items())) if d > 0]
+
+    stock = {}
+    for parent in parents:
+        size = (_mm(parent['en']), int(round(float(parent['metre']) * 1000)))
+        if size[0] > 0 and size[1] > 0 and parent['adet'] > 0:
+            stock[size] = stock.get(size, 0) + int(parent['adet'])
+    rolls = sorted(stock.items())
+
+    prices = [item.area for item in items]
+    best, best_key = None, None
+    passes = stale = 0
+    rng = random.Random(seed)
+    while True:
+        # The first pass is the plain greedy plan; later ones perturb lane order a little
+        plan = _build(rolls, items, prices, rng if passes else None)
+        passes += 1
+        key = (plan['unmet_area'], plan['waste'], plan['rolls'])
+        if best_key is None or key < best_key:
+            best, best_key, stale = plan, key, 0
+        else:
+            stale += 1
+        if best_key[1] == 0 or stale >= MAX_STALE_PASSES or time.perf_counter() >= deadline:
+            break
+        _correct_prices(plan, items, prices)
+
+    return _describe(best, items, rolls, passes, time.perf_counter() - started)
+
+
+def _build(rolls: list, items: List[_Item], prices: list, rng: Optional[random.Random]) -> dict:
+    residual = [item.demand for item in items]
+    available = [count for _, count in rolls]
+    patterns = []
+    while any(residual):
+        choice = None
+        for r, ((width, length), _) in enumerate(rolls):
+            if not available[r]:
+                continue
+            layout = _layout(width, length, items, residual, prices, rng)
+            if layout is None:
+                continue
+            score = layout[0] / (width * length)
+            if choice is None or score > choice[0]:
+                choice = (score, r, layout[1])
+        if choice is None:
+            break  # What is left fits no roll still in stock
+
+        _, r, lanes = choice
+        cut = {}
+        for _, lane_count, counts in lanes:
+            for index, n in counts:
+                cut[index] = cut.get(index, 0) + lane_count * n
+        repeat = min([available[r]] + [residual[index] // n for index, n in cut.items()])
+        available[r] -= repeat
+        for index, n in cut.items():
+            residual[index] -= repeat * n
+        (width, length), _ = rolls[r]
+        used = sum(items[index].area * n for index, n in cut.items())
+        patterns.append((r, lanes, repeat, width * length - used, cut))
+
+    return {
+        "patterns": patterns,
+        "residual": residual,
+        "unmet_area": sum(items[i].area * n for i, n in enumerate(residual)),
+        "waste": sum(repeat * waste for _, _, repeat, waste, _ in patterns),
+        "rolls": sum(repeat for _, _, repeat, _, _ in patterns),
+    }
+
+
+def _layout(width: int, length: int, items: List[_Item], residual: list, prices: list,
+            rng: Optional[random.Random]):
+    """Highest-priced two-stage layout of one roll that does not overshoot the residual demand."""
+    by_width = {}
+    for item in items:
+        if residual[item.index] and item.width <= width and item.length <= length:
+            by_width.setdefault(item.width, []).append(item)
+    if not by_width:
+        return None
+
+    # One lane per width: fill the length greedily, best price per mm first
+    lanes = []
+    for lane_width, candidates in by_width.items():
+        if rng is None:
+            candidates.sort(key=lambda item: -prices[item.index] / item.length)
+        else:
+            candidates.sort(key=lambda item: -prices[item.index] / item.length * rng.uniform(0.85, 1.15))
+        remaining, counts, value = length, [], 0.0
+        for item in candidates:
+            n = min(residual[item.index], remaining // item.length)
+            if n:
+                counts.append((item.index, n))
+                value += n * prices[item.index]
+                remaining -= n * item.length
+        copies = min(min(residual[index] // n for index, n in counts), width // lane_width)
+        lanes.append((lane_width, value, copies, counts))
+
+    # Then the widths: a bounded knapsack over lanes, items split in powers of two
+    step = 0
+    for lane_width, *_ in lanes:
+        step = gcd(step, lane_width)
+    capacity = width // step
+    pieces = []
+    for lane, (lane_width, value, copies, _) in enumerate(lanes):
+        size, remaining = 1, copies
+        while remaining:
+            take = min(size, remaining)
+            pieces.append((lane, take, take * lane_width // step, take * value))
+            remaining -= take
+            size *= 2
+
+    best = [0.0] * (capacity + 1)
+    taken = []
+    for _, _, weight, value in pieces:
+        keep = bytearray(capacity + 1)
+        for c in range(capacity, weight - 1, -1):
+            candidate = best[c - weight] + value
+            if candidate > best[c]:
+                best[c] = candidate
+                keep[c] = 1
+        taken.append(keep)
+
+    c = max(range(capacity + 1), key=best.__getitem__)
+    value = best[c]
+    if value <= 0:
+        return None
+    chosen = {}
+    for piece in range(len(pieces) - 1, -1, -1):
+        if taken[piece][c]:
+            lane, take, weight, _ = pieces[piece]
+            chosen[lane] = chosen.get(lane, 0) + take
+            c -= weight
+    layout = [(lanes[lane][0], copies, lanes[lane][3]) for lane, copies in sorted(chosen.items())]
+    return value, layout
+
+
+def _correct_prices(plan: dict, items: List[_Item], prices: list):
+    # A piece's price moves toward its area scaled up by the scrap of the layouts it was cut in
+    totals = [0.0] * len(items)
+    counts = [0] * len(items)
+    for _, _, repeat, waste, cut in plan['patterns']:
+        used = sum(items[index].area * n for index, n in cut.items())
+        ratio = (used + waste) / used
+        for index, n in cut.items():
+            totals[index] += items[index].area * ratio * n * repeat
+            counts[index] += n * repeat
+    for item in items:
+        if counts[item.index]:
+            prices[item.index] = 0.7 * prices[item.index] + 0.3 * totals[item.index] / counts[item.index]
+        elif plan['residual'][item.index]:
+            prices[item.index] *= 1.2
+
+
+def _describe(plan: dict, items: List[_Item], rolls: list, passes: int, elapsed: float) -> dict:
+    layouts = {}
+    for r, lanes, repeat, waste, _ in plan['patterns']:
+        (width, length), _ = rolls[r]
+        key = (r, tuple((w, copies, tuple(counts)) for w, copies, counts in lanes))
+        if key in layouts:
+            layouts[key]['adet'] += repeat
+            continue
+        used_width = sum(w * copies for w, copies, _ in lanes)
+        layouts[key] = {
+            'ana_en': width / 10,
+            'ana_metre': length / 1000,
+            'adet': repeat,
+            'seritler': [
+                {
+                    'en': w / 10,
+                    'adet': copies,
+                    'parcalar': [{'kesim_boy': items[index].length / 10, 'adet': n} for index, n in counts],
+                }
+                for w, copies, counts in lanes
+            ],
+            'kenar_fire_cm': (width - used_width) / 10,
+            'rulo_fire_m2': round(waste / 1e6, 4),
+            'kullanim_orani': round(1 - waste / (width * length), 4),
+        }
+
+    used_rolls = {}
+    for r, _, repeat, _, _ in plan['patterns']:
+        used_rolls[r] = used_rolls.get(r, 0) + repeat
+    roll_area = sum(rolls[r][0][0] * rolls[r][0][1] * n for r, n in used_rolls.items())
+    return {
+        'rulolar': sorted(layouts.values(), key=lambda layout: (-layout['adet'], layout['ana_en'])),
+        'ana_stok': [
+            {'ana_en': width / 10, 'ana_metre': length / 1000, 'mevcut': count,
+             'kullanilan': used_rolls.get(r, 0)}
+            for r, ((width, length), count) in enumerate(rolls)
+        ],
+        'karsilanamayan': [
+            {'kesim_en': items[i].width / 10, 'kesim_boy': items[i].length / 10, 'adet': n}
+            for i, n in enumerate(plan['residual']) if n
+        ],
+        'toplam_rulo': plan['rolls'],
+        'toplam_fire_m2': round(plan['waste'] / 1e6, 4),
+        'fire_orani': round(plan['waste'] / roll_area, 4) if roll_area else 0,
+        'iterasyon': passes,
+        'sure_ms': round(elapsed * 1000, 1),
+    }
+
+
+def _benchmark(sizes: int, budget_ms: int = 2000):
+    rng = random.Random(42)
+    widths = [25, 30, 40, 50, 60, 75, 100]
+    pieces = [
+        {'kesim_en': rng.choice(widths), 'kesim_boy': rng.choice(range(50, 400, 10)), 'adet': rng.randint(5, 400)}
+        for _ in range(sizes)
+    ]
+    parents = [{'en': 100, 'metre': 50, 'adet': 5000}, {'en': 150, 'metre': 50, 'adet': 5000},
+               {'en': 200, 'metre': 100, 'adet': 5000}]
+    demand_m2 = sum(p['kesim_en'] * p['kesim_boy'] * p['adet'] for p in pieces) / 1e4
+
+    greedy = plan_cuts(parents, pieces, budget_ms=0)
+    plan = plan_cuts(parents, pieces, budget_ms=budget_ms)
+    print(f"{sizes} sizes, {sum(p['adet'] for p in pieces)} pieces, {demand_m2:.0f} m²")
+    for name, result in (("greedy", greedy), ("planned", plan)):
+        print(f"  {name:8} {result['toplam_rulo']:5} rolls, {len(result['rulolar']):4} layouts, "
+              f"scrap {result['toplam_fire_m2']:9.1f} m² ({result['fire_orani']:.2%}), "
+              f"{result['iterasyon']} passes in {result['sure_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
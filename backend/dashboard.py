@@ -0,0 +1,156 @@
+"""Dashboard summary.
+
+`dashboard_summary` holds the figures the home page shows, already added up:
+- "toplam": stock on hand, record counts, raw material balances and the latest rates.
+- "gun:YYYY-MM-DD" and "ay:YYYY-MM": production, shipments, cuts, consumption and raw
+  material spend of one day or month, keyed by the record's own date.
+
+Every write moves the affected documents with $inc (and $set for the rates) in one
+bulk write. /api/dashboard fetches the total, today and this month by _id in a single
+query. Stock follows the ledger: every ledger movement moves the Normal or Kesilmiş
+total with it.
+"""
+import logging
+import re
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from config import PLANT_UTC_OFFSET_HOURS
+from database import db
+
+# Home page raw material groups: a name belongs to the first group whose words it all
+# contains, in this order, as on the page
+RAW_MATERIAL_GROUPS = [
+    ('gaz', ('gaz',)),
+    ('petkim', ('pet',)),
+    ('estol', ('estol',)),
+    ('talk', ('talk',)),
+    ('masura100', ('masura', '100')),
+    ('masura120', ('masura', '120')),
+    ('masura150', ('masura', '150')),
+    ('masura200', ('masura', '200')),
+    ('sari', ('sarı',)),
+    ('sari', ('sari',)),
+]
+MASURA = re.compile(r'(100|120|150|200)')
+
+PERIOD_FIELDS = (
+    'uretim_kayit', 'uretim_adet', 'uretim_m2', 'sevkiyat_kayit', 'sevkiyat_adet', 'sevkiyat_m2',
+    'kesim_kayit', 'kesim_adet', 'tuketim_kg', 'hammadde_tl'
+)
+TOTAL_FIELDS = (
+    'normal_stok', 'kesilmis_stok', 'uretim_kayit', 'sevkiyat_kayit', 'kesim_kayit',
+    *sorted({f'hammadde_{group}' for group, _ in RAW_MATERIAL_GROUPS})
+)
+
+
+def raw_material_group(malzeme_adi: str) -> Optional[str]:
+    name = (malzeme_adi or '').lower()
+    return next((group for group, words in RAW_MATERIAL_GROUPS if all(w in name for w in words)), None)
+
+
+# Each movement: (record date, amounts for its day and month, amounts for the totals)
+def production_amounts(prod: dict, sign: int = 1) -> tuple:
+    total = {'uretim_kayit': sign}
+    masura = MASURA.search(prod.get('masura_tipi') or '')
+    if masura:
+        total[f"hammadde_masura{masura.group(1)}"] = -sign * prod['adet']
+    period = {'uretim_kayit': sign, 'uretim_adet': sign * prod['adet'], 'uretim_m2': sign * prod.get('metrekare', 0)}
+    return prod['tarih'], period, total
+
+def shipment_amounts(ship: dict, sign: int = 1) -> tuple:
+    period = {'sevkiyat_kayit': sign, 'sevkiyat_adet': sign * ship['adet'], 'sevkiyat_m2': sign * ship.get('metrekare', 0)}
+    return ship['tarih'], period, {'sevkiyat_kayit': sign}
+
+def cut_amounts(cut: dict, sign: int = 1) -> tuple:
+    return cut['tarih'], {'kesim_kayit': sign, 'kesim_adet': sign * cut['kesim_adet']}, {'kesim_kayit': sign}
+
+def raw_material_amounts(raw: dict, sign: int = 1) -> tuple:
+    group = raw_material_group(raw.get('malzeme_adi'))
+    total = {f'hammadde_{group}': sign * raw['miktar']} if group else {}
+    return raw['giris_tarihi'], {'hammadde_tl': sign * raw.get('tl_tutar', 0)}, total
+
+def consumption_amounts(cons: dict, sign: int = 1) -> tuple:
+    total = {
+        'hammadde_petkim': -sign * cons.get('toplam_petkim_tuketim', 0),
+        'hammadde_estol': -sign * cons.get('toplam_estol_tuketim', 0),
+        'hammadde_talk': -sign * cons.get('toplam_talk_tuketim', 0),
+    }
+    return cons['tarih'], {'tuketim_kg': sign * cons.get('toplam_petkim_tuketim', 0)}, total
+
+
+async def move_dashboard(movement: tuple):
+    tarih, period, total = movement
+    updates = [
+        UpdateOne({"_id": f"gun:{tarih[:10]}"}, {"$inc": period}, upsert=True),
+        UpdateOne({"_id": f"ay:{tarih[:7]}"}, {"$inc": period}, upsert=True),
+    ]
+    if total:
+        updates.append(UpdateOne({"_id": "toplam"}, {"$inc": total}, upsert=True))
+    await db.dashboard_summary.bulk_write(updates, ordered=False)
+
+async def move_dashboard_stock(key: str, adet: int):
+    field = 'normal_stok' if key.startswith('Normal_') else 'kesilmis_stok'
+    await db.dashboard_summary.update_one({"_id": "toplam"}, {"$inc": {field: adet}}, upsert=True)
+
+async def set_dashboard_rates(rate: dict):
+    await db.dashboard_summary.update_one({"_id": "toplam"}, {"$set": {"son_kurlar": {
+        "usd_rate": rate['usd_rate'], "eur_rate": rate['eur_rate'], "updated_at": rate['updated_at']
+    }}}, upsert=True)
+
+
+def plant_today() -> datetime:
+    # The one plant-time "today": day buckets here, the forecast and report defaults all use it
+    return datetime.now(timezone.utc) + timedelta(hours=PLANT_UTC_OFFSET_HOURS)
+
+async def get_dashboard() -> dict:
+    today = plant_today()
+    day, month = f"gun:{today.strftime('%Y-%m-%d')}", f"ay:{today.strftime('%Y-%m')}"
+    docs = {doc.pop('_id'): doc async for doc in db.dashboard_summary.find({"_id": {"$in": ["toplam", day, month]}})}
+    total = docs.get("toplam", {})
+    return {
+        "tarih": today.strftime('%Y-%m-%d'),
+        "bugun": {field: docs.get(day, {}).get(field, 0) for field in PERIOD_FIELDS},
+        "bu_ay": {field: docs.get(month, {}).get(field, 0) for field in PERIOD_FIELDS},
+        "toplam": {field: total.get(field, 0) for field in TOTAL_FIELDS},
+        "son_kurlar": total.get("son_kurlar"),
+    }
+
+
+async def init_dashboard():
+    if await db.dashboard_summary.find_one({"_id": "toplam"}, {"_id": 1}):
+        return
+
+    # First start: fold the history the same way the writes do, then $setOnInsert it
+    docs = {"toplam": {}}
+    def fold(movement: tuple):
+        tarih, period, total = movement
+        for doc_id, amounts in ((f"gun:{tarih[:10]}", period), (f"ay:{tarih[:7]}", period), ("toplam", total)):
+            doc = docs.setdefault(doc_id, {})
+            for field, value in amounts.items():
+                doc[field] = doc.get(field, 0) + value
+
+    sources = (
+        (db.productions, production_amounts), (db.shipments, shipment_amounts),
+        (db.cut_products, cut_amounts), (db.raw_materials, raw_material_amounts),
+        (db.daily_consumptions, consumption_amounts),
+    )
+    for collection, amounts in sources:
+        async for doc in collection.find({}, {"_id": 0}):
+            if amounts is cut_amounts and 'kesim_adet' not in doc:
+                continue  # Old-format cuts are not part of the stock either
+            fold(amounts(doc))
+
+    total = docs["toplam"]
+    async for entry in db.stock_ledger.find({}, {"_id": 0, "key": 1, "adet": 1}):
+        field = 'normal_stok' if entry['key'].startswith('Normal_') else 'kesilmis_stok'
+        total[field] = total.get(field, 0) + entry['adet']
+    rates = await db.currency_rates.find({}, {"_id": 0}).sort("updated_at", -1).limit(1).to_list(1)
+    if rates:
+        total["son_kurlar"] = {k: rates[0][k] for k in ('usd_rate', 'eur_rate', 'updated_at')}
+
+    for doc_id, doc in docs.items():
+        await db.dashboard_summary.update_one({"_id": doc_id}, {"$setOnInsert": doc}, upsert=True)
+    logging.info(f"Dashboard summary seeded ({len(docs)} documents)")
@@ -0,0 +1,53 @@
+"""MongoDB connection.
+
+`db` stands in for the database and connects on first use, so modules can import it
+at load time while create_app() (or a test, through use_database) decides what it
+points at.
+"""
+import os
+
+import config  # noqa: F401  (loads .env)
+
+client = None
+
+
+class _Database:
+    def __init__(self):
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            connect()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+db = _Database()
+
+
+def connect():
+    global client
+    if db._target is None:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from slowqueries import slow_query_listener
+        from tracing import tracing_listener
+
+        client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'], event_listeners=[slow_query_listener, tracing_listener]
+        )
+        db._target = client[os.environ['DB_NAME']]
+    return db._target
+
+
+def use_database(database):
+    db._target = database
+
+
+def close():
+    if client is not None:
+        client.close()
@@ -0,0 +1,234 @@
+"""Excel (xlsx) exports.
+
+Workbooks are written by xlsxwriter in constant-memory mode: each row goes to a
+temporary file as soon as the next one starts, so memory stays flat however many
+rows there are. The writers run in the job process pool. For collections the worker
+reads MongoDB itself through a batched cursor rather than receiving every document
+from the server process.
+
+xlsxwriter is optional; without it the export endpoints answer 503.
+
+Row count vs. peak RSS of the worker:
+
+    python export.py 500000
+"""
+import importlib.util
+import os
+import resource
+import sys
+import time
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+
+# Number formats. Excel renders the separators in the reader's locale.
+INT = '#,##0'
+DEC = '#,##0.00'
+KG = '#,##0.00 "kg"'
+TL = '#,##0.00 "₺"'
+RATE = '#,##0.0000'
+DATE = 'dd.mm.yyyy'
+
+
+class Column(NamedTuple):
+    field: str
+    header: str
+    num_format: Optional[str] = None
+
+
+class ExportSpec(NamedTuple):
+    collection: str
+    sheet: str
+    date_field: str
+    columns: List[Column]
+    defaults: dict = {}
+
+
+PRODUCT_DEFAULTS = {'urun_tipi': 'Normal', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'}
+
+# Keyed by the path of the matching list endpoint
+EXPORTS = {
+    "production": ExportSpec("productions", "Üretim", "tarih", [
+        Column('tarih', 'Tarih', DATE),
+        Column('makine', 'Makine'),
+        Column('urun_tipi', 'Ürün Tipi'),
+        Column('kalinlik', 'Kalınlık (mm)'),
+        Column('en', 'En (cm)'),
+        Column('metre', 'Metre', DEC),
+        Column('metrekare', 'Metrekare (m²)', DEC),
+        Column('adet', 'Adet', INT),
+        Column('masura_tipi', 'Masura'),
+        Column('renk_kategori', 'Renk Kategorisi'),
+        Column('renk', 'Renk'),
+    ], PRODUCT_DEFAULTS),
+    "shipment": ExportSpec("shipments", "Sevkiyat", "tarih", [
+        Column('tarih', 'Tarih', DATE),
+        Column('alici_firma', 'Alıcı'),
+        Column('urun_tipi', 'Ürün Tipi'),
+        Column('kalinlik', 'Kalınlık (mm)'),
+        Column('en', 'En (cm)'),
+        Column('metre', 'Metre / Boy', DEC),
+        Column('metrekare', 'Metrekare (m²)', DEC),
+        Column('adet', 'Adet', INT),
+        Column('renk_kategori', 'Renk Kategorisi'),
+        Column('renk', 'Renk'),
+        Column('irsaliye_no', 'İrsaliye No'),
+        Column('arac_plaka', 'Araç Plaka'),
+        Column('sofor', 'Şoför'),
+        Column('cikis_saati', 'Çıkış Saati'),
+    ], PRODUCT_DEFAULTS),
+    "cut-product": ExportSpec("cut_products", "Kesim", "tarih", [
+        Column('tarih', 'Tarih', DATE),
+        Column('ana_kalinlik', 'Ana Kalınlık (mm)'),
+        Column('ana_en', 'Ana En (cm)'),
+        Column('ana_metre', 'Ana Metre', DEC),
+        Column('ana_metrekare', 'Ana Metrekare (m²)', DEC),
+        Column('ana_renk_kategori', 'Ana Renk Kategorisi'),
+        Column('ana_renk', 'Ana Renk'),
+        Column('kullanilan_ana_adet', 'Kullanılan Ana Adet', INT),
+        Column('kesim_kalinlik', 'Kesim Kalınlık (mm)'),
+        Column('kesim_en', 'Kesim En (cm)'),
+        Column('kesim_boy', 'Kesim Boy (cm)'),
+        Column('kesim_renk_kategori', 'Kesim Renk Kategorisi'),
+        Column('kesim_renk', 'Kesim Renk'),
+        Column('kesim_adet', 'Kesilmiş Adet', INT),
+    ], {'ana_renk_kategori': 'Renksiz', 'ana_renk': 'Doğal', 'kesim_renk_kategori': 'Renksiz', 'kesim_renk': 'Doğal'}),
+    "raw-materials": ExportSpec("raw_materials", "Hammadde", "giris_tarihi", [
+        Column('giris_tarihi', 'Giriş Tarihi', DATE),
+        Column('malzeme_adi', 'Malzeme'),
+        Column('birim', 'Birim'),
+        Column('miktar', 'Miktar', DEC),
+        Column('para_birimi', 'Para Birimi'),
+        Column('birim_fiyat', 'Birim Fiyat', DEC),
+        Column('toplam_tutar', 'Toplam Tutar', DEC),
+        Column('kur', 'Kur', RATE),
+        Column('tl_tutar', 'TL Tutar', TL),
+    ]),
+    "daily-consumption": ExportSpec("daily_consumptions", "Günlük Tüketim", "tarih", [
+        Column('tarih', 'Tarih', DATE),
+        Column('makine', 'Makine'),
+        Column('petkim_kg', 'Petkim Giriş (kg)', KG),
+        Column('fire_kg', 'Fire (kg)', KG),
+        Column('toplam_petkim_tuketim', 'Toplam Petkim (kg)', KG),
+        Column('toplam_estol_tuketim', 'Toplam Estol (kg)', KG),
+        Column('toplam_talk_tuketim', 'Toplam Talk (kg)', KG),
+    ]),
+}
+
+STOCK_COLUMNS = [
+    Column('urun_tipi', 'Ürün Tipi'),
+    Column('kalinlik', 'Kalınlık (mm)'),
+    Column('en', 'En (cm)'),
+    Column('boy', 'Boy (cm)'),
+    Column('renk_kategori', 'Renk Kategorisi'),
+    Column('renk', 'Renk'),
+    Column('toplam_metre', 'Toplam Metre', DEC),
+    Column('toplam_metrekare', 'Toplam Metrekare (m²)', DEC),
+    Column('toplam_adet', 'Toplam Adet', INT),
+]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def xlsx_available() -> bool:
+    return importlib.util.find_spec("xlsxwriter") is not None
+
+
+def write_workbook(path: str, sheet: str, columns: List[Column], rows: Iterable[dict],
+                   defaults: Optional[dict] = None) -> int:
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'tmpdir': os.path.dirname(path) or None})
+    worksheet = workbook.add_worksheet(sheet)
+    header = workbook.add_format({'bold': True, 'bg_color': '#DDEBF7', 'border': 1})
+    formats = [workbook.add_format({'num_format': c.num_format}) if c.num_format else None for c in columns]
+    dates = [c.num_format == DATE for c in columns]
+
+    # Constant-memory mode writes row by row, so everything row 0 needs comes first
+    for col, column in enumerate(columns):
+        worksheet.set_column(col, col, max(10, len(column.header) + 2))
+        worksheet.write_string(0, col, column.header, header)
+    worksheet.freeze_panes(1, 0)
+
+    defaults = defaults or {}
+    parsed_dates = {}  # A few thousand distinct days across any number of rows
+    count = 0
+    for count, doc in enumerate(rows, start=1):
+        for col, column in enumerate(columns):
+            value = doc.get(column.field, defaults.get(column.field))
+            if value is None:
+                continue
+            if isinstance(value, str):
+                if dates[col]:
+                    day = parsed_dates.get(value)
+                    if day is None:
+                        day = parsed_dates[value] = _parse_date(value)
+                    if day:
+                        worksheet.write_datetime(count, col, day, formats[col])
+                        continue
+                worksheet.write_string(count, col, value, formats[col])
+            elif isinstance(value, (int, float)):
+                worksheet.write_number(count, col, value, formats[col])
+            else:
+                worksheet.write(count, col, value, formats[col])
+
+    worksheet.autofilter(0, 0, count, len(columns) - 1)
+    workbook.close()
+    return count
+
+
+def _parse_date(value: str):
+    try:
+        return datetime.strptime(value[:10], '%Y-%m-%d')
+    except ValueError:
+        return False
+
+
+def export_collection(key: str, baslangic: Optional[str], bitis: Optional[str], path: str) -> int:
+    """Runs in a worker process with its own synchronous connection."""
+    from pymongo import MongoClient
+
+    spec = EXPORTS[key]
+    query = {}
+    if baslangic:
+        query.setdefault(spec.date_field, {})['$gte'] = baslangic
+    if bitis:
+        query.setdefault(spec.date_field, {})['$lte'] = bitis
+    projection = {"_id": 0, **{column.field: 1 for column in spec.columns}}
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        cursor = client[os.environ['DB_NAME']][spec.collection].find(query, projection, batch_size=5000)
+        return write_workbook(path, spec.sheet, spec.columns, cursor.sort(spec.date_field, 1), spec.defaults)
+    finally:
+        client.close()
+
+
+def export_stock(rows: list, path: str) -> int:
+    return write_workbook(path, "Stok", STOCK_COLUMNS, rows)
+
+
+def _benchmark(rows: int):
+    import tempfile
+
+    def generate():
+        for i in range(rows):
+            yield {
+                'tarih': f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", 'alici_firma': f"Firma {i % 300}",
+                'urun_tipi': 'Normal', 'kalinlik': 2.0, 'en': 100.0, 'metre': 50.0, 'metrekare': 50.0 + i % 7,
+                'adet': i % 20 + 1, 'renk_kategori': 'Renksiz', 'renk': 'Doğal', 'irsaliye_no': f"A-{i}",
+                'arac_plaka': '34 ABC 123', 'sofor': 'Ali', 'cikis_saati': '08:30'
+            }
+
+    spec = EXPORTS["shipment"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shipment.xlsx")
+        start = time.perf_counter()
+        write_workbook(path, spec.sheet, spec.columns, generate(), spec.defaults)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{rows} rows: {elapsed:.1f}s, {size / 1e6:.1f} MB file, peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
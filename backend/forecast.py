@@ -0,0 +1,135 @@
+"""Raw material run-out forecast.
+
+`material_ledger` holds one document per tracked material with the kg bought and
+the kg consumed so far. Raw material and consumption writes $inc it. Consumption
+rates come from the hourly machine buckets over the last FORECAST_WINDOW_DAYS. After
+every such write the forecast (on hand, daily rate per machine, days of cover,
+run-out and reorder dates) is recomputed from those few documents into
+`material_forecast`, so /api/forecast/materials is a plain read.
+
+Purchases are matched to materials by name ("PETKİM LDPE" counts as petkim) and only
+when entered in kilograms.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from config import FORECAST_WINDOW_DAYS, REORDER_LEAD_DAYS
+from dashboard import plant_today
+from database import db
+from search import fold
+
+# kg of each material per kg of petkim consumed, as recorded by DailyConsumption
+MATERIALS = {
+    'petkim': ('toplam_petkim_tuketim', 1.0),
+    'estol': ('toplam_estol_tuketim', 0.03),
+    'talk': ('toplam_talk_tuketim', 0.015),
+}
+
+_refresh_lock = asyncio.Lock()
+
+
+def material_key(malzeme_adi: str) -> Optional[str]:
+    name = fold(malzeme_adi or '')
+    return next((material for material in MATERIALS if material in name), None)
+
+
+async def move_material_purchase(raw: dict, sign: int = 1):
+    material = material_key(raw.get('malzeme_adi'))
+    if material is None or raw.get('birim') != 'Kilogram':
+        return
+    await db.material_ledger.update_one(
+        {"_id": material}, {"$inc": {"alinan_kg": sign * raw['miktar']}}, upsert=True
+    )
+
+async def move_material_consumption(cons: dict, sign: int = 1):
+    await db.material_ledger.bulk_write([
+        UpdateOne({"_id": material}, {"$inc": {"tuketilen_kg": sign * cons.get(field, 0)}}, upsert=True)
+        for material, (field, _) in MATERIALS.items()
+    ])
+
+
+async def refresh_material_forecast():
+    async with _refresh_lock:
+        await db.material_forecast.bulk_write([
+            ReplaceOne({"malzeme": doc['malzeme']}, doc, upsert=True) for doc in await compute_material_forecast()
+        ])
+
+async def compute_material_forecast() -> list:
+    today = plant_today()
+    window_start = (today - timedelta(days=FORECAST_WINDOW_DAYS - 1)).strftime('%Y-%m-%d')
+    ledger = {doc['_id']: doc async for doc in db.material_ledger.find({})}
+    buckets = await db.machine_buckets.find(
+        {"tarih": {"$gte": window_start, "$lte": today.strftime('%Y-%m-%d')}, "tuketim_kg": {"$gt": 0}},
+        {"_id": 0, "makine": 1, "tarih": 1, "tuketim_kg": 1}
+    ).to_list(None)
+
+    # A plant younger than the window is averaged over the days it has run
+    first_day = min((bucket['tarih'] for bucket in buckets), default=None)
+    days = FORECAST_WINDOW_DAYS
+    if first_day is not None:
+        days = min(days, (today.date() - datetime.strptime(first_day, '%Y-%m-%d').date()).days + 1)
+    per_machine = {}
+    for bucket in buckets:
+        per_machine[bucket['makine']] = per_machine.get(bucket['makine'], 0) + bucket['tuketim_kg']
+
+    forecasts = []
+    for material, (_, share) in MATERIALS.items():
+        entry = ledger.get(material, {})
+        on_hand = entry.get('alinan_kg', 0) - entry.get('tuketilen_kg', 0)
+        machines = [
+            {"makine": makine, "gunluk_tuketim_kg": round(total * share / days, 3)}
+            for makine, total in sorted(per_machine.items())
+        ]
+        daily = sum(total * share for total in per_machine.values()) / days
+        forecast = {
+            "malzeme": material,
+            "eldeki_kg": round(on_hand, 3),
+            "gunluk_tuketim_kg": round(daily, 3),
+            "makineler": machines,
+            "kalan_gun": None,
+            "tukenme_tarihi": None,
+            "siparis_tarihi": None,
+            "pencere_gun": days,
+            "hesaplanma": today.strftime('%Y-%m-%d'),
+        }
+        if daily > 0:
+            cover = max(on_hand, 0) / daily
+            forecast["kalan_gun"] = round(cover, 1)
+            forecast["tukenme_tarihi"] = (today + timedelta(days=cover)).strftime('%Y-%m-%d')
+            forecast["siparis_tarihi"] = (today + timedelta(days=max(cover - REORDER_LEAD_DAYS, 0))).strftime('%Y-%m-%d')
+        forecasts.append(forecast)
+    return forecasts
+
+async def get_material_forecast() -> list:
+    forecasts = await db.material_forecast.find({}, {"_id": 0}).sort("malzeme", 1).to_list(None)
+    # Rates are per plant day; the first read of a new day rolls the window forward
+    today = plant_today().strftime('%Y-%m-%d')
+    if len(forecasts) != len(MATERIALS) or any(forecast['hesaplanma'] != today for forecast in forecasts):
+        await refresh_material_forecast()
+        forecasts = await db.material_forecast.find({}, {"_id": 0}).sort("malzeme", 1).to_list(None)
+    return forecasts
+
+
+async def init_material_forecast():
+    await db.material_forecast.create_index("malzeme", unique=True)
+
+    if await db.material_ledger.estimated_document_count() == 0:
+        # Seeded from history with $setOnInsert, like the machine buckets
+        totals = {material: {"alinan_kg": 0, "tuketilen_kg": 0} for material in MATERIALS}
+        async for raw in db.raw_materials.find({"birim": "Kilogram"}, {"_id": 0, "malzeme_adi": 1, "miktar": 1}):
+            material = material_key(raw.get('malzeme_adi'))
+            if material is not None:
+                totals[material]["alinan_kg"] += raw['miktar']
+        projection = {"_id": 0, **{field: 1 for field, _ in MATERIALS.values()}}
+        async for cons in db.daily_consumptions.find({}, projection):
+            for material, (field, _) in MATERIALS.items():
+                totals[material]["tuketilen_kg"] += cons.get(field, 0)
+        for material, amounts in totals.items():
+            await db.material_ledger.update_one({"_id": material}, {"$setOnInsert": amounts}, upsert=True)
+        logging.info("Material ledger seeded from purchases and consumption history")
+
+    await refresh_material_forecast()
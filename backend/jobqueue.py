@@ -0,0 +1,198 @@
+"""Background jobs for heavy reports.
+
+POST /api/jobs/{report} records a job in `jobs` and queues it. A few consumer tasks
+take jobs off the queue, load the inputs from MongoDB and hand the CPU-heavy part
+to a bounded process pool, so the event loop serving stock and entry forms never
+runs it. The job record carries status, progress, where the result can be fetched
+and when it expires; TTL indexes remove the record and its result after that.
+
+The queue lives in the worker process that accepted the job. Jobs left queued or
+running by a worker that is gone are marked failed at startup.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+import socket
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+import reports
+from archive import load_movements
+from config import JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL_HOURS
+from core import fill_product_defaults
+from database import db
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+class Report(NamedTuple):
+    load: Callable[[dict], Awaitable]  # Gathers the inputs, in the server process
+    compute: Callable  # Module-level function of (inputs, params), run in a worker process
+    params: Tuple[str, ...] = ()
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+async def load_stock_movements(params: dict):
+    return await load_movements(db)
+
+async def load_productions(params: dict) -> list:
+    query = {}
+    if params.get('baslangic') or params.get('bitis'):
+        query['tarih'] = {}
+        if params.get('baslangic'):
+            query['tarih']['$gte'] = params['baslangic']
+        if params.get('bitis'):
+            query['tarih']['$lte'] = params['bitis']
+    productions = await db.productions.find(query, {"_id": 0}).to_list(None)
+    return [fill_product_defaults(prod) for prod in productions]
+
+
+REPORTS: Dict[str, Report] = {
+    "stock": Report(load_stock_movements, reports.stock_report),
+    "production-summary": Report(load_productions, reports.production_summary, ('baslangic', 'bitis')),
+}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRunner:
+    def __init__(self, db, reports: Dict[str, Report], workers: int, queue_size: int, ttl_seconds: float):
+        self.db = db
+        self.reports = reports
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def start(self):
+        await self.db.jobs.create_index("id", unique=True)
+        await self.db.jobs.create_index("expires_at", expireAfterSeconds=0)
+        await self.db.job_results.create_index("job_id", unique=True)
+        await self.db.job_results.create_index("expires_at", expireAfterSeconds=0)
+        await self._fail_orphans()
+
+        self._queue = asyncio.Queue(self.queue_size)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        # Whatever was still queued or running here will never finish
+        await self.db.jobs.update_many(
+            {"owner": self.owner, "status": {"$in": ACTIVE_STATUSES}},
+            {"$set": {"status": "failed", "error": "Interrupted by shutdown", "finished_at": _now()}}
+        )
+
+    async def submit(self, report: str, params: dict, username: str) -> Job:
+        if self._queue is None or self._queue.full():
+            raise JobQueueFull()
+        job = Job(
+            report=report,
+            params=params,
+            created_by=username,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        )
+        doc = job.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        doc['owner'] = self.owner
+        await self.db.jobs.insert_one(doc)
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.db.jobs.find_one({"id": job_id}, {"_id": 0, "owner": 0})
+
+    async def result(self, job_id: str):
+        doc = await self.db.job_results.find_one({"job_id": job_id}, {"_id": 0, "data": 1})
+        return None if doc is None else doc['data']
+
+    async def run_in_pool(self, fn: Callable, *args):
+        # For endpoints that wait on CPU-heavy work themselves; shares the jobs' worker bound
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Created on the first job so workers that never run one never fork.
+        # Spawned children import only `reports`, not the server and its connections.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def _consume(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception(f"Job {job_id} failed")
+                await self._update(job_id, status="failed", error=str(e) or type(e).__name__, finished_at=_now())
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.db.jobs.find_one({"id": job_id}, {"_id": 0})
+        if job is None:
+            return
+        report = self.reports[job['report']]
+
+        # Progress moves in stages: the worker process cannot report from inside a computation
+        await self._update(job_id, status="running", progress=10, started_at=_now())
+        inputs = await report.load(job['params'])
+        await self._update(job_id, progress=40)
+        result = await self.run_in_pool(report.compute, inputs, job['params'])
+        await self._update(job_id, progress=90)
+        await self.db.job_results.replace_one(
+            {"job_id": job_id},
+            {"job_id": job_id, "data": result, "expires_at": job['expires_at']},
+            upsert=True
+        )
+        await self._update(
+            job_id, status="done", progress=100, finished_at=_now(), result_url=f"/api/jobs/{job_id}/result"
+        )
+
+    async def _update(self, job_id: str, **fields):
+        await self.db.jobs.update_one({"id": job_id}, {"$set": fields})
+
+    async def _fail_orphans(self):
+        host = self.owner.rsplit(":", 1)[0]
+        orphans = await self.db.jobs.find(
+            {"owner": {"$regex": f"^{re.escape(host)}:"}, "status": {"$in": ACTIVE_STATUSES}},
+            {"_id": 0, "id": 1, "owner": 1}
+        ).to_list(None)
+        for job in orphans:
+            if not _pid_alive(int(job['owner'].rsplit(":", 1)[1])):
+                await self._update(job['id'], status="failed", error="Worker exited before the job finished",
+                                   finished_at=_now())
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+job_runner = JobRunner(db, REPORTS, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL_HOURS * 3600)
@@ -0,0 +1,135 @@
+"""Stock ledger.
+
+One document per SKU holding the available adet and a version counter. Reservations
+read the SKU, check availability and write back conditioned on the version they read,
+retrying on conflict, so concurrent writers only contend when they touch the same SKU.
+"""
+import asyncio
+import logging
+import random
+
+from fastapi import HTTPException
+
+from archive import load_movements
+from config import STOCK_RESERVE_RETRIES
+from core import invalidation_bus
+from dashboard import move_dashboard_stock
+from database import db
+from stock import compute_stock, normal_stock_key, cut_stock_key
+
+
+def normal_stock_fields(kalinlik: float, en: float, renk_kategori: str, renk: str) -> dict:
+    return {
+        'urun_tipi': 'Normal',
+        'kalinlik': float(kalinlik),
+        'en': float(en),
+        'boy': None,
+        'renk_kategori': renk_kategori,
+        'renk': renk
+    }
+
+def cut_stock_fields(kalinlik: float, en: float, boy: float, renk_kategori: str, renk: str) -> dict:
+    return {
+        'urun_tipi': 'Kesilmiş',
+        'kalinlik': float(kalinlik),
+        'en': float(en),
+        'boy': float(boy),
+        'renk_kategori': renk_kategori,
+        'renk': renk
+    }
+
+async def add_stock(key: str, fields: dict, adet: int):
+    # Unconditional movement (production, reversal of a deleted shipment, ...)
+    await db.stock_ledger.update_one(
+        {"key": key},
+        {"$inc": {"adet": adet, "version": 1}, "$setOnInsert": {"key": key, **fields}},
+        upsert=True
+    )
+    invalidation_bus.publish("stock_ledger")
+    await move_dashboard_stock(key, adet)
+
+async def reserve_stock(key: str, adet: int):
+    if adet <= 0:
+        return
+    
+    for attempt in range(STOCK_RESERVE_RETRIES):
+        entry = await db.stock_ledger.find_one({"key": key}, {"_id": 0, "adet": 1, "version": 1})
+        available = entry['adet'] if entry else 0
+        if available < adet:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {key}: available {available}, requested {adet}"
+            )
+        
+        result = await db.stock_ledger.update_one(
+            {"key": key, "version": entry['version']},
+            {"$inc": {"adet": -adet, "version": 1}}
+        )
+        if result.modified_count == 1:
+            invalidation_bus.publish("stock_ledger")
+            await move_dashboard_stock(key, -adet)
+            return
+        
+        # Someone else moved this SKU between our read and write; back off and re-read
+        await asyncio.sleep(random.uniform(0, 0.005 * (attempt + 1)))
+    
+    raise HTTPException(status_code=409, detail=f"Stock for {key} is busy, please retry")
+
+async def take_back_stock(key: str, adet: int):
+    # Undoing stock that was added (a production or cut deleted or made smaller): only what
+    # is still on hand can come back out, or the ledger would go negative
+    try:
+        await reserve_stock(key, adet)
+    except HTTPException as e:
+        if e.status_code != 400:
+            raise
+        raise HTTPException(status_code=409, detail=f"{e.detail}; the rest has already been shipped or cut") from e
+
+async def resolve_shipment_stock_key(ship: dict) -> str:
+    renk_kategori = ship.get('renk_kategori', 'Renksiz')
+    renk = ship.get('renk', 'Doğal')
+    
+    if ship.get('urun_tipi', 'Normal') != 'Kesilmiş':
+        return normal_stock_key(ship['kalinlik'], ship['en'], renk_kategori, renk)
+    
+    # For kesilmiş ürün, metre field contains boy in CM
+    key = cut_stock_key(ship['kalinlik'], ship['en'], ship['metre'], renk_kategori, renk)
+    if await db.stock_ledger.find_one({"key": key}, {"_id": 1}):
+        return key
+    
+    # Same 1cm tolerance as the stock report, which takes the first SKU it saw; ledger
+    # entries are created in that order (seeded from the history, then upserted as SKUs appear)
+    near = await db.stock_ledger.find_one({
+        "urun_tipi": "Kesilmiş",
+        "kalinlik": float(ship['kalinlik']),
+        "en": float(ship['en']),
+        "boy": {"$gte": float(ship['metre']) - 1, "$lte": float(ship['metre']) + 1}
+    }, {"_id": 0, "key": 1}, sort=[("_id", 1)])
+    return near['key'] if near else key
+
+def production_stock_key(prod: dict) -> str:
+    return normal_stock_key(prod['kalinlik'], prod['en'], prod.get('renk_kategori', 'Renksiz'), prod.get('renk', 'Doğal'))
+
+async def move_production_stock(prod: dict, adet: int):
+    fields = normal_stock_fields(prod['kalinlik'], prod['en'], prod.get('renk_kategori', 'Renksiz'), prod.get('renk', 'Doğal'))
+    await add_stock(production_stock_key(prod), fields, adet)
+
+async def init_stock_ledger():
+    await db.stock_ledger.create_index("key", unique=True)
+    await db.stock_ledger.create_index([("urun_tipi", 1), ("kalinlik", 1), ("en", 1), ("boy", 1)])
+    
+    if await db.stock_ledger.estimated_document_count() > 0:
+        return
+    
+    # First start with the ledger: seed it from the movement history
+    productions, shipments, cut_products = await load_movements(db)
+    
+    for key, stock in compute_stock(productions, shipments, cut_products).items():
+        fields = {k: stock[k] for k in ('urun_tipi', 'kalinlik', 'en', 'boy', 'renk_kategori', 'renk')}
+        await db.stock_ledger.update_one(
+            {"key": key},
+            {"$setOnInsert": {"key": key, **fields, "adet": stock['toplam_adet'], "version": 0}},
+            upsert=True
+        )
+    invalidation_bus.publish("stock_ledger")
+    logging.info("Stock ledger seeded from movement history")
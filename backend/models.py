@@ -0,0 +1,490 @@
+"""Request and response models."""
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, ConfigDict
+
+# Set while a pushed offline mutation creates its record: the record takes the id derived
+# from the mutation's idempotency key, so a retry can find what an earlier attempt wrote
+assigned_record_id: ContextVar[Optional[str]] = ContextVar('assigned_record_id', default=None)
+
+def new_record_id() -> str:
+    return assigned_record_id.get() or str(uuid.uuid4())
+
+
+# Auth Models
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    username: str
+    password_hash: str
+    role: str  # "admin" or "viewer"
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class UserCreate(BaseModel):
+    username: str
+    password: str
+    role: str = "viewer"
+
+class UserLogin(BaseModel):
+    username: str
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+    role: str
+    username: str
+
+class UserInfo(BaseModel):
+    id: str
+    username: str
+    role: str
+    created_at: datetime
+
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+
+# Production Models
+class Production(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=new_record_id)
+    tarih: str
+    makine: str
+    kalinlik: float
+    en: float
+    metre: float
+    metrekare: float
+    adet: int
+    masura_tipi: str
+    renk_kategori: str
+    renk: str
+    urun_tipi: str = "Normal"
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ProductionCreate(BaseModel):
+    tarih: str
+    makine: str
+    kalinlik: float
+    en: float
+    metre: float
+    metrekare: float
+    adet: int
+    masura_tipi: str
+    renk_kategori: str
+    renk: str
+
+class ProductionUpdate(BaseModel):
+    tarih: Optional[str] = None
+    makine: Optional[str] = None
+    kalinlik: Optional[float] = None
+    en: Optional[float] = None
+    metre: Optional[float] = None
+    metrekare: Optional[float] = None
+    adet: Optional[int] = None
+    masura_tipi: Optional[str] = None
+    renk_kategori: Optional[str] = None
+    renk: Optional[str] = None
+
+
+# Shipment Models
+class Shipment(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=new_record_id)
+    tarih: str
+    alici_firma: str
+    urun_tipi: str
+    kalinlik: float
+    en: float
+    metre: float
+    metrekare: float
+    adet: int
+    renk_kategori: str
+    renk: str
+    irsaliye_no: str
+    arac_plaka: str
+    sofor: str
+    cikis_saati: str
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ShipmentCreate(BaseModel):
+    tarih: str
+    alici_firma: str
+    urun_tipi: str
+    kalinlik: float
+    en: float
+    metre: float
+    metrekare: float
+    adet: int
+    renk_kategori: str
+    renk: str
+    irsaliye_no: str
+    arac_plaka: str
+    sofor: str
+    cikis_saati: str
+
+class ShipmentUpdate(BaseModel):
+    tarih: Optional[str] = None
+    alici_firma: Optional[str] = None
+    urun_tipi: Optional[str] = None
+    kalinlik: Optional[float] = None
+    en: Optional[float] = None
+    metre: Optional[float] = None
+    metrekare: Optional[float] = None
+    adet: Optional[int] = None
+    renk_kategori: Optional[str] = None
+    renk: Optional[str] = None
+    irsaliye_no: Optional[str] = None
+    arac_plaka: Optional[str] = None
+    sofor: Optional[str] = None
+    cikis_saati: Optional[str] = None
+
+
+# Cut Product Models
+class CutProduct(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=new_record_id)
+    tarih: str
+    ana_kalinlik: float
+    ana_en: float
+    ana_metre: float
+    ana_metrekare: float
+    ana_renk_kategori: str
+    ana_renk: str
+    kesim_kalinlik: float
+    kesim_en: float
+    kesim_boy: float
+    kesim_renk_kategori: str
+    kesim_renk: str
+    kesim_adet: int
+    kullanilan_ana_adet: int
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class CutProductCreate(BaseModel):
+    tarih: str
+    ana_kalinlik: float
+    ana_en: float
+    ana_metre: float
+    ana_metrekare: float
+    ana_renk_kategori: str
+    ana_renk: str
+    kesim_kalinlik: float
+    kesim_en: float
+    kesim_boy: float
+    kesim_renk_kategori: str
+    kesim_renk: str
+    kesim_adet: int
+    kullanilan_ana_adet: int
+
+
+# Cut planning
+class CutPlanPiece(BaseModel):
+    kesim_en: float = Field(gt=0)  # cm
+    kesim_boy: float = Field(gt=0)  # cm
+    adet: int = Field(gt=0)
+
+class CutPlanRequest(BaseModel):
+    kalinlik: float
+    renk_kategori: str = 'Renksiz'
+    renk: str = 'Doğal'
+    parcalar: List[CutPlanPiece] = Field(min_length=1, max_length=2000)
+    sure_limiti_ms: int = Field(1000, ge=50, le=10000)  # Time budget of the optimizer
+
+class CutPlanLanePiece(BaseModel):
+    kesim_boy: float
+    adet: int  # Per lane
+
+class CutPlanLane(BaseModel):
+    en: float
+    adet: int  # Lanes of this width per roll
+    parcalar: List[CutPlanLanePiece]
+
+class CutPlanRoll(BaseModel):
+    ana_en: float
+    ana_metre: float
+    adet: int  # Rolls cut with this layout
+    seritler: List[CutPlanLane]
+    kenar_fire_cm: float
+    rulo_fire_m2: float  # Per roll
+    kullanim_orani: float
+
+class CutPlanStock(BaseModel):
+    ana_en: float
+    ana_metre: float
+    mevcut: int
+    kullanilan: int
+
+class CutPlan(BaseModel):
+    rulolar: List[CutPlanRoll]
+    ana_stok: List[CutPlanStock]
+    karsilanamayan: List[CutPlanPiece]  # No roll in stock left for these
+    toplam_rulo: int
+    toplam_fire_m2: float
+    fire_orani: float
+    iterasyon: int
+    sure_ms: float
+
+
+# Stock Model
+class Stock(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    urun_tipi: str
+    kalinlik: float
+    en: float
+    boy: Optional[float] = None
+    renk_kategori: str
+    renk: str
+    toplam_metre: Optional[float] = 0
+    toplam_metrekare: float
+    toplam_adet: int
+
+
+# Currency Rate Models
+class CurrencyRate(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    usd_rate: float  # 1 USD = X TL
+    eur_rate: float  # 1 EUR = X TL
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_by: str
+
+class CurrencyRateUpdate(BaseModel):
+    usd_rate: float
+    eur_rate: float
+
+
+# Raw Material Models
+class RawMaterial(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=new_record_id)
+    giris_tarihi: str
+    malzeme_adi: str
+    birim: str  # "Kilogram", "Adet", "Litre"
+    miktar: float
+    para_birimi: str  # "TL", "USD", "EUR"
+    birim_fiyat: float
+    toplam_tutar: float
+    kur: Optional[float] = 1.0  # Girişte kullanılan kur
+    tl_tutar: float  # TL karşılığı
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class RawMaterialCreate(BaseModel):
+    giris_tarihi: str
+    malzeme_adi: str
+    birim: str
+    miktar: float
+    para_birimi: str
+    birim_fiyat: float
+
+class RawMaterialUpdate(BaseModel):
+    giris_tarihi: Optional[str] = None
+    malzeme_adi: Optional[str] = None
+    birim: Optional[str] = None
+    miktar: Optional[float] = None
+    para_birimi: Optional[str] = None
+    birim_fiyat: Optional[float] = None
+
+
+# Raw material forecast
+class MachineRate(BaseModel):
+    makine: str
+    gunluk_tuketim_kg: float
+
+class MaterialForecast(BaseModel):
+    malzeme: str  # petkim, estol, talk
+    eldeki_kg: float  # Purchased minus consumed
+    gunluk_tuketim_kg: float  # Average over the window
+    makineler: List[MachineRate]
+    kalan_gun: Optional[float] = None  # Days of cover; None without consumption
+    tukenme_tarihi: Optional[str] = None
+    siparis_tarihi: Optional[str] = None  # Run-out minus the purchase lead time
+    pencere_gun: int
+    hesaplanma: str
+
+
+# Unit cost report
+class MaterialPrice(BaseModel):
+    malzeme: str
+    kg_fiyat_tl: Optional[float] = None  # Weighted average of purchases; None if never bought
+
+class UnitCostDay(BaseModel):
+    tarih: str
+    makine: str
+    metrekare: float
+    petkim_kg: float
+    estol_kg: float
+    talk_kg: float
+    maliyet_tl: float  # Consumption priced at the averages current when it was entered
+    m2_maliyet_tl: Optional[float] = None  # None on days without production
+
+class UnitCostReport(BaseModel):
+    baslangic: str
+    bitis: str
+    birim_fiyatlar: List[MaterialPrice]
+    gunler: List[UnitCostDay]
+    toplam_metrekare: float
+    toplam_maliyet_tl: float
+    m2_maliyet_tl: Optional[float] = None
+
+
+# Dashboard
+class DashboardSummary(BaseModel):
+    tarih: str  # Plant day of "bugun"
+    bugun: Dict[str, float]
+    bu_ay: Dict[str, float]
+    toplam: Dict[str, float]  # Stock, record counts and raw material balances
+    son_kurlar: Optional[dict] = None
+
+
+# Daily Consumption Models
+class DailyConsumption(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=new_record_id)
+    tarih: str
+    makine: str  # "Makine 1", "Makine 2"
+    petkim_kg: float  # Manuel giriş
+    fire_kg: float  # Manuel giriş
+    # Otomatik hesaplanan değerler (petkim + fire birlikte)
+    toplam_petkim_tuketim: float  # petkim_kg + fire_kg
+    toplam_estol_tuketim: float  # (petkim_kg + fire_kg) * 0.03
+    toplam_talk_tuketim: float  # (petkim_kg + fire_kg) * 0.015
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class DailyConsumptionCreate(BaseModel):
+    tarih: str
+    makine: str
+    petkim_kg: float
+    fire_kg: float
+
+class DailyConsumptionUpdate(BaseModel):
+    tarih: Optional[str] = None
+    makine: Optional[str] = None
+    petkim_kg: Optional[float] = None
+    fire_kg: Optional[float] = None
+
+
+# Machine Analytics Model
+class MachineAnalytics(BaseModel):
+    makine: str
+    baslangic: str
+    bitis: str
+    toplam_metrekare: float
+    toplam_adet: int
+    aktif_saat: int  # Hours with at least one roll entered
+    metrekare_saat: float  # m² / aktif_saat
+    vardiya_sayisi: int
+    rulo_vardiya: float  # Rolls per worked shift
+    petkim_kg: float
+    fire_kg: float
+    tuketim_kg: float  # petkim_kg + fire_kg
+    fire_orani: Optional[float] = None  # fire_kg / petkim_kg
+    verim_m2_kg: Optional[float] = None  # m² produced per kg consumed
+
+
+# Table pages
+class ProductionPage(BaseModel):
+    items: List[Production]
+    total: int  # Rows matching the filters, over all pages
+    page: int
+    page_size: int
+
+class ShipmentPage(BaseModel):
+    items: List[Shipment]
+    total: int
+    page: int
+    page_size: int
+
+class CutProductPage(BaseModel):
+    items: List[CutProduct]
+    total: int
+    page: int
+    page_size: int
+
+class RawMaterialPage(BaseModel):
+    items: List[RawMaterial]
+    total: int
+    page: int
+    page_size: int
+    toplam_tl: float  # Over all matching purchases
+
+
+# Shipment search
+class ShipmentSearchPage(BaseModel):
+    items: List[Shipment]
+    total: int
+    page: int
+    page_size: int
+
+
+# Catalog facets
+class FacetValue(BaseModel):
+    deger: Union[str, float]
+    sku_sayisi: int
+    toplam_adet: int
+
+class CatalogFacets(BaseModel):
+    urun_tipi: List[FacetValue]
+    kalinlik: List[FacetValue]
+    en: List[FacetValue]
+    boy: List[FacetValue]
+    renk_kategori: List[FacetValue]
+    renk: List[FacetValue]
+
+
+# Background jobs
+class Job(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    report: str
+    params: Dict[str, str] = {}
+    status: str = "queued"  # queued, running, done, failed
+    progress: int = 0  # Percent
+    created_by: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    expires_at: datetime  # Record and result are removed after this
+    result_url: Optional[str] = None
+    error: Optional[str] = None
+
+
+# Offline sync push
+class SyncMutation(BaseModel):
+    key: str = Field(min_length=8, max_length=128)  # Client-generated idempotency key
+    entity: str  # Endpoint name: production, shipment, cut-product, daily-consumption, raw-materials
+    op: str  # create, update, delete
+    id: Optional[str] = None  # Target of update and delete
+    data: dict = {}
+
+class SyncPush(BaseModel):
+    mutations: List[SyncMutation] = Field(max_length=500)
+
+class SyncResult(BaseModel):
+    key: str
+    status: int  # HTTP status the single request would have returned
+    replayed: bool = False  # Already applied by an earlier push; `body` is the stored result
+    body: Optional[Any] = None
+    detail: Optional[Any] = None
+
+
+# Batch reads
+class BatchItem(BaseModel):
+    id: Optional[str] = None  # Echoed back with the result; defaults to the path
+    path: str = Field(pattern=r"^/api/")
+    params: Dict[str, str] = {}  # Query string
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem] = Field(min_length=1, max_length=20)
@@ -0,0 +1,142 @@
+"""Login throttling.
+
+Token buckets per username and per client IP, plus a cap on how many bcrypt
+verifications run at once. Buckets live in a pluggable store: the in-memory store
+is per worker, the Mongo store shares buckets between workers.
+"""
+import math
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Tuple
+
+from pymongo import ReturnDocument
+
+
+class MemoryBucketStore:
+    def __init__(self, max_keys: int = 100_000, prune_every: int = 1000):
+        self.max_keys = max_keys
+        self.prune_every = prune_every
+        # key -> (tokens, updated, when the bucket will be full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._takes_since_prune = 0
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        # Returns 0 when a token was taken, otherwise seconds until one is available
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+
+        # Over the limit, sweep now and then rather than on every call
+        self._takes_since_prune += 1
+        if len(self._buckets) > self.max_keys and self._takes_since_prune >= self.prune_every:
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no state worth keeping. Each bucket
+        # knows its own deadline, as IP and username buckets refill at different rates
+        self._takes_since_prune = 0
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at <= now:
+                del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class MongoBucketStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def init(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.time()
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, refill_per_second]}
+        ]}]}
+        # Refill and take in one atomic pipeline update so workers never race on a bucket
+        doc = await self.collection.find_one_and_update(
+            {"key": key},
+            [
+                {"$set": {"tokens": refilled, "updated": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=capacity / refill_per_second)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc["allowed"]:
+            return 0.0
+        return (1 - doc["tokens"]) / refill_per_second
+
+    def __len__(self):
+        return 0
+
+
+class LoginThrottle:
+    def __init__(self, store, user_capacity: float, user_refill_per_minute: float,
+                 ip_capacity: float, ip_refill_per_minute: float, max_concurrent_verifications: int):
+        self.store = store
+        self.user_capacity = user_capacity
+        self.user_refill = user_refill_per_minute / 60
+        self.ip_capacity = ip_capacity
+        self.ip_refill = ip_refill_per_minute / 60
+        self.max_concurrent_verifications = max_concurrent_verifications
+        self.in_flight_verifications = 0
+        self.counters = {
+            "attempts": 0,
+            "throttled_ip": 0,
+            "throttled_username": 0,
+            "rejected_busy": 0
+        }
+
+    async def check(self, username: str, client_ip: str) -> float:
+        # Returns 0 when the attempt may proceed, otherwise a Retry-After in seconds
+        self.counters["attempts"] += 1
+        retry_after = await self.store.take(f"ip:{client_ip}", self.ip_capacity, self.ip_refill)
+        if retry_after:
+            self.counters["throttled_ip"] += 1
+            return retry_after
+        retry_after = await self.store.take(f"user:{username.lower()}", self.user_capacity, self.user_refill)
+        if retry_after:
+            self.counters["throttled_username"] += 1
+        return retry_after
+
+    def try_acquire_verification(self) -> bool:
+        # Never queue behind a burst: callers get a 429 instead of waiting for a slot.
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self.in_flight_verifications >= self.max_concurrent_verifications:
+            self.counters["rejected_busy"] += 1
+            return False
+        self.in_flight_verifications += 1
+        return True
+
+    def release_verification(self):
+        self.in_flight_verifications -= 1
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight_verifications": self.in_flight_verifications,
+            "max_concurrent_verifications": self.max_concurrent_verifications,
+            "tracked_buckets": len(self.store),
+            "store": type(self.store).__name__
+        }
+
+
+def retry_after_header(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
@@ -0,0 +1,37 @@
+"""Report computations for the background job runner.
+
+These run in job worker processes. Each one is a plain function of plain data and
+the module is cheap to import: the runner loads the inputs in the server process
+and sends them to a worker.
+"""
+from stock import compute_stock
+
+
+def stock_report(movements: tuple, params: dict) -> list:
+    productions, shipments, cut_products = movements
+    return list(compute_stock(productions, shipments, cut_products).values())
+
+
+def production_summary(productions: list, params: dict) -> list:
+    """Monthly totals per machine and SKU."""
+    rows = {}
+    for prod in productions:
+        if prod.get('urun_tipi', 'Normal') != 'Normal':
+            continue
+        key = (
+            prod['tarih'][:7], prod.get('makine', ''), float(prod['kalinlik']), float(prod['en']),
+            prod.get('renk_kategori', 'Renksiz'), prod.get('renk', 'Doğal')
+        )
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                'ay': key[0], 'makine': key[1], 'kalinlik': key[2], 'en': key[3],
+                'renk_kategori': key[4], 'renk': key[5], 'kayit': 0, 'adet': 0, 'metrekare': 0.0
+            }
+        row['kayit'] += 1
+        row['adet'] += prod['adet']
+        row['metrekare'] += prod.get('metrekare', 0)
+
+    for row in rows.values():
+        row['metrekare'] = round(row['metrekare'], 2)
+    return [rows[key] for key in sorted(rows)]
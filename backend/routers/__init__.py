@@ -0,0 +1 @@
+"""Domain routers, mounted under /api by server.create_app()."""
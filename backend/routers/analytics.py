@@ -0,0 +1,103 @@
+"""Dashboard, machine throughput analytics, unit cost report and coalescing metrics."""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from config import SHIFT_LENGTH_HOURS
+from core import stock_flight, analytics_flight
+from costing import unit_cost_report
+from dashboard import get_dashboard, plant_today
+from database import db
+from models import MachineAnalytics, UnitCostReport, DashboardSummary
+from security import get_admin_user, get_viewer_or_admin
+from slowqueries import slow_query_recorder
+
+router = APIRouter()
+
+
+@router.get("/metrics/coalescing")
+async def get_coalescing_metrics(admin_user: dict = Depends(get_admin_user)):
+    return [stock_flight.snapshot(), analytics_flight.snapshot()]
+
+@router.get("/metrics/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=200), admin_user: dict = Depends(get_admin_user)):
+    # Query shapes ranked by total time spent, with the routes that issued them
+    return {
+        **slow_query_recorder.stats(),
+        "offenders": await slow_query_recorder.top_offenders(limit)
+    }
+
+@router.get("/dashboard", response_model=DashboardSummary)
+async def get_dashboard_summary(current_user: dict = Depends(get_viewer_or_admin)):
+    # Kept up to date by the writes; one read of three small documents
+    return await get_dashboard()
+
+@router.get("/analytics/machines", response_model=List[MachineAnalytics])
+async def get_machine_analytics(
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    makine: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    # Default period: current month up to today
+    today = plant_today()
+    baslangic = baslangic or today.strftime('%Y-%m-01')
+    bitis = bitis or today.strftime('%Y-%m-%d')
+    
+    return await analytics_flight.do(
+        f"{baslangic}|{bitis}|{makine}",
+        lambda: load_machine_analytics(baslangic, bitis, makine)
+    )
+
+async def load_machine_analytics(baslangic: str, bitis: str, makine: Optional[str]) -> List[MachineAnalytics]:
+    query = {"tarih": {"$gte": baslangic, "$lte": bitis}}
+    if makine:
+        query["makine"] = makine
+    buckets = await db.machine_buckets.find(query, {"_id": 0}).to_list(None)
+    
+    machines = {}
+    for bucket in buckets:
+        m = machines.setdefault(bucket['makine'], {
+            'metrekare': 0, 'adet': 0, 'petkim_kg': 0, 'fire_kg': 0, 'tuketim_kg': 0,
+            'saatler': 0, 'vardiyalar': set()
+        })
+        for field in ('metrekare', 'adet', 'petkim_kg', 'fire_kg', 'tuketim_kg'):
+            m[field] += bucket.get(field, 0)
+        if bucket.get('adet', 0) > 0:
+            m['saatler'] += 1
+            m['vardiyalar'].add((bucket['tarih'], bucket['saat'] // SHIFT_LENGTH_HOURS))
+    
+    result = []
+    for name, m in sorted(machines.items()):
+        result.append(MachineAnalytics(
+            makine=name,
+            baslangic=baslangic,
+            bitis=bitis,
+            toplam_metrekare=round(m['metrekare'], 2),
+            toplam_adet=m['adet'],
+            aktif_saat=m['saatler'],
+            metrekare_saat=round(m['metrekare'] / m['saatler'], 2) if m['saatler'] else 0,
+            vardiya_sayisi=len(m['vardiyalar']),
+            rulo_vardiya=round(m['adet'] / len(m['vardiyalar']), 2) if m['vardiyalar'] else 0,
+            petkim_kg=round(m['petkim_kg'], 2),
+            fire_kg=round(m['fire_kg'], 2),
+            tuketim_kg=round(m['tuketim_kg'], 2),
+            fire_orani=round(m['fire_kg'] / m['petkim_kg'], 4) if m['petkim_kg'] > 0 else None,
+            verim_m2_kg=round(m['metrekare'] / m['tuketim_kg'], 4) if m['tuketim_kg'] > 0 else None
+        ))
+    
+    return result
+
+
+@router.get("/reports/unit-cost", response_model=UnitCostReport)
+async def get_unit_cost_report(
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    makine: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    # TL per m² per day and machine, from the cost rollups; current month by default
+    today = plant_today()
+    return await unit_cost_report(
+        baslangic or today.strftime('%Y-%m-01'), bitis or today.strftime('%Y-%m-%d'), makine
+    )
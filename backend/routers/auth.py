@@ -0,0 +1,185 @@
+"""Login, the current user and user management."""
+import asyncio
+import logging
+from datetime import datetime
+from ipaddress import ip_address, ip_network
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+
+import config
+from core import parse_fields, field_projection, sparse_response
+from database import db
+from models import User, UserCreate, UserLogin, Token, UserInfo, PasswordChange
+from ratelimit import LoginThrottle, MemoryBucketStore, MongoBucketStore, retry_after_header
+from security import hash_password, verify_password, create_access_token, get_current_user, get_admin_user
+
+router = APIRouter()
+
+login_throttle = LoginThrottle(
+    MemoryBucketStore(),
+    user_capacity=config.LOGIN_USER_BURST,
+    user_refill_per_minute=config.LOGIN_USER_PER_MINUTE,
+    ip_capacity=config.LOGIN_IP_BURST,
+    ip_refill_per_minute=config.LOGIN_IP_PER_MINUTE,
+    max_concurrent_verifications=config.LOGIN_MAX_CONCURRENT_VERIFY
+)
+trusted_proxies = [ip_network(proxy, strict=False) for proxy in config.TRUSTED_PROXIES]
+
+
+async def init_auth():
+    if config.LOGIN_THROTTLE_STORE == 'mongo':
+        # Shared buckets across workers
+        login_throttle.store = MongoBucketStore(db.login_buckets)
+        await login_throttle.store.init()
+    await init_admin()
+
+
+# Initialize admin user
+async def init_admin():
+    admin_exists = await db.users.find_one({"username": "admin"})
+    if not admin_exists:
+        admin_user = User(
+            username="admin",
+            password_hash=hash_password("SAR2025!"),
+            role="admin"
+        )
+        doc = admin_user.model_dump()
+        doc['created_at'] = doc['created_at'].isoformat()
+        await db.users.insert_one(doc)
+        logging.info("Admin user created with secure password")
+
+
+# Auth endpoints
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+def client_ip(request: Request) -> str:
+    # The peer, unless it is one of our proxies. Each proxy appends the address it was
+    # connected from, so walking X-Forwarded-For from the right, the first hop that is not
+    # a proxy of ours is the client; anything further left was sent by the client itself.
+    peer = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for value in request.headers.getlist("x-forwarded-for") for hop in value.split(",")]
+    hops = [hop for hop in hops if hop]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+async def throttle_password_check(username: str, request: Request):
+    # Every bcrypt verification goes through the buckets and the concurrency cap
+    retry_after = await login_throttle.check(username, client_ip(request))
+    if retry_after:
+        raise HTTPException(status_code=429, detail="Too many login attempts", headers=retry_after_header(retry_after))
+    if not login_throttle.try_acquire_verification():
+        raise HTTPException(status_code=429, detail="Login service busy", headers=retry_after_header(1))
+
+@router.post("/auth/login", response_model=Token)
+async def login(user_login: UserLogin, request: Request):
+    await throttle_password_check(user_login.username, request)
+    try:
+        user = await db.users.find_one({"username": user_login.username})
+        # bcrypt is CPU bound; keep it off the event loop
+        valid = bool(user) and await asyncio.to_thread(verify_password, user_login.password, user["password_hash"])
+    finally:
+        login_throttle.release_verification()
+    
+    if not valid:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    
+    access_token = create_access_token(
+        data={"sub": user["username"], "role": user["role"]}
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "role": user["role"],
+        "username": user["username"]
+    }
+
+@router.get("/auth/throttle-stats")
+async def get_login_throttle_stats(admin_user: dict = Depends(get_admin_user)):
+    return login_throttle.stats()
+
+@router.get("/auth/me")
+async def get_me(current_user: dict = Depends(get_current_user)):
+    return current_user
+
+@router.post("/auth/change-password")
+async def change_password(password_data: PasswordChange, request: Request, current_user: dict = Depends(get_current_user)):
+    # Get user from database
+    user = await db.users.find_one({"username": current_user["username"]})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Verify current password, then hash the new one; both are bcrypt, throttled like a login
+    await throttle_password_check(current_user["username"], request)
+    try:
+        valid = await asyncio.to_thread(verify_password, password_data.current_password, user["password_hash"])
+        if valid:
+            new_password_hash = await asyncio.to_thread(hash_password, password_data.new_password)
+    finally:
+        login_throttle.release_verification()
+    if not valid:
+        raise HTTPException(status_code=401, detail="Current password is incorrect")
+    
+    # Update password
+    await db.users.update_one(
+        {"username": current_user["username"]},
+        {"$set": {"password_hash": new_password_hash}}
+    )
+    
+    return {"message": "Password changed successfully"}
+
+# User management (admin only)
+@router.post("/users", response_model=UserInfo)
+async def create_user(user_create: UserCreate, admin_user: dict = Depends(get_admin_user)):
+    # Check if username exists
+    existing = await db.users.find_one({"username": user_create.username})
+    if existing:
+        raise HTTPException(status_code=400, detail="Username already exists")
+    
+    new_user = User(
+        username=user_create.username,
+        password_hash=hash_password(user_create.password),
+        role=user_create.role
+    )
+    
+    doc = new_user.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    await db.users.insert_one(doc)
+    
+    return UserInfo(**new_user.model_dump())
+
+@router.get("/users", response_model=List[UserInfo])
+async def get_users(fields: Optional[str] = None, admin_user: dict = Depends(get_admin_user)):
+    selected = parse_fields(UserInfo, fields)
+    projection = field_projection(selected) if selected else {"_id": 0, "password_hash": 0}
+    users = await db.users.find({}, projection).to_list(1000)
+    
+    for user in users:
+        if isinstance(user.get('created_at'), str):
+            user['created_at'] = datetime.fromisoformat(user['created_at'])
+    
+    if selected:
+        return sparse_response(UserInfo, selected, users)
+    return users
+
+@router.delete("/users/{user_id}")
+async def delete_user(user_id: str, admin_user: dict = Depends(get_admin_user)):
+    # Don't allow deleting admin user
+    user = await db.users.find_one({"id": user_id})
+    if user and user["username"] == "admin":
+        raise HTTPException(status_code=400, detail="Cannot delete admin user")
+    
+    result = await db.users.delete_one({"id": user_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return {"message": "User deleted"}
@@ -0,0 +1,88 @@
+"""Batch reads: several GET endpoints in one round trip.
+
+Each item is dispatched to the app's router as a GET of its own, so it meets the same
+path and query validation, dependencies and handler as a direct request. Items run
+concurrently; the token is checked once for the whole batch.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from models import BatchItem, BatchRequest
+from security import get_current_user, authenticated_as
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Keys of the batch's own scope every item shares; exception handlers turn item errors into JSON
+CONNECTION_SCOPE = (
+    "asgi", "http_version", "scheme", "server", "client", "root_path", "app", "starlette.exception_handlers"
+)
+
+
+@router.post("/batch")
+async def batch(body: BatchRequest, request: Request, current_user: dict = Depends(get_current_user)):
+    with authenticated_as(current_user):
+        results = await asyncio.gather(*(dispatch(request, item) for item in body.requests))
+
+    # Item bodies are already JSON; splice them in rather than parse and re-encode
+    parts = [
+        b'{"id":%s,"status":%d,"body":%s}' % (json.dumps(item.id or item.path).encode(), status, payload)
+        for item, (status, payload) in zip(body.requests, results)
+    ]
+    return Response(b'{"responses":[' + b','.join(parts) + b']}', media_type="application/json")
+
+
+async def dispatch(request: Request, item: BatchItem) -> tuple:
+    if item.path.rstrip("/") == "/api/batch":
+        return 400, b'{"detail":"Batches cannot be nested"}'
+
+    parent = request.scope
+    # Connection details of the batch, the rest as if the item came on its own
+    scope = {key: parent[key] for key in CONNECTION_SCOPE if key in parent}
+    scope.update({
+        "type": "http",
+        "method": "GET",
+        "path": item.path,
+        "raw_path": item.path.encode(),
+        "query_string": urlencode(item.params).encode(),
+        # Only what the handlers read; no Accept-Encoding, the batch response is compressed once
+        "headers": [(k, v) for k, v in parent["headers"] if k in (b"authorization", b"host")],
+        "state": dict(parent.get("state", {})),
+    })
+
+    status, chunks = 500, []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+            if not content_type.startswith(b"application/json"):
+                raise _NotJson()
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app.router(scope, receive, send)
+    except _NotJson:
+        return 415, b'{"detail":"Not a JSON resource; request it directly"}'
+    except StarletteHTTPException as e:
+        # Raised by the router itself (unknown path, wrong method)
+        return e.status_code, json.dumps({"detail": e.detail}).encode()
+    except Exception:
+        logger.exception(f"Batch item {item.path} failed")
+        return 500, b'{"detail":"Internal Server Error"}'
+    return status, b"".join(chunks) or b"null"
+
+
+class _NotJson(Exception):
+    pass
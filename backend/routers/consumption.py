@@ -0,0 +1,116 @@
+"""Daily raw material consumption per machine."""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends
+
+from buckets import move_machine_bucket, consumption_bucket_amounts
+from core import (
+    invalidation_bus, change_seq, record_tombstone,
+    parse_fields, field_projection, sparse_response
+)
+from costing import book_consumption_cost, unbook_consumption_cost
+from dashboard import move_dashboard, consumption_amounts
+from database import db
+from forecast import move_material_consumption, refresh_material_forecast
+from models import DailyConsumption, DailyConsumptionCreate, DailyConsumptionUpdate
+from security import get_admin_user, get_viewer_or_admin
+
+router = APIRouter()
+
+
+@router.post("/daily-consumption")
+async def create_daily_consumption(input: DailyConsumptionCreate, admin_user: dict = Depends(get_admin_user)):
+    # Calculate total consumption including fire
+    # Fire also contains petkim, estol, and talk
+    toplam_petkim = input.petkim_kg + input.fire_kg
+    toplam_estol = toplam_petkim * 0.03  # 3%
+    toplam_talk = toplam_petkim * 0.015  # 1.5%
+    
+    consumption_dict = input.model_dump()
+    consumption_obj = DailyConsumption(
+        **consumption_dict,
+        toplam_petkim_tuketim=toplam_petkim,
+        toplam_estol_tuketim=toplam_estol,
+        toplam_talk_tuketim=toplam_talk
+    )
+    
+    doc = consumption_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    
+    async with change_seq() as seq:
+        doc['seq'] = seq
+        await db.daily_consumptions.insert_one(doc)
+    invalidation_bus.publish("daily_consumptions")
+    await move_machine_bucket(doc, consumption_bucket_amounts(doc))
+    await move_material_consumption(doc)
+    await refresh_material_forecast()
+    await book_consumption_cost(doc)
+    await move_dashboard(consumption_amounts(doc))
+    return consumption_obj
+
+@router.get("/daily-consumption")
+async def get_daily_consumptions(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(DailyConsumption, fields)
+    consumptions = await db.daily_consumptions.find({}, field_projection(selected)).to_list(1000)
+    
+    for cons in consumptions:
+        if isinstance(cons.get('timestamp'), str):
+            cons['timestamp'] = datetime.fromisoformat(cons['timestamp'])
+    
+    if selected:
+        return sparse_response(DailyConsumption, selected, consumptions)
+    return consumptions
+
+@router.put("/daily-consumption/{consumption_id}")
+async def update_daily_consumption(consumption_id: str, update: DailyConsumptionUpdate, admin_user: dict = Depends(get_admin_user)):
+    consumption = await db.daily_consumptions.find_one({"id": consumption_id})
+    if not consumption:
+        raise HTTPException(status_code=404, detail="Daily consumption not found")
+    
+    # Update fields
+    update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    
+    if update_data:
+        # Recalculate totals if petkim or fire changed
+        petkim_kg = update_data.get('petkim_kg', consumption['petkim_kg'])
+        fire_kg = update_data.get('fire_kg', consumption['fire_kg'])
+        
+        toplam_petkim = petkim_kg + fire_kg
+        update_data['toplam_petkim_tuketim'] = toplam_petkim
+        update_data['toplam_estol_tuketim'] = toplam_petkim * 0.03
+        update_data['toplam_talk_tuketim'] = toplam_petkim * 0.015
+        
+        async with change_seq() as seq:
+            await db.daily_consumptions.update_one({"id": consumption_id}, {"$set": {**update_data, "seq": seq}})
+        invalidation_bus.publish("daily_consumptions")
+    
+    updated_consumption = await db.daily_consumptions.find_one({"id": consumption_id}, {"_id": 0})
+    if update_data:
+        await move_machine_bucket(consumption, consumption_bucket_amounts(consumption, -1))
+        await move_machine_bucket(updated_consumption, consumption_bucket_amounts(updated_consumption))
+        await move_material_consumption(consumption, -1)
+        await move_material_consumption(updated_consumption)
+        await refresh_material_forecast()
+        await unbook_consumption_cost(consumption)
+        await book_consumption_cost(updated_consumption)
+        await move_dashboard(consumption_amounts(consumption, -1))
+        await move_dashboard(consumption_amounts(updated_consumption))
+    if isinstance(updated_consumption['timestamp'], str):
+        updated_consumption['timestamp'] = datetime.fromisoformat(updated_consumption['timestamp'])
+    
+    return DailyConsumption(**updated_consumption)
+
+@router.delete("/daily-consumption/{consumption_id}")
+async def delete_daily_consumption(consumption_id: str, admin_user: dict = Depends(get_admin_user)):
+    consumption = await db.daily_consumptions.find_one_and_delete({"id": consumption_id}, {"_id": 0})
+    invalidation_bus.publish("daily_consumptions")
+    if not consumption:
+        raise HTTPException(status_code=404, detail="Daily consumption not found")
+    await record_tombstone("daily_consumptions", consumption_id)
+    await move_machine_bucket(consumption, consumption_bucket_amounts(consumption, -1))
+    await move_material_consumption(consumption, -1)
+    await refresh_material_forecast()
+    await unbook_consumption_cost(consumption)
+    await move_dashboard(consumption_amounts(consumption, -1))
+    return {"message": "Daily consumption deleted"}
@@ -0,0 +1,165 @@
+"""Cut products: Kesilmiş pieces cut from Normal parent rolls, and planning those cuts."""
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from core import (
+    invalidation_bus, change_seq, movement_write, record_tombstone, is_new_format_cut, fill_cut_defaults,
+    parse_fields, field_projection, sparse_response, date_range, table_page
+)
+from cutplan import plan_cuts
+from dashboard import move_dashboard, cut_amounts
+from database import db
+from jobqueue import job_runner
+from ledger import add_stock, reserve_stock, take_back_stock, cut_stock_fields
+from models import CutProduct, CutProductCreate, CutProductPage, CutPlan, CutPlanRequest
+from security import get_admin_user, get_viewer_or_admin
+from stock import normal_stock_key, cut_stock_key
+
+router = APIRouter()
+
+
+@router.post("/cut-product", response_model=CutProduct)
+@movement_write
+async def create_cut_product(input: CutProductCreate, admin_user: dict = Depends(get_admin_user)):
+    cut_dict = input.model_dump()
+    cut_obj = CutProduct(**cut_dict)
+    
+    doc = cut_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    
+    # Reserve the parent rolls first so two operators can't cut the same rolls twice
+    ana_key = normal_stock_key(cut_obj.ana_kalinlik, cut_obj.ana_en, cut_obj.ana_renk_kategori, cut_obj.ana_renk)
+    await reserve_stock(ana_key, cut_obj.kullanilan_ana_adet)
+    try:
+        async with change_seq() as seq:
+            doc['seq'] = seq
+            await db.cut_products.insert_one(doc)
+        invalidation_bus.publish("cut_products")
+    except Exception:
+        await add_stock(ana_key, {}, cut_obj.kullanilan_ana_adet)
+        raise
+    
+    await add_stock(
+        cut_stock_key(cut_obj.kesim_kalinlik, cut_obj.kesim_en, cut_obj.kesim_boy, cut_obj.kesim_renk_kategori, cut_obj.kesim_renk),
+        cut_stock_fields(cut_obj.kesim_kalinlik, cut_obj.kesim_en, cut_obj.kesim_boy, cut_obj.kesim_renk_kategori, cut_obj.kesim_renk),
+        cut_obj.kesim_adet
+    )
+    await move_dashboard(cut_amounts(doc))
+    
+    return cut_obj
+
+@router.get("/cut-product", response_model=List[CutProduct])
+async def get_cut_products(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(CutProduct, fields)
+    projection = field_projection(selected, 'ana_kalinlik', 'kesim_kalinlik', 'ana_renk_kategori', 'kesim_renk_kategori')
+    cut_products = await db.cut_products.find({}, projection).to_list(1000)
+    
+    # Filter only new format cut products
+    valid_cuts = []
+    for cut in cut_products:
+        if isinstance(cut.get('timestamp'), str):
+            cut['timestamp'] = datetime.fromisoformat(cut['timestamp'])
+        
+        if is_new_format_cut(cut):
+            valid_cuts.append(fill_cut_defaults(cut))
+    
+    if selected:
+        return sparse_response(CutProduct, selected, valid_cuts)
+    return valid_cuts
+
+CUT_SORTS = ('tarih', 'ana_kalinlik', 'ana_en', 'kesim_kalinlik', 'kesim_en', 'kesim_boy', 'kesim_adet',
+             'kullanilan_ana_adet', 'kesim_renk')
+
+@router.get("/cut-product/page", response_model=CutProductPage)
+async def get_cut_product_page(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = "-tarih",
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    kesim_kalinlik: Optional[float] = None,
+    kesim_en: Optional[float] = None,
+    kesim_renk: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    # Only new format cuts, as in the list
+    query = {"ana_kalinlik": {"$exists": True}, "kesim_kalinlik": {"$exists": True},
+             **date_range("tarih", baslangic, bitis)}
+    if kesim_kalinlik is not None:
+        query["kesim_kalinlik"] = kesim_kalinlik
+    for field, value in (("kesim_en", kesim_en), ("kesim_renk", kesim_renk)):
+        if value is not None:
+            query[field] = value
+    cuts, total = await table_page(db.cut_products, query, sort, CUT_SORTS, page, page_size)
+    for cut in cuts:
+        if isinstance(cut.get('timestamp'), str):
+            cut['timestamp'] = datetime.fromisoformat(cut['timestamp'])
+        fill_cut_defaults(cut)
+    return CutProductPage(items=cuts, total=total, page=page, page_size=page_size)
+
+@router.delete("/cut-product/{cut_id}")
+@movement_write
+async def delete_cut_product(cut_id: str, admin_user: dict = Depends(get_admin_user)):
+    cut = await db.cut_products.find_one({"id": cut_id}, {"_id": 0})
+    if not cut:
+        raise HTTPException(status_code=404, detail="Cut product not found")
+    new_format = 'ana_kalinlik' in cut and 'kesim_kalinlik' in cut
+    if new_format:
+        # Its pieces leave stock first: refused (409) when some have been shipped
+        kesim_key = cut_stock_key(cut['kesim_kalinlik'], cut['kesim_en'], cut['kesim_boy'], cut.get('kesim_renk_kategori', 'Renksiz'), cut.get('kesim_renk', 'Doğal'))
+        await take_back_stock(kesim_key, cut['kesim_adet'])
+    if not await db.cut_products.find_one_and_delete({"id": cut_id}, {"_id": 1}):
+        if new_format:
+            await add_stock(kesim_key, {}, cut['kesim_adet'])
+        raise HTTPException(status_code=404, detail="Cut product not found")
+    invalidation_bus.publish("cut_products")
+    await record_tombstone("cut_products", cut_id)
+    if new_format:
+        await add_stock(
+            normal_stock_key(cut['ana_kalinlik'], cut['ana_en'], cut.get('ana_renk_kategori', 'Renksiz'), cut.get('ana_renk', 'Doğal')),
+            {},
+            cut.get('kullanilan_ana_adet', 0)
+        )
+        await move_dashboard(cut_amounts(cut, -1))
+    return {"message": "Cut product deleted"}
+
+@router.post("/cut-plan", response_model=CutPlan)
+async def create_cut_plan(input: CutPlanRequest, current_user: dict = Depends(get_viewer_or_admin)):
+    # Plans against the Normal rolls in stock now; nothing is reserved
+    parents = await load_parent_rolls(input.kalinlik, input.renk_kategori, input.renk)
+    pieces = [piece.model_dump() for piece in input.parcalar]
+    return await job_runner.run_in_pool(plan_cuts, parents, pieces, input.sure_limiti_ms)
+
+async def load_parent_rolls(kalinlik: float, renk_kategori: str, renk: str) -> list:
+    entries = await db.stock_ledger.find(
+        {"urun_tipi": "Normal", "kalinlik": float(kalinlik), "renk_kategori": renk_kategori,
+         "renk": renk, "adet": {"$gt": 0}},
+        {"_id": 0, "en": 1, "adet": 1}
+    ).to_list(None)
+    if not entries:
+        return []
+    
+    # Roll length is not in the ledger; take it from the latest production of each width
+    latest = await db.productions.aggregate([
+        {"$match": {"kalinlik": kalinlik, "en": {"$in": [entry['en'] for entry in entries]}, "metre": {"$gt": 0}}},
+        {"$sort": {"tarih": -1}},
+        {"$group": {
+            "_id": {
+                "en": "$en",
+                "urun_tipi": {"$ifNull": ["$urun_tipi", "Normal"]},
+                "renk_kategori": {"$ifNull": ["$renk_kategori", "Renksiz"]},
+                "renk": {"$ifNull": ["$renk", "Doğal"]}
+            },
+            "metre": {"$first": "$metre"}
+        }}
+    ]).to_list(None)
+    metre = {
+        float(row['_id']['en']): row['metre'] for row in latest
+        if (row['_id']['urun_tipi'], row['_id']['renk_kategori'], row['_id']['renk']) == ('Normal', renk_kategori, renk)
+    }
+    return [
+        {"en": entry['en'], "metre": metre[entry['en']], "adet": entry['adet']}
+        for entry in entries if entry['en'] in metre
+    ]
@@ -0,0 +1,34 @@
+"""Recent request traces."""
+import json
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+
+from security import get_admin_user
+from tracing import trace_buffer, to_otlp
+
+router = APIRouter()
+
+
+@router.get("/debug/traces")
+async def get_traces(limit: int = Query(50, ge=1, le=500), admin_user: dict = Depends(get_admin_user)):
+    # Newest first, each as a waterfall of spans
+    return [trace.waterfall() for trace in trace_buffer.recent(limit)]
+
+@router.get("/debug/traces/otlp")
+async def export_traces(limit: int = Query(500, ge=1, le=5000), admin_user: dict = Depends(get_admin_user)):
+    # A file any OpenTelemetry tool can import; nothing is pushed to a collector
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    return Response(
+        json.dumps(to_otlp(trace_buffer.recent(limit))),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="traces-{stamp}.otlp.json"'}
+    )
+
+@router.get("/debug/traces/{trace_id}")
+async def get_trace(trace_id: str, admin_user: dict = Depends(get_admin_user)):
+    trace = trace_buffer.find(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.waterfall()
@@ -0,0 +1,53 @@
+"""Excel exports of the entry tables and the stock report."""
+import os
+import tempfile
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from export import EXPORTS, XLSX_MEDIA_TYPE, xlsx_available, export_collection, export_stock
+from jobqueue import job_runner
+from routers.stock import get_stock
+from security import get_viewer_or_admin
+
+router = APIRouter()
+
+
+async def build_xlsx(name: str, fn, *args) -> FileResponse:
+    if not xlsx_available():
+        raise HTTPException(status_code=503, detail="Excel export is not available (xlsxwriter missing)")
+    
+    fd, path = tempfile.mkstemp(prefix=f"{name}-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        # Written in a pool worker; this handler only waits, so other requests keep flowing
+        await job_runner.run_in_pool(fn, *args, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=XLSX_MEDIA_TYPE,
+        filename=f"{name}-{date.today().isoformat()}.xlsx",
+        background=BackgroundTask(os.remove, path)
+    )
+
+@router.get("/export/{collection}.xlsx")
+async def export_xlsx(
+    collection: str,
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    if collection not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    return await build_xlsx(collection, export_collection, collection, baslangic, bitis)
+
+@router.get("/stock.xlsx")
+async def export_stock_xlsx(current_user: dict = Depends(get_viewer_or_admin)):
+    # Stock is a few hundred SKU rows, computed (and cached) here rather than in the worker
+    rows = await get_stock(fields=None, current_user=current_user)
+    return await build_xlsx("stok", export_stock, rows)
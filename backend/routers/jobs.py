@@ -0,0 +1,51 @@
+"""Background report jobs with status polling."""
+from typing import Dict
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+
+from jobqueue import REPORTS, JobQueueFull, job_runner
+from models import Job
+from ratelimit import retry_after_header
+from security import get_viewer_or_admin
+
+router = APIRouter()
+
+
+@router.post("/jobs/{report}", response_model=Job, status_code=202)
+async def create_job(
+    report: str,
+    params: Dict[str, str] = Body(default={}),
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    if report not in REPORTS:
+        raise HTTPException(status_code=404, detail="Unknown report")
+    unknown = set(params) - set(REPORTS[report].params)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown parameters: {', '.join(sorted(unknown))}")
+    
+    try:
+        return await job_runner.submit(report, params, current_user['username'])
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full", headers=retry_after_header(30))
+
+async def get_own_job(job_id: str, current_user: dict) -> dict:
+    job = await job_runner.get(job_id)
+    # Admins see every job; others only their own
+    if job is None or (current_user['role'] != 'admin' and job['created_by'] != current_user['username']):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user: dict = Depends(get_viewer_or_admin)):
+    return await get_own_job(job_id, current_user)
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: dict = Depends(get_viewer_or_admin)):
+    job = await get_own_job(job_id, current_user)
+    if job['status'] != 'done':
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    
+    result = await job_runner.result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Job result expired")
+    return result
@@ -0,0 +1,142 @@
+"""Production (roll) records."""
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from buckets import move_machine_bucket, production_bucket_amounts
+from core import (
+    invalidation_bus, change_seq, movement_write, record_tombstone, fill_product_defaults,
+    parse_fields, field_projection, sparse_response, date_range, table_page
+)
+from dashboard import move_dashboard, production_amounts
+from database import db
+from ledger import add_stock, move_production_stock, normal_stock_fields, production_stock_key, take_back_stock
+from models import Production, ProductionCreate, ProductionUpdate, ProductionPage
+from security import get_admin_user, get_viewer_or_admin
+from stock import normal_stock_key
+
+router = APIRouter()
+
+
+@router.post("/production", response_model=Production)
+@movement_write
+async def create_production(input: ProductionCreate, admin_user: dict = Depends(get_admin_user)):
+    prod_dict = input.model_dump()
+    prod_obj = Production(**prod_dict)
+    
+    doc = prod_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    
+    async with change_seq() as seq:
+        doc['seq'] = seq
+        await db.productions.insert_one(doc)
+    invalidation_bus.publish("productions")
+    await move_machine_bucket(doc, production_bucket_amounts(doc))
+    await move_dashboard(production_amounts(doc))
+    await add_stock(
+        normal_stock_key(prod_obj.kalinlik, prod_obj.en, prod_obj.renk_kategori, prod_obj.renk),
+        normal_stock_fields(prod_obj.kalinlik, prod_obj.en, prod_obj.renk_kategori, prod_obj.renk),
+        prod_obj.adet
+    )
+    return prod_obj
+
+@router.get("/production", response_model=List[Production])
+async def get_productions(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(Production, fields)
+    productions = await db.productions.find({}, field_projection(selected)).to_list(1000)
+    
+    for prod in productions:
+        if isinstance(prod.get('timestamp'), str):
+            prod['timestamp'] = datetime.fromisoformat(prod['timestamp'])
+        fill_product_defaults(prod)
+    
+    if selected:
+        return sparse_response(Production, selected, productions)
+    return productions
+
+PRODUCTION_SORTS = ('tarih', 'makine', 'kalinlik', 'en', 'metre', 'metrekare', 'adet', 'masura_tipi', 'renk')
+
+@router.get("/production/page", response_model=ProductionPage)
+async def get_production_page(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = "-tarih",
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    makine: Optional[str] = None,
+    kalinlik: Optional[float] = None,
+    en: Optional[float] = None,
+    masura_tipi: Optional[str] = None,
+    renk: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    query = {"urun_tipi": {"$in": ["Normal", None]}, **date_range("tarih", baslangic, bitis)}
+    for field, value in (("makine", makine), ("kalinlik", kalinlik), ("en", en),
+                         ("masura_tipi", masura_tipi), ("renk", renk)):
+        if value is not None:
+            query[field] = value
+    productions, total = await table_page(db.productions, query, sort, PRODUCTION_SORTS, page, page_size)
+    for prod in productions:
+        if isinstance(prod.get('timestamp'), str):
+            prod['timestamp'] = datetime.fromisoformat(prod['timestamp'])
+        fill_product_defaults(prod)
+    return ProductionPage(items=productions, total=total, page=page, page_size=page_size)
+
+@router.put("/production/{prod_id}", response_model=Production)
+@movement_write
+async def update_production(prod_id: str, update: ProductionUpdate, admin_user: dict = Depends(get_admin_user)):
+    prod = await db.productions.find_one({"id": prod_id})
+    if not prod:
+        raise HTTPException(status_code=404, detail="Production not found")
+    
+    update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if update_data:
+        # Add the new quantity, then take the old one back out: refused (409) when less than
+        # that is left because rolls have been shipped or cut since. Restore on failure.
+        new_prod = {**prod, **update_data}
+        await move_production_stock(new_prod, new_prod['adet'])
+        try:
+            await take_back_stock(production_stock_key(prod), prod['adet'])
+        except HTTPException:
+            await move_production_stock(new_prod, -new_prod['adet'])
+            raise
+        async with change_seq() as seq:
+            result = await db.productions.update_one(
+                {"id": prod_id, "seq": prod.get('seq')}, {"$set": {**update_data, "seq": seq}}
+            )
+        if result.matched_count == 0:
+            # Edited or deleted since we read it; its stock moves belong to that write
+            await move_production_stock(prod, prod['adet'])
+            await move_production_stock(new_prod, -new_prod['adet'])
+            raise HTTPException(status_code=409, detail="Production changed meanwhile, please retry")
+        invalidation_bus.publish("productions")
+    
+    updated_prod = await db.productions.find_one({"id": prod_id}, {"_id": 0})
+    if update_data:
+        await move_machine_bucket(prod, production_bucket_amounts(prod, -1))
+        await move_machine_bucket(updated_prod, production_bucket_amounts(updated_prod))
+        await move_dashboard(production_amounts(prod, -1))
+        await move_dashboard(production_amounts(updated_prod))
+    if isinstance(updated_prod['timestamp'], str):
+        updated_prod['timestamp'] = datetime.fromisoformat(updated_prod['timestamp'])
+    
+    return Production(**updated_prod)
+
+@router.delete("/production/{prod_id}")
+@movement_write
+async def delete_production(prod_id: str, admin_user: dict = Depends(get_admin_user)):
+    prod = await db.productions.find_one({"id": prod_id}, {"_id": 0})
+    if not prod:
+        raise HTTPException(status_code=404, detail="Production not found")
+    # Its rolls leave stock first: refused (409) when some have been shipped or cut
+    await take_back_stock(production_stock_key(prod), prod['adet'])
+    # Only the version whose stock was taken; an edit or delete in between means retry
+    if not await db.productions.find_one_and_delete({"id": prod_id, "seq": prod.get('seq')}, {"_id": 1}):
+        await move_production_stock(prod, prod['adet'])
+        raise HTTPException(status_code=409, detail="Production changed meanwhile, please retry")
+    invalidation_bus.publish("productions")
+    await record_tombstone("productions", prod_id)
+    await move_machine_bucket(prod, production_bucket_amounts(prod, -1))
+    await move_dashboard(production_amounts(prod, -1))
+    return {"message": "Production deleted"}
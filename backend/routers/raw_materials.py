@@ -0,0 +1,230 @@
+"""Currency rates and raw material purchases."""
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from core import (
+    invalidation_bus, rates_cache, change_seq, record_tombstone,
+    parse_fields, field_projection, sparse_response, date_range, table_page
+)
+from costing import move_material_cost
+from dashboard import move_dashboard, raw_material_amounts, set_dashboard_rates
+from database import db
+from forecast import move_material_purchase, refresh_material_forecast, get_material_forecast
+from models import (
+    CurrencyRate, CurrencyRateUpdate, RawMaterial, RawMaterialCreate, RawMaterialUpdate, RawMaterialPage,
+    MaterialForecast
+)
+from security import get_admin_user, get_viewer_or_admin
+
+router = APIRouter()
+
+
+# Currency Rate endpoints
+async def get_latest_rates() -> list:
+    rates = rates_cache.get("latest")
+    if rates is None:
+        generation = rates_cache.generation
+        rates = await db.currency_rates.find({}, {"_id": 0}).sort("updated_at", -1).limit(1).to_list(1)
+        rates_cache.set("latest", rates, generation=generation)
+    return [dict(rate) for rate in rates]
+
+@router.get("/currency-rates")
+async def get_currency_rates(current_user: dict = Depends(get_viewer_or_admin)):
+    rates = await get_latest_rates()
+    
+    if not rates:
+        # Return default rates if none exist
+        return {
+            "usd_rate": 1.0,
+            "eur_rate": 1.0,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "updated_by": "system"
+        }
+    
+    rate = rates[0]
+    if isinstance(rate['updated_at'], str):
+        rate['updated_at'] = datetime.fromisoformat(rate['updated_at'])
+    
+    return rate
+
+@router.post("/currency-rates")
+async def update_currency_rates(rates: CurrencyRateUpdate, admin_user: dict = Depends(get_admin_user)):
+    rate_obj = CurrencyRate(
+        usd_rate=rates.usd_rate,
+        eur_rate=rates.eur_rate,
+        updated_by=admin_user["username"]
+    )
+    
+    doc = rate_obj.model_dump()
+    doc['updated_at'] = doc['updated_at'].isoformat()
+    
+    await db.currency_rates.insert_one(doc)
+    invalidation_bus.publish("currency_rates")
+    await set_dashboard_rates(doc)
+    return rate_obj
+
+
+# Raw Material endpoints
+@router.post("/raw-materials")
+async def create_raw_material(input: RawMaterialCreate, admin_user: dict = Depends(get_admin_user)):
+    # Get current currency rates
+    rates = await get_latest_rates()
+    
+    usd_rate = 1.0
+    eur_rate = 1.0
+    if rates:
+        usd_rate = rates[0].get('usd_rate', 1.0)
+        eur_rate = rates[0].get('eur_rate', 1.0)
+    
+    # Calculate totals
+    toplam_tutar = input.miktar * input.birim_fiyat
+    
+    # Calculate TL amount based on currency
+    if input.para_birimi == "USD":
+        kur = usd_rate
+        tl_tutar = toplam_tutar * usd_rate
+    elif input.para_birimi == "EUR":
+        kur = eur_rate
+        tl_tutar = toplam_tutar * eur_rate
+    else:  # TL
+        kur = 1.0
+        tl_tutar = toplam_tutar
+    
+    raw_dict = input.model_dump()
+    raw_obj = RawMaterial(
+        **raw_dict,
+        toplam_tutar=toplam_tutar,
+        kur=kur,
+        tl_tutar=tl_tutar
+    )
+    
+    doc = raw_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    
+    async with change_seq() as seq:
+        doc['seq'] = seq
+        await db.raw_materials.insert_one(doc)
+    await move_material_purchase(doc)
+    await refresh_material_forecast()
+    await move_material_cost(doc)
+    await move_dashboard(raw_material_amounts(doc))
+    return raw_obj
+
+@router.get("/raw-materials")
+async def get_raw_materials(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(RawMaterial, fields)
+    materials = await db.raw_materials.find({}, field_projection(selected)).to_list(1000)
+    
+    for mat in materials:
+        if isinstance(mat.get('timestamp'), str):
+            mat['timestamp'] = datetime.fromisoformat(mat['timestamp'])
+    
+    if selected:
+        return sparse_response(RawMaterial, selected, materials)
+    return materials
+
+RAW_MATERIAL_SORTS = ('giris_tarihi', 'malzeme_adi', 'miktar', 'birim_fiyat', 'toplam_tutar', 'kur', 'tl_tutar')
+
+@router.get("/raw-materials/page", response_model=RawMaterialPage)
+async def get_raw_material_page(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = "-giris_tarihi",
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    malzeme: Optional[str] = None,  # Name prefix, any case
+    para_birimi: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    query = date_range("giris_tarihi", baslangic, bitis)
+    if malzeme:
+        query["malzeme_adi"] = re.compile('^' + re.escape(malzeme.strip()), re.IGNORECASE)
+    if para_birimi:
+        query["para_birimi"] = para_birimi
+    materials, total = await table_page(db.raw_materials, query, sort, RAW_MATERIAL_SORTS, page, page_size)
+    for mat in materials:
+        if isinstance(mat.get('timestamp'), str):
+            mat['timestamp'] = datetime.fromisoformat(mat['timestamp'])
+    spent = await db.raw_materials.aggregate([
+        {"$match": query}, {"$group": {"_id": None, "tl": {"$sum": "$tl_tutar"}}}
+    ]).to_list(1)
+    return RawMaterialPage(
+        items=materials, total=total, page=page, page_size=page_size, toplam_tl=spent[0]['tl'] if spent else 0
+    )
+
+@router.put("/raw-materials/{material_id}")
+async def update_raw_material(material_id: str, update: RawMaterialUpdate, admin_user: dict = Depends(get_admin_user)):
+    material = await db.raw_materials.find_one({"id": material_id})
+    if not material:
+        raise HTTPException(status_code=404, detail="Raw material not found")
+    
+    # Get current currency rates
+    rates = await get_latest_rates()
+    usd_rate = 1.0
+    eur_rate = 1.0
+    if rates:
+        usd_rate = rates[0].get('usd_rate', 1.0)
+        eur_rate = rates[0].get('eur_rate', 1.0)
+    
+    # Update fields
+    update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    
+    if update_data:
+        # Recalculate if relevant fields changed
+        miktar = update_data.get('miktar', material['miktar'])
+        birim_fiyat = update_data.get('birim_fiyat', material['birim_fiyat'])
+        para_birimi = update_data.get('para_birimi', material['para_birimi'])
+        
+        toplam_tutar = miktar * birim_fiyat
+        
+        if para_birimi == "USD":
+            kur = usd_rate
+            tl_tutar = toplam_tutar * usd_rate
+        elif para_birimi == "EUR":
+            kur = eur_rate
+            tl_tutar = toplam_tutar * eur_rate
+        else:
+            kur = 1.0
+            tl_tutar = toplam_tutar
+        
+        update_data['toplam_tutar'] = toplam_tutar
+        update_data['kur'] = kur
+        update_data['tl_tutar'] = tl_tutar
+        
+        async with change_seq() as seq:
+            await db.raw_materials.update_one({"id": material_id}, {"$set": {**update_data, "seq": seq}})
+    
+    updated_material = await db.raw_materials.find_one({"id": material_id}, {"_id": 0})
+    if update_data:
+        await move_material_purchase(material, -1)
+        await move_material_purchase(updated_material)
+        await refresh_material_forecast()
+        await move_material_cost(material, -1)
+        await move_material_cost(updated_material)
+        await move_dashboard(raw_material_amounts(material, -1))
+        await move_dashboard(raw_material_amounts(updated_material))
+    if isinstance(updated_material['timestamp'], str):
+        updated_material['timestamp'] = datetime.fromisoformat(updated_material['timestamp'])
+    
+    return RawMaterial(**updated_material)
+
+@router.delete("/raw-materials/{material_id}")
+async def delete_raw_material(material_id: str, admin_user: dict = Depends(get_admin_user)):
+    material = await db.raw_materials.find_one_and_delete({"id": material_id}, {"_id": 0})
+    if not material:
+        raise HTTPException(status_code=404, detail="Raw material not found")
+    await record_tombstone("raw_materials", material_id)
+    await move_material_purchase(material, -1)
+    await refresh_material_forecast()
+    await move_material_cost(material, -1)
+    await move_dashboard(raw_material_amounts(material, -1))
+    return {"message": "Raw material deleted"}
+
+
+# Run-out forecast, kept current by the purchase and consumption writes
+@router.get("/forecast/materials", response_model=List[MaterialForecast])
+async def get_materials_forecast(current_user: dict = Depends(get_viewer_or_admin)):
+    return await get_material_forecast()
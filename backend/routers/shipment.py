@@ -0,0 +1,181 @@
+"""Shipments and shipment search."""
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+
+from core import (
+    invalidation_bus, change_seq, movement_write, record_tombstone, fill_product_defaults,
+    parse_fields, field_projection, sparse_response, date_range, table_page
+)
+from dashboard import move_dashboard, shipment_amounts
+from database import db
+from ledger import add_stock, reserve_stock, resolve_shipment_stock_key
+from models import Shipment, ShipmentCreate, ShipmentUpdate, ShipmentPage, ShipmentSearchPage
+from search import SEARCH_FIELDS, search_terms, query_words, prefix_filter
+from security import get_admin_user, get_viewer_or_admin
+
+router = APIRouter()
+
+
+@router.post("/shipment", response_model=Shipment)
+@movement_write
+async def create_shipment(input: ShipmentCreate, admin_user: dict = Depends(get_admin_user)):
+    ship_dict = input.model_dump()
+    ship_obj = Shipment(**ship_dict)
+    
+    doc = ship_obj.model_dump()
+    doc['timestamp'] = doc['timestamp'].isoformat()
+    
+    doc['arama'] = search_terms(doc)
+    
+    stock_key = await resolve_shipment_stock_key(doc)
+    await reserve_stock(stock_key, ship_obj.adet)
+    try:
+        async with change_seq() as seq:
+            doc['seq'] = seq
+            await db.shipments.insert_one(doc)
+        invalidation_bus.publish("shipments")
+    except Exception:
+        await add_stock(stock_key, {}, ship_obj.adet)
+        raise
+    await move_dashboard(shipment_amounts(doc))
+    return ship_obj
+
+@router.get("/shipment", response_model=List[Shipment])
+async def get_shipments(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(Shipment, fields)
+    shipments = await db.shipments.find({}, field_projection(selected)).to_list(1000)
+    
+    for ship in shipments:
+        if isinstance(ship.get('timestamp'), str):
+            ship['timestamp'] = datetime.fromisoformat(ship['timestamp'])
+        fill_product_defaults(ship)
+    
+    if selected:
+        return sparse_response(Shipment, selected, shipments)
+    return shipments
+
+SHIPMENT_SORTS = ('tarih', 'alici_firma', 'urun_tipi', 'kalinlik', 'en', 'metrekare', 'adet', 'renk', 'irsaliye_no')
+
+@router.get("/shipment/page", response_model=ShipmentPage)
+async def get_shipment_page(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = "-tarih",
+    baslangic: Optional[str] = None,
+    bitis: Optional[str] = None,
+    q: Optional[str] = None,  # Same prefix match as /shipment/search
+    urun_tipi: Optional[str] = None,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    query = date_range("tarih", baslangic, bitis)
+    words = query_words(q or '')
+    if words:
+        query.update(prefix_filter(words))
+    if urun_tipi == 'Normal':
+        query["urun_tipi"] = {"$in": ["Normal", None]}
+    elif urun_tipi:
+        query["urun_tipi"] = urun_tipi
+    shipments, total = await table_page(db.shipments, query, sort, SHIPMENT_SORTS, page, page_size)
+    for ship in shipments:
+        if isinstance(ship['timestamp'], str):
+            ship['timestamp'] = datetime.fromisoformat(ship['timestamp'])
+        fill_product_defaults(ship)
+    return ShipmentPage(items=shipments, total=total, page=page, page_size=page_size)
+
+# Typeahead answers from the index alone: no count, no sort, a handful of fields
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_FIELDS = ('id', 'tarih', 'alici_firma', 'irsaliye_no', 'arac_plaka')
+
+@router.get("/shipment/search")
+async def search_shipments(
+    q: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    typeahead: bool = False,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    words = query_words(q)
+    if not words:
+        raise HTTPException(status_code=400, detail="Search query must contain letters or digits")
+    query = prefix_filter(words)
+    
+    if typeahead:
+        suggestions = await db.shipments.find(
+            query, {"_id": 0, **{name: 1 for name in TYPEAHEAD_FIELDS}}
+        ).hint("arama_1").limit(TYPEAHEAD_LIMIT).to_list(TYPEAHEAD_LIMIT)
+        return sparse_response(Shipment, TYPEAHEAD_FIELDS, suggestions)
+    
+    total = await db.shipments.count_documents(query)
+    shipments = await db.shipments.find(query, {"_id": 0}).sort(
+        [("tarih", -1), ("id", 1)]
+    ).skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+    for ship in shipments:
+        if isinstance(ship['timestamp'], str):
+            ship['timestamp'] = datetime.fromisoformat(ship['timestamp'])
+        fill_product_defaults(ship)
+    
+    return ShipmentSearchPage(items=shipments, total=total, page=page, page_size=page_size)
+
+async def init_shipment_search():
+    await db.shipments.create_index("arama")
+    # Records written before search keys existed
+    missing = await db.shipments.find({"arama": {"$exists": False}}, {f: 1 for f in SEARCH_FIELDS}).to_list(None)
+    for ship in missing:
+        await db.shipments.update_one({"_id": ship['_id']}, {"$set": {"arama": search_terms(ship)}})
+    if missing:
+        logging.info(f"Added search keys to {len(missing)} shipments")
+
+@router.put("/shipment/{ship_id}", response_model=Shipment)
+@movement_write
+async def update_shipment(ship_id: str, update: ShipmentUpdate, admin_user: dict = Depends(get_admin_user)):
+    ship = await db.shipments.find_one({"id": ship_id})
+    if not ship:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    
+    update_data = {k: v for k, v in update.model_dump().items() if v is not None}
+    if update_data:
+        # Give back the old quantity, then reserve the new one; restore on failure
+        old_key = await resolve_shipment_stock_key(ship)
+        await add_stock(old_key, {}, ship['adet'])
+        new_key = await resolve_shipment_stock_key({**ship, **update_data})
+        new_adet = update_data.get('adet', ship['adet'])
+        try:
+            await reserve_stock(new_key, new_adet)
+        except HTTPException:
+            await add_stock(old_key, {}, -ship['adet'])
+            raise
+        update_data['arama'] = search_terms({**ship, **update_data})
+        async with change_seq() as seq:
+            result = await db.shipments.update_one(
+                {"id": ship_id, "seq": ship.get('seq')}, {"$set": {**update_data, "seq": seq}}
+            )
+        if result.matched_count == 0:
+            # Edited or deleted since we read it; its stock moves belong to that write
+            await add_stock(new_key, {}, new_adet)
+            await add_stock(old_key, {}, -ship['adet'])
+            raise HTTPException(status_code=409, detail="Shipment changed meanwhile, please retry")
+        invalidation_bus.publish("shipments")
+    
+    updated_ship = await db.shipments.find_one({"id": ship_id}, {"_id": 0})
+    if update_data:
+        await move_dashboard(shipment_amounts(ship, -1))
+        await move_dashboard(shipment_amounts(updated_ship))
+    if isinstance(updated_ship['timestamp'], str):
+        updated_ship['timestamp'] = datetime.fromisoformat(updated_ship['timestamp'])
+    
+    return Shipment(**updated_ship)
+
+@router.delete("/shipment/{ship_id}")
+@movement_write
+async def delete_shipment(ship_id: str, admin_user: dict = Depends(get_admin_user)):
+    ship = await db.shipments.find_one_and_delete({"id": ship_id}, {"_id": 0})
+    if not ship:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    await add_stock(await resolve_shipment_stock_key(ship), {}, ship['adet'])
+    invalidation_bus.publish("shipments")
+    await record_tombstone("shipments", ship_id)
+    await move_dashboard(shipment_amounts(ship, -1))
+    return {"message": "Shipment deleted"}
@@ -0,0 +1,83 @@
+"""Stock report and catalog facets."""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+
+from archive import load_movements
+from config import STOCK_ENGINE
+from core import stock_cache, catalog_cache, stock_flight, parse_fields, sparse_response
+from database import db
+from models import Stock, CatalogFacets
+from security import get_viewer_or_admin
+from stock import compute_stock
+
+router = APIRouter()
+
+
+@router.get("/stock", response_model=List[Stock])
+async def get_stock(fields: Optional[str] = None, current_user: dict = Depends(get_viewer_or_admin)):
+    selected = parse_fields(Stock, fields)
+    stock = stock_cache.get("stock")
+    if stock is None:
+        stock = await stock_flight.do("stock", load_stock)
+    if selected:
+        return sparse_response(Stock, selected, stock)
+    return stock
+
+def stock_engine():
+    if STOCK_ENGINE == 'pandas':
+        # pandas is heavy to import; only pay for it when selected
+        from stock_vectorized import compute_stock_vectorized
+        return compute_stock_vectorized
+    return compute_stock
+
+async def load_stock() -> list:
+    generation = stock_cache.generation
+    # Archived periods come back as opening balances ahead of the hot movements
+    productions, shipments, cut_products = await load_movements(db)
+    
+    stock = list(stock_engine()(productions, shipments, cut_products).values())
+    stock_cache.set("stock", stock, generation=generation)
+    return stock
+
+
+# Catalog facets
+# Distinct values of each SKU dimension in the stock ledger, with how many SKUs carry
+# the value and their total stock. Each facet applies every drill-down filter except
+# its own, so the other values of a filtered dimension stay visible.
+FACET_FIELDS = ('urun_tipi', 'kalinlik', 'en', 'boy', 'renk_kategori', 'renk')
+
+@router.get("/catalog/facets", response_model=CatalogFacets)
+async def get_catalog_facets(
+    urun_tipi: Optional[str] = None,
+    kalinlik: Optional[float] = None,
+    en: Optional[float] = None,
+    boy: Optional[float] = None,
+    renk_kategori: Optional[str] = None,
+    renk: Optional[str] = None,
+    stokta: bool = False,
+    current_user: dict = Depends(get_viewer_or_admin)
+):
+    filters = {name: value for name, value in (
+        ('urun_tipi', urun_tipi), ('kalinlik', kalinlik), ('en', en), ('boy', boy),
+        ('renk_kategori', renk_kategori), ('renk', renk)
+    ) if value is not None}
+    cache_key = f"{sorted(filters.items())}:{stokta}"
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = catalog_cache.generation
+    base = {"adet": {"$gt": 0}} if stokta else {}
+    facets = {
+        field: [
+            {"$match": {**base, **{k: v for k, v in filters.items() if k != field}, field: {"$ne": None}}},
+            {"$group": {"_id": f"${field}", "sku_sayisi": {"$sum": 1}, "toplam_adet": {"$sum": "$adet"}}},
+            {"$sort": {"_id": 1}},
+            {"$project": {"_id": 0, "deger": "$_id", "sku_sayisi": 1, "toplam_adet": 1}}
+        ]
+        for field in FACET_FIELDS
+    }
+    result = await db.stock_ledger.aggregate([{"$facet": facets}]).to_list(1)
+    catalog_cache.set(cache_key, result[0], generation=generation)
+    return result[0]
@@ -0,0 +1,179 @@
+"""Delta sync: everything that changed after a client's last seen sequence, and
+batched pushes of mutations queued offline."""
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from pymongo.errors import DuplicateKeyError
+
+from config import IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS, IDEMPOTENCY_TTL_HOURS
+from core import SYNC_COLLECTIONS, committed_change_seq, fill_product_defaults, fill_cut_defaults, is_new_format_cut
+from database import db
+from models import (
+    assigned_record_id, Production, Shipment, CutProduct, DailyConsumption, RawMaterial,
+    SyncPush, SyncResult, ProductionCreate, ProductionUpdate, ShipmentCreate, ShipmentUpdate, CutProductCreate, DailyConsumptionCreate, DailyConsumptionUpdate, RawMaterialCreate, RawMaterialUpdate
+)
+from routers import consumption, cut, production, raw_materials, shipment
+from security import get_admin_user, get_viewer_or_admin
+
+router = APIRouter()
+
+
+def normalize_synced(collection: str, doc: dict) -> Optional[dict]:
+    # Same shape the list endpoints return
+    if collection == "shipments":
+        doc.pop('arama', None)
+    if collection in ("productions", "shipments"):
+        return fill_product_defaults(doc)
+    if collection == "cut_products":
+        return fill_cut_defaults(doc) if is_new_format_cut(doc) else None
+    return doc
+
+@router.get("/sync")
+async def sync_changes(since: int = 0, current_user: dict = Depends(get_viewer_or_admin)):
+    # Only up to the highest sequence every write below has finished with: a write still
+    # in flight keeps its number (and everything after it) for the next sync
+    seq = await committed_change_seq()
+    window = {"seq": {"$gt": since, "$lte": seq}}
+    
+    upserts = {}
+    for collection in SYNC_COLLECTIONS:
+        docs = await db[collection].find(window, {"_id": 0}).sort("seq", 1).to_list(None)
+        upserts[collection] = [d for d in (normalize_synced(collection, doc) for doc in docs) if d is not None]
+    
+    deletes = {collection: [] for collection in SYNC_COLLECTIONS}
+    async for tombstone in db.tombstones.find(window, {"_id": 0}).sort("seq", 1):
+        deletes.setdefault(tombstone['collection'], []).append(tombstone['id'])
+    
+    return {"seq": seq, "upserts": upserts, "deletes": deletes}
+
+
+# Pushed mutations run through the same handlers as the single-record endpoints, so
+# stock reservation, search keys, buckets and the change sequence behave identically.
+# (entity, op) -> (handler, body model)
+MUTATIONS = {
+    ("production", "create"): (production.create_production, ProductionCreate),
+    ("production", "update"): (production.update_production, ProductionUpdate),
+    ("production", "delete"): (production.delete_production, None),
+    ("shipment", "create"): (shipment.create_shipment, ShipmentCreate),
+    ("shipment", "update"): (shipment.update_shipment, ShipmentUpdate),
+    ("shipment", "delete"): (shipment.delete_shipment, None),
+    ("cut-product", "create"): (cut.create_cut_product, CutProductCreate),
+    ("cut-product", "delete"): (cut.delete_cut_product, None),
+    ("daily-consumption", "create"): (consumption.create_daily_consumption, DailyConsumptionCreate),
+    ("daily-consumption", "update"): (consumption.update_daily_consumption, DailyConsumptionUpdate),
+    ("daily-consumption", "delete"): (consumption.delete_daily_consumption, None),
+    ("raw-materials", "create"): (raw_materials.create_raw_material, RawMaterialCreate),
+    ("raw-materials", "update"): (raw_materials.update_raw_material, RawMaterialUpdate),
+    ("raw-materials", "delete"): (raw_materials.delete_raw_material, None),
+}
+
+# Records a pushed create writes, by entity: where to look for an earlier attempt's record
+CREATED = {
+    "production": ("productions", Production),
+    "shipment": ("shipments", Shipment),
+    "cut-product": ("cut_products", CutProduct),
+    "daily-consumption": ("daily_consumptions", DailyConsumption),
+    "raw-materials": ("raw_materials", RawMaterial),
+}
+PUSHED_RECORDS = uuid.UUID('6f1c1d2e-5b8a-4c3e-9a57-0c2f3d6b9e41')
+# The outcome of a mutation that failed part way: something may have been written
+OUTCOME_UNKNOWN = "unknown"
+
+async def init_sync_push():
+    await db.idempotency_keys.create_index("expires_at", expireAfterSeconds=0)
+
+def pushed_record_id(key_id: str) -> str:
+    return str(uuid.uuid5(PUSHED_RECORDS, key_id))
+
+async def apply_mutation(mutation, key_id: str, admin_user: dict):
+    handler, model = MUTATIONS[(mutation.entity, mutation.op)]
+    if mutation.op == "create":
+        # An earlier attempt may have written the record before it failed; hand that back
+        # rather than writing a second one
+        collection, record_model = CREATED[mutation.entity]
+        record_id = pushed_record_id(key_id)
+        written = await db[collection].find_one({"id": record_id}, {"_id": 0})
+        if written:
+            return record_model(**written)
+        token = assigned_record_id.set(record_id)
+        try:
+            return await handler(model(**mutation.data), admin_user=admin_user)
+        finally:
+            assigned_record_id.reset(token)
+    if not mutation.id:
+        raise HTTPException(status_code=400, detail="id is required")
+    if mutation.op == "update":
+        return await handler(mutation.id, model(**mutation.data), admin_user=admin_user)
+    return await handler(mutation.id, admin_user=admin_user)
+
+async def claim_key(mutation, key_id: str, claim: dict) -> Optional[SyncResult]:
+    # Claiming the key first means a retry that races the original can never apply twice.
+    # Returns the answer to give instead when the key is not ours to apply
+    now = datetime.now(timezone.utc)
+    try:
+        await db.idempotency_keys.insert_one({
+            "_id": key_id, **claim, "status": None, "claimed_at": now,
+            "expires_at": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        })
+        return None
+    except DuplicateKeyError:
+        seen = await db.idempotency_keys.find_one({"_id": key_id})
+    if seen is None:
+        return SyncResult(key=mutation.key, status=409, detail="Retry this mutation")
+    if any(seen.get(name) != value for name, value in claim.items()):
+        return SyncResult(key=mutation.key, status=422, detail="Idempotency key reused for a different mutation")
+    if isinstance(seen['status'], int):
+        return SyncResult(key=mutation.key, status=seen['status'], replayed=True, body=seen['body'])
+    # Failed part way, or claimed by a worker that died before it finished: take it over.
+    # Applying again is safe, a create finds the record an earlier attempt wrote
+    stale = now - timedelta(seconds=IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)
+    if await db.idempotency_keys.find_one_and_update(
+        {"_id": key_id, "$or": [{"status": OUTCOME_UNKNOWN}, {"status": None, "claimed_at": {"$lt": stale}}]},
+        {"$set": {"status": None, "claimed_at": now}}
+    ):
+        return None
+    return SyncResult(key=mutation.key, status=409, detail="Mutation is still being applied")
+
+async def push_one(mutation, admin_user: dict) -> SyncResult:
+    if (mutation.entity, mutation.op) not in MUTATIONS:
+        return SyncResult(key=mutation.key, status=400, detail=f"Unsupported mutation {mutation.op} {mutation.entity}")
+    
+    key_id = f"{admin_user['username']}:{mutation.key}"
+    refusal = await claim_key(mutation, key_id, {"entity": mutation.entity, "op": mutation.op, "target": mutation.id})
+    if refusal:
+        return refusal
+    
+    try:
+        body = jsonable_encoder(await apply_mutation(mutation, key_id, admin_user))
+    except (HTTPException, ValidationError) as e:
+        if isinstance(e, HTTPException):
+            result = SyncResult(key=mutation.key, status=e.status_code, detail=e.detail)
+        else:
+            result = SyncResult(key=mutation.key, status=422, detail=jsonable_encoder(e.errors(include_url=False)))
+    except Exception:
+        logging.exception(f"Pushed mutation {mutation.key} failed")
+        result = SyncResult(key=mutation.key, status=500, detail="Internal error")
+    else:
+        await db.idempotency_keys.update_one({"_id": key_id}, {"$set": {"status": 200, "body": body}})
+        return SyncResult(key=mutation.key, status=200, body=body)
+    
+    # A handler can fail after some of its writes landed, so the key is kept: the client's
+    # retry (once it has fixed the cause, for a rejection) takes it over and applies again
+    await db.idempotency_keys.update_one(
+        {"_id": key_id}, {"$set": {"status": OUTCOME_UNKNOWN, "detail": jsonable_encoder(result.detail)}}
+    )
+    return result
+
+@router.post("/sync/push")
+async def sync_push(push: SyncPush, admin_user: dict = Depends(get_admin_user)):
+    # In order, one at a time: later mutations may depend on earlier ones.
+    # A failed item does not stop the rest; the client keeps only the failed ones queued.
+    results = []
+    for mutation in push.mutations:
+        results.append(await push_one(mutation, admin_user))
+    return {"results": results}
@@ -0,0 +1,49 @@
+"""Shipment search keys.
+
+Every shipment carries `arama`, its searchable fields folded to lowercase ASCII with
+Turkish rules ("ŞİŞECAM", "Şişecam" and "sisecam" all become "sisecam"). Queries are
+folded the same way and each query word becomes an anchored regex, which MongoDB
+answers as a range scan on the multikey index over `arama`.
+"""
+import re
+import unicodedata
+from typing import List
+
+SEARCH_FIELDS = ('alici_firma', 'irsaliye_no', 'arac_plaka')
+
+# Turkish dotted/dotless i first, then the remaining diacritics
+_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'ı',
+    'ı': 'i', 'ş': 's', 'ğ': 'g', 'ü': 'u', 'ö': 'o', 'ç': 'c', 'â': 'a', 'î': 'i', 'û': 'u',
+})
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def fold(text: str) -> str:
+    text = text.translate(_FOLD).lower().translate(_FOLD)
+    # Any other accents (é, ñ, ...) go too
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def search_terms(ship: dict) -> List[str]:
+    """Words of each search field, plus each field with spaces and punctuation removed."""
+    terms = set()
+    for field in SEARCH_FIELDS:
+        words = _WORD.findall(fold(str(ship.get(field) or '')))
+        terms.update(words)
+        if len(words) > 1:
+            # "34 ABC 123" is also found as "34abc"
+            terms.add(''.join(words))
+    return sorted(terms)
+
+
+def query_words(q: str) -> List[str]:
+    return _WORD.findall(fold(q))
+
+
+def prefix_filter(words: List[str]) -> dict:
+    """Every query word must prefix-match some search term."""
+    patterns = [re.compile('^' + re.escape(word)) for word in words]
+    if len(patterns) == 1:
+        return {"arama": patterns[0]}
+    return {"$and": [{"arama": pattern} for pattern in patterns]}
@@ -0,0 +1,80 @@
+"""Password hashing, tokens and the auth dependencies."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+import jwt
+from fastapi import HTTPException, Depends
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from config import SECRET_KEY
+from tracing import span
+
+ALGORITHM = "HS256"
+security = HTTPBearer()
+_pwd_context = None
+# Set while a batch runs its items: the token was already checked for the batch
+_authenticated_user: ContextVar[Optional[dict]] = ContextVar("authenticated_user", default=None)
+
+
+def pwd_context():
+    # passlib/bcrypt load on the first login rather than at import
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+# Password hashing
+def hash_password(password: str) -> str:
+    return pwd_context().hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context().verify(plain_password, hashed_password)
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(days=7)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+@contextmanager
+def authenticated_as(user: dict):
+    token = _authenticated_user.set(user)
+    try:
+        yield
+    finally:
+        _authenticated_user.reset(token)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    user = _authenticated_user.get()
+    if user is not None:
+        return user
+    with span("auth.get_current_user"):
+        try:
+            token = credentials.credentials
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            role: str = payload.get("role")
+            if username is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            return {"username": username, "role": role}
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except Exception as e:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+async def get_viewer_or_admin(current_user: dict = Depends(get_current_user)):
+    # Both admin and viewer can view data
+    return current_user
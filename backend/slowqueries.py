@@ -0,0 +1,301 @@
+"""Slow MongoDB command capture with explain plans.
+
+A PyMongo command listener times every command. Commands slower than
+SLOW_QUERY_MS are tagged with the route and request id that issued them and handed
+to a background task. That task runs `explain` (queryPlanner only, so nothing is
+executed again) and writes a summary to the capped `slow_queries` collection. Plans
+are explained once per query shape and reused for a few minutes.
+
+RequestContextMiddleware gives every request an id (the incoming X-Request-ID or a
+new one, echoed back). Motor runs commands in executor threads with a copy of the
+caller's context, so the listener sees the request that issued each command.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG_MB, SLOW_QUERY_EXPLAIN
+from database import db
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Routing, session and cluster bookkeeping that explain must not receive
+COMMAND_NOISE = {"lsid", "txnNumber", "autocommit", "startTransaction", "writeConcern"}
+PLAN_CACHE_SECONDS = 300
+PLAN_CACHE_SIZE = 500  # Query shapes whose plan is kept; the least recently used go first
+FALLBACK_TTL_DAYS = 7
+
+request_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_scope", default=None)
+# Set while the recorder itself talks to MongoDB, so its explains are not recorded
+_recording = contextvars.ContextVar("slow_query_recording", default=False)
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        # The router fills in scope["route"] later; the listener reads it when a command starts
+        token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_scope.reset(token)
+
+
+def current_request() -> tuple:
+    scope = request_scope.get()
+    if scope is None:
+        return None, None
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path")
+    return f"{scope.get('method')} {path}", scope.get("state", {}).get("request_id")
+
+
+def shape(value):
+    # Values replaced by their type, so the same query with other arguments groups together
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(item) for item in value[:3]]
+    return type(value).__name__
+
+
+def command_shape(name: str, command: dict) -> dict:
+    target = {"command": name, "collection": command.get(name)}
+    if name == "find":
+        target.update(filter=shape(command.get("filter", {})), sort=command.get("sort"))
+    elif name == "aggregate":
+        target["pipeline"] = [
+            {stage: shape(spec) if stage == "$match" else "..."}
+            for step in command.get("pipeline", []) for stage, spec in step.items()
+        ]
+    elif name in ("count", "distinct"):
+        target.update(filter=shape(command.get("query", {})), key=command.get("key"))
+    elif name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        target["filter"] = shape(statements[0].get("q", {}))
+    elif name == "findAndModify":
+        target.update(filter=shape(command.get("query", {})), sort=command.get("sort"))
+    return target
+
+
+def plan_summary(explain: dict) -> dict:
+    planner = explain.get("queryPlanner") or {}
+    if not planner:
+        # Aggregations nest the planner under their first stage
+        for stage in explain.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner") or {}
+            if planner:
+                break
+
+    stages, indexes = [], []
+    node = planner.get("winningPlan") or {}
+    while node:
+        stages.append(node.get("stage"))
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        node = node.get("inputStage") or (node.get("inputStages") or [None])[0] or node.get("queryPlan")
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in stages,
+        "rejected_plans": len(planner.get("rejectedPlans", []))
+    }
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Runs in whichever thread issued the command; only hands records to the loop."""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        self.dropped = 0
+        self._started = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self._loop, self._queue = loop, queue
+
+    def started(self, event):
+        if _recording.get() or self._queue is None:
+            return
+        name = event.command_name
+        collection = event.command.get(name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection")  # getMore
+        route, request_id = current_request()
+        command = None
+        if name in EXPLAINABLE:
+            command = {k: v for k, v in event.command.items() if not k.startswith("$") and k not in COMMAND_NOISE}
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (name, collection, command, route, request_id)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        loop = self._loop
+        if started is None or loop is None or duration_ms < self.threshold_ms:
+            return
+
+        name, collection, command, route, request_id = started
+        record = {
+            "ts": datetime.now(timezone.utc),
+            "database": event.database_name,
+            "command": name,
+            "collection": collection,
+            "duration_ms": round(duration_ms, 2),
+            "route": route,
+            "request_id": request_id,
+            "failed": isinstance(event, monitoring.CommandFailedEvent),
+        }
+        loop.call_soon_threadsafe(self._enqueue, record, command)
+
+    def _enqueue(self, record: dict, command: Optional[dict]):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((record, command))
+        except asyncio.QueueFull:
+            # Never let diagnostics pile up behind a database that is already slow
+            self.dropped += 1
+
+
+class SlowQueryRecorder:
+    def __init__(self, db, listener: SlowQueryListener, log_bytes: int, explain: bool = True):
+        self.db = db
+        self.listener = listener
+        self.log_bytes = log_bytes
+        self.explain = explain
+        self.recorded = 0
+        self._plans: OrderedDict = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        try:
+            await self.db.create_collection("slow_queries", capped=True, size=self.log_bytes)
+        except CollectionInvalid:
+            pass
+        except (PyMongoError, NotImplementedError) as e:
+            # Deployments without capped collections keep a week of records instead
+            logger.warning(f"Capped slow query log unavailable ({e}); expiring records after {FALLBACK_TTL_DAYS} days")
+            await self.db.slow_queries.create_index("ts", expireAfterSeconds=FALLBACK_TTL_DAYS * 86400)
+        queue = asyncio.Queue(maxsize=1000)
+        self.listener.attach(asyncio.get_running_loop(), queue)
+        self._task = asyncio.create_task(self._record(queue))
+
+    async def stop(self):
+        self.listener.attach(None, None)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _record(self, queue: asyncio.Queue):
+        _recording.set(True)
+        while True:
+            record, command = await queue.get()
+            try:
+                if command is None:
+                    target = {"command": record["command"], "collection": record["collection"]}
+                else:
+                    target = command_shape(record["command"], command)
+                record["shape"] = json.dumps(target, sort_keys=True, default=str)
+                if command is not None and self.explain:
+                    record["plan"] = await self._plan(record["shape"], command)
+                await self.db.slow_queries.insert_one(record)
+                self.recorded += 1
+            except Exception:
+                logger.exception("Could not record slow query")
+
+    async def _plan(self, query_shape: str, command: dict) -> dict:
+        cached = self._plans.get(query_shape)
+        if cached is not None and time.monotonic() < cached[1]:
+            self._plans.move_to_end(query_shape)
+            return cached[0]
+        try:
+            explain = await self.db.command({"explain": command, "verbosity": "queryPlanner"})
+            plan = plan_summary(explain)
+        except Exception as e:
+            # The record is still worth keeping without its plan
+            plan = {"error": str(e) or type(e).__name__}
+        self._plans[query_shape] = (plan, time.monotonic() + PLAN_CACHE_SECONDS)
+        self._plans.move_to_end(query_shape)
+        while len(self._plans) > PLAN_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        return plan
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.listener.threshold_ms,
+            "recorded": self.recorded,
+            "dropped": self.listener.dropped,
+            "active": self._task is not None
+        }
+
+    async def top_offenders(self, limit: int) -> list:
+        pipeline = [
+            {"$group": {
+                "_id": "$shape",
+                "command": {"$first": "$command"},
+                "collection": {"$first": "$collection"},
+                "count": {"$sum": 1},
+                "total_ms": {"$sum": "$duration_ms"},
+                "max_ms": {"$max": "$duration_ms"},
+                "routes": {"$addToSet": "$route"},
+                "last_seen": {"$max": "$ts"},
+                "last_request_id": {"$last": "$request_id"},
+                "plan": {"$last": "$plan"}
+            }},
+            {"$sort": {"total_ms": -1}},
+            {"$limit": limit}
+        ]
+        offenders = await self.db.slow_queries.aggregate(pipeline).to_list(limit)
+        for offender in offenders:
+            offender["shape"] = offender.pop("_id")
+            offender["total_ms"] = round(offender["total_ms"], 2)
+            offender["avg_ms"] = round(offender["total_ms"] / offender["count"], 2)
+        return offenders
+
+
+# Registered on the Motor client when database.connect() creates it
+slow_query_listener = SlowQueryListener(SLOW_QUERY_MS)
+slow_query_recorder = SlowQueryRecorder(
+    db, slow_query_listener, int(SLOW_QUERY_LOG_MB * 1024 * 1024), SLOW_QUERY_EXPLAIN
+)
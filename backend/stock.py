@@ -0,0 +1,134 @@
+"""Stock computation over production, cut and shipment movements.
+
+This is the reference engine behind /api/stock; stock_vectorized.py must match it.
+"""
+import logging
+
+
+def normal_stock_key(kalinlik: float, en: float, renk_kategori: str, renk: str) -> str:
+    return f"Normal_{float(kalinlik)}_{float(en)}_{renk_kategori}_{renk}"
+
+def cut_stock_key(kalinlik: float, en: float, boy: float, renk_kategori: str, renk: str) -> str:
+    return f"Kesilmiş_{float(kalinlik)}_{float(en)}_{float(boy)}_{renk_kategori}_{renk}"
+
+def compute_stock(productions: list, shipments: list, cut_products: list) -> dict:
+    """Fold movements into per-SKU stock rows, keyed like the stock ledger."""
+    stock_dict = {}
+    
+    # Add productions (only normal)
+    for prod in productions:
+        urun_tipi = prod.get('urun_tipi', 'Normal')
+        renk_kategori = prod.get('renk_kategori', 'Renksiz')
+        renk = prod.get('renk', 'Doğal')
+        
+        # Only add Normal productions
+        if urun_tipi == 'Normal':
+            key = normal_stock_key(prod['kalinlik'], prod['en'], renk_kategori, renk)
+            if key not in stock_dict:
+                stock_dict[key] = {
+                    'urun_tipi': 'Normal',
+                    'kalinlik': prod['kalinlik'],
+                    'en': prod['en'],
+                    'boy': None,
+                    'renk_kategori': renk_kategori,
+                    'renk': renk,
+                    'toplam_metre': 0,
+                    'toplam_metrekare': 0,
+                    'toplam_adet': 0,
+                    'birim_metre': prod.get('metre', 0),  # Her rulodan metre
+                    'birim_metrekare': prod.get('metrekare', 0)  # Her rulodan m2
+                }
+            stock_dict[key]['toplam_adet'] += prod['adet']
+    
+    # Add cut products as Kesilmiş stock
+    for cut in cut_products:
+        if 'kesim_kalinlik' in cut and 'kesim_en' in cut and 'kesim_boy' in cut:
+            # kesim_boy is in CM, keep it in CM for matching
+            boy_cm = cut['kesim_boy']
+            renk_kategori = cut.get('kesim_renk_kategori', 'Renksiz')
+            renk = cut.get('kesim_renk', 'Doğal')
+            key = cut_stock_key(cut['kesim_kalinlik'], cut['kesim_en'], boy_cm, renk_kategori, renk)
+            
+            logging.info(f"[KESIM] Adding key: {key}, adet: {cut['kesim_adet']}")
+            
+            if key not in stock_dict:
+                stock_dict[key] = {
+                    'urun_tipi': 'Kesilmiş',
+                    'kalinlik': cut['kesim_kalinlik'],
+                    'en': cut['kesim_en'],
+                    'boy': boy_cm,  # Store in CM
+                    'renk_kategori': renk_kategori,
+                    'renk': renk,
+                    'toplam_metre': 0,
+                    'toplam_metrekare': 0,
+                    'toplam_adet': 0
+                }
+            
+            stock_dict[key]['toplam_adet'] += cut['kesim_adet']
+    
+    # Subtract shipments from stock counts
+    for ship in shipments:
+        urun_tipi = ship.get('urun_tipi', 'Normal')
+        renk_kategori = ship.get('renk_kategori', 'Renksiz')
+        renk = ship.get('renk', 'Doğal')
+        
+        if urun_tipi == 'Kesilmiş':
+            # For kesilmiş ürün, metre field contains boy in CM (not meters!)
+            boy_cm = ship.get('metre', 0)  # It's actually in CM
+            key = cut_stock_key(ship['kalinlik'], ship['en'], boy_cm, renk_kategori, renk)
+            logging.info(f"[SEVKİYAT] Subtracting key: {key}, adet: {ship['adet']}")
+        else:
+            key = normal_stock_key(ship['kalinlik'], ship['en'], renk_kategori, renk)
+        
+        if key in stock_dict:
+            logging.info(f"[EŞLEŞME] Key found: {key}, before: {stock_dict[key]['toplam_adet']}, subtract: {ship['adet']}")
+            stock_dict[key]['toplam_adet'] -= ship['adet']
+            logging.info(f"[EŞLEŞME] After: {stock_dict[key]['toplam_adet']}")
+        else:
+            logging.warning(f"[EŞLEŞMEME] Key not found in stock_dict: {key}")
+            logging.info(f"[EŞLEŞMEME] Available keys: {list(stock_dict.keys())}")
+            # If exact match not found, try to find similar cut products
+            if urun_tipi == 'Kesilmiş':
+                # Check for similar keys with boy values close to this one
+                boy_cm_ship = ship.get('metre', 0)
+                kalinlik = ship['kalinlik']
+                en = ship['en']
+                
+                # Try to match within 1cm tolerance
+                for stock_key in list(stock_dict.keys()):
+                    if stock_key.startswith(f"Kesilmiş_{float(kalinlik)}_{float(en)}_"):
+                        parts = stock_key.split('_')
+                        if len(parts) >= 4:
+                            try:
+                                stock_boy = float(parts[3])
+                                # If within 1cm tolerance, use this stock
+                                if abs(stock_boy - boy_cm_ship) <= 1:
+                                    stock_dict[stock_key]['toplam_adet'] -= ship['adet']
+                                    break
+                            except ValueError:
+                                continue
+    
+    # Subtract cut products from ana malzeme (normal stock)
+    for cut in cut_products:
+        if 'ana_kalinlik' in cut and 'ana_en' in cut:
+            ana_renk_kategori = cut.get('ana_renk_kategori', 'Renksiz')
+            ana_renk = cut.get('ana_renk', 'Doğal')
+            key = normal_stock_key(cut['ana_kalinlik'], cut['ana_en'], ana_renk_kategori, ana_renk)
+            
+            if key in stock_dict:
+                stock_dict[key]['toplam_adet'] -= cut.get('kullanilan_ana_adet', 0)
+    
+    # Final calculation: compute totals based on remaining adet
+    for key, stock in stock_dict.items():
+        if stock['urun_tipi'] == 'Normal' and 'birim_metre' in stock:
+            # BİRİM değerleri kullan (toplam hesaplama!)
+            stock['toplam_metre'] = stock['birim_metre']
+            stock['toplam_metrekare'] = stock['birim_metrekare']
+            # Birim değerleri çıkar
+            del stock['birim_metre']
+            del stock['birim_metrekare']
+        elif stock['urun_tipi'] == 'Kesilmiş':
+            # Kesilmiş ürün için BİRİM metrekare hesapla
+            stock['toplam_metrekare'] = (stock['en'] / 100) * (stock['boy'] / 100)
+    
+    return stock_dict
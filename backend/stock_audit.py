@@ -0,0 +1,295 @@
+"""Offline stock recomputation from database dumps, diffed against /api/stock.
+
+Reads `mongodump` BSON (optionally gzipped) or `mongoexport` NDJSON files of
+productions, shipments and cut_products, never the live database. Archive
+collections (productions_archive_2024.bson, ...) are replayed ahead of the hot ones,
+oldest year first, which gives the same stock as the opening balances.
+
+The dumps are cut into chunks of raw bytes and a process pool folds each chunk into
+per-SKU partials: summed adet plus the first-seen attributes of each SKU with their
+position in the stream. Shipments are summed per target key, since every shipment
+with the same key resolves to the same SKU. Merging the partials SKU by SKU then
+reproduces compute_stock() exactly: first-seen attributes, insertion order and the
+1 cm Kesilmiş tolerance, which picks the first cut SKU of the same thickness and
+width within 1 cm.
+
+    python stock_audit.py dump/sar --api https://host --username admin --password ... --out diff.json
+    python stock_audit.py productions.json shipments.json cut_products.json --workers 8
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import struct
+import sys
+import time
+import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from stock import normal_stock_key, cut_stock_key
+
+MOVEMENT_COLLECTIONS = ["productions", "shipments", "cut_products"]
+DUMP_PATTERN = re.compile(
+    r"^(productions|shipments|cut_products)(?:_archive_(\d{4}))?\.(bson|json|ndjson)(\.gz)?$"
+)
+CHUNK_BYTES = 8 * 1024 * 1024
+AMOUNT_FIELDS = ('toplam_adet', 'toplam_metre', 'toplam_metrekare')
+
+
+# Finding and reading dumps
+def find_dumps(paths: List[str]) -> Dict[str, List[Path]]:
+    """Dump files per collection, archived years first (oldest first), hot collection last."""
+    found = {collection: [] for collection in MOVEMENT_COLLECTIONS}
+    for path in map(Path, paths):
+        for file in (sorted(path.iterdir()) if path.is_dir() else [path]):
+            match = DUMP_PATTERN.match(file.name)
+            if match:
+                # Hot collections sort after every archive year
+                found[match.group(1)].append((match.group(2) or "9999", file))
+            elif not path.is_dir():
+                raise ValueError(f"Not a productions/shipments/cut_products dump: {file}")
+    return {collection: [file for _, file in sorted(files)] for collection, files in found.items()}
+
+
+def _open(file: Path):
+    return gzip.open(file, 'rb') if file.suffix == '.gz' else open(file, 'rb')
+
+
+def read_chunks(file: Path, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[str, bytes]]:
+    """Whole documents in chunks of about `chunk_bytes`, as ("bson" | "json", raw bytes)."""
+    is_bson = '.bson' in file.suffixes
+    with _open(file) as stream:
+        if not is_bson:
+            while True:
+                lines = stream.readlines(chunk_bytes)
+                if not lines:
+                    return
+                yield "json", b"".join(lines)
+
+        # BSON documents start with their own int32 length
+        buffer = bytearray()
+        while True:
+            header = stream.read(4)
+            if len(header) < 4:
+                break
+            (length,) = struct.unpack('<i', header)
+            buffer += header
+            buffer += stream.read(length - 4)
+            if len(buffer) >= chunk_bytes:
+                yield "bson", bytes(buffer)
+                buffer = bytearray()
+        if buffer:
+            yield "bson", bytes(buffer)
+
+
+def decode(fmt: str, raw: bytes) -> list:
+    if fmt == "bson":
+        import bson
+        return bson.decode_all(raw)
+    if b'"$' in raw:
+        # Extended JSON from mongoexport ({"$numberLong": ...}, {"$oid": ...})
+        from bson import json_util
+        return [json_util.loads(line) for line in raw.splitlines() if line.strip()]
+    return [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+
+# Per-chunk partials (run in the pool)
+def fold_chunk(collection: str, position: tuple, fmt: str, raw: bytes) -> dict:
+    """Per-SKU partial of one chunk; `position` orders first-seen attributes across chunks."""
+    skus, shipped, parents = {}, {}, {}
+
+    for index, doc in enumerate(decode(fmt, raw)):
+        if collection == "productions":
+            if doc.get('urun_tipi', 'Normal') != 'Normal':
+                continue
+            renk_kategori = doc.get('renk_kategori', 'Renksiz')
+            renk = doc.get('renk', 'Doğal')
+            key = normal_stock_key(doc['kalinlik'], doc['en'], renk_kategori, renk)
+            sku = skus.get(key)
+            if sku is None:
+                sku = skus[key] = [position + (index,), {
+                    'urun_tipi': 'Normal', 'kalinlik': doc['kalinlik'], 'en': doc['en'], 'boy': None,
+                    'renk_kategori': renk_kategori, 'renk': renk,
+                    'toplam_metre': doc.get('metre', 0), 'toplam_metrekare': doc.get('metrekare', 0)
+                }, 0]
+            sku[2] += doc['adet']
+
+        elif collection == "cut_products":
+            if 'kesim_kalinlik' in doc and 'kesim_en' in doc and 'kesim_boy' in doc:
+                renk_kategori = doc.get('kesim_renk_kategori', 'Renksiz')
+                renk = doc.get('kesim_renk', 'Doğal')
+                key = cut_stock_key(doc['kesim_kalinlik'], doc['kesim_en'], doc['kesim_boy'], renk_kategori, renk)
+                sku = skus.get(key)
+                if sku is None:
+                    sku = skus[key] = [position + (index,), {
+                        'urun_tipi': 'Kesilmiş', 'kalinlik': doc['kesim_kalinlik'], 'en': doc['kesim_en'],
+                        'boy': doc['kesim_boy'], 'renk_kategori': renk_kategori, 'renk': renk,
+                        'toplam_metre': 0,
+                        'toplam_metrekare': (doc['kesim_en'] / 100) * (doc['kesim_boy'] / 100)
+                    }, 0]
+                sku[2] += doc['kesim_adet']
+            if 'ana_kalinlik' in doc and 'ana_en' in doc:
+                key = normal_stock_key(
+                    doc['ana_kalinlik'], doc['ana_en'],
+                    doc.get('ana_renk_kategori', 'Renksiz'), doc.get('ana_renk', 'Doğal')
+                )
+                parents[key] = parents.get(key, 0) + doc.get('kullanilan_ana_adet', 0)
+
+        else:
+            renk_kategori = doc.get('renk_kategori', 'Renksiz')
+            renk = doc.get('renk', 'Doğal')
+            if doc.get('urun_tipi', 'Normal') == 'Kesilmiş':
+                boy = doc.get('metre', 0)
+                key = cut_stock_key(doc['kalinlik'], doc['en'], boy, renk_kategori, renk)
+                target = (key, f"Kesilmiş_{float(doc['kalinlik'])}_{float(doc['en'])}_", boy)
+            else:
+                target = (normal_stock_key(doc['kalinlik'], doc['en'], renk_kategori, renk), None, None)
+            shipped[target] = shipped.get(target, 0) + doc['adet']
+
+    return {"skus": skus, "shipped": shipped, "parents": parents}
+
+
+# Merge
+def empty_partial() -> dict:
+    return {"skus": {}, "shipped": {}, "parents": {}}
+
+
+def merge_into(merged: dict, partial: dict) -> dict:
+    # Order-independent: the earliest position keeps its attributes, amounts add up
+    for key, (position, attrs, adet) in partial["skus"].items():
+        sku = merged["skus"].get(key)
+        if sku is None:
+            merged["skus"][key] = [position, attrs, adet]
+        else:
+            if position < sku[0]:
+                sku[0], sku[1] = position, attrs
+            sku[2] += adet
+    for name in ("shipped", "parents"):
+        for key, amount in partial[name].items():
+            merged[name][key] = merged[name].get(key, 0) + amount
+    return merged
+
+
+def finalize(productions: dict, shipments: dict, cut_products: dict) -> dict:
+    """Merged partials to the same dict compute_stock() returns, in the same order."""
+    stock = {}
+    for key, (_, attrs, adet) in sorted(productions["skus"].items(), key=lambda item: item[1][0]):
+        stock[key] = {**attrs, 'toplam_adet': adet}
+    cut_keys = sorted(cut_products["skus"].items(), key=lambda item: item[1][0])
+    for key, (_, attrs, adet) in cut_keys:
+        stock[key] = {**attrs, 'toplam_adet': adet}
+
+    for (key, prefix, boy), adet in shipments["shipped"].items():
+        if key in stock:
+            stock[key]['toplam_adet'] -= adet
+        elif prefix is not None:
+            # No exact Kesilmiş SKU: the first cut SKU of this thickness and width within 1 cm
+            for candidate, _ in cut_keys:
+                if candidate.startswith(prefix) and abs(float(candidate.split('_')[3]) - boy) <= 1:
+                    stock[candidate]['toplam_adet'] -= adet
+                    break
+
+    for key, adet in cut_products["parents"].items():
+        if key in stock:
+            stock[key]['toplam_adet'] -= adet
+    return stock
+
+
+def recompute(dumps: Dict[str, List[Path]], workers: Optional[int] = None, chunk_bytes: int = CHUNK_BYTES) -> dict:
+    workers = workers or os.cpu_count() or 1
+    merged = {collection: empty_partial() for collection in MOVEMENT_COLLECTIONS}
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A couple of chunks in flight per worker keeps them busy without reading the whole dump into memory
+        for collection, files in dumps.items():
+            for file_index, file in enumerate(files):
+                for chunk_index, (fmt, raw) in enumerate(read_chunks(file, chunk_bytes)):
+                    future = pool.submit(fold_chunk, collection, (file_index, chunk_index), fmt, raw)
+                    pending.append((collection, future))
+                    while len(pending) > 2 * workers:
+                        done_collection, future = pending.popleft()
+                        merge_into(merged[done_collection], future.result())
+        for done_collection, future in pending:
+            merge_into(merged[done_collection], future.result())
+
+    return finalize(merged["productions"], merged["shipments"], merged["cut_products"])
+
+
+# Live API comparison
+def stock_key_of(row: dict) -> str:
+    if row['urun_tipi'] == 'Kesilmiş':
+        return cut_stock_key(row['kalinlik'], row['en'], row['boy'], row['renk_kategori'], row['renk'])
+    return normal_stock_key(row['kalinlik'], row['en'], row['renk_kategori'], row['renk'])
+
+
+def fetch_live_stock(api: str, token: Optional[str], username: Optional[str], password: Optional[str]) -> list:
+    api = api.rstrip('/')
+    if token is None:
+        login = urllib.request.Request(
+            f"{api}/api/auth/login",
+            data=json.dumps({"username": username, "password": password}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(login) as response:
+            token = json.load(response)['access_token']
+    request = urllib.request.Request(f"{api}/api/stock", headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def diff_against(recomputed: dict, live_rows: list) -> list:
+    live = {stock_key_of(row): row for row in live_rows}
+    differences = []
+    for key in sorted(set(recomputed) | set(live)):
+        ours, theirs = recomputed.get(key), live.get(key)
+        if ours is None or theirs is None:
+            differences.append({"key": key, "recomputed": ours, "live": theirs})
+            continue
+        fields = {
+            field: {"recomputed": ours[field], "live": theirs.get(field)}
+            for field in AMOUNT_FIELDS
+            if abs((ours[field] or 0) - (theirs.get(field) or 0)) > 1e-6
+        }
+        if fields:
+            differences.append({"key": key, "fields": fields})
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute stock from dumps and diff it against /api/stock")
+    parser.add_argument("dumps", nargs="+", help="dump files or mongodump database directories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--api", help="base URL of the live backend to compare with")
+    parser.add_argument("--token")
+    parser.add_argument("--username", default=os.environ.get("AUDIT_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("AUDIT_PASSWORD"))
+    parser.add_argument("--out", help="write the stock (or the diff, with --api) here instead of stdout")
+    args = parser.parse_args(argv)
+
+    dumps = find_dumps(args.dumps)
+    start = time.perf_counter()
+    stock = recompute(dumps, args.workers)
+    print(f"{len(stock)} SKUs from {sum(map(len, dumps.values()))} dump files "
+          f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    if args.api:
+        result = diff_against(stock, fetch_live_stock(args.api, args.token, args.username, args.password))
+        print(f"{len(result)} SKUs differ from {args.api}", file=sys.stderr)
+    else:
+        result = list(stock.values())
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(output, encoding='utf-8')
+    else:
+        print(output)
+    return 1 if args.api and result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
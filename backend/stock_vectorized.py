@@ -0,0 +1,221 @@
+"""Vectorized stock engine.
+
+Loads the movements into columnar frames and replaces the per-row dict folding of
+stock.compute_stock with grouped sums and joins. Results are identical to the
+reference engine, including row order and the 1 cm Kesilmiş shipment tolerance.
+
+Benchmark both engines on synthetic histories:
+
+    python stock_vectorized.py 100000 1000000
+"""
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from stock import normal_stock_key, cut_stock_key
+
+NORMAL_KEY = ['k', 'e', 'renk_kategori', 'renk']
+CUT_KEY = ['k', 'e', 'b', 'renk_kategori', 'renk']
+
+
+def _frame(docs: list, columns: list) -> pd.DataFrame:
+    # Missing fields become NaN; the frame index is the position in `docs`
+    return pd.DataFrame.from_records(docs, columns=columns) if docs else pd.DataFrame(columns=columns)
+
+
+def _group(df: pd.DataFrame, keys: list, amount: str) -> pd.DataFrame:
+    # Sum `amount` per key, remembering the first source row in input order
+    grouped = df.assign(pos=df.index).groupby(keys, sort=False, dropna=False)
+    return grouped.agg(adet=(amount, 'sum'), pos=('pos', 'first')).reset_index()
+
+
+def _take(stock: pd.DataFrame, delta: pd.Series):
+    # `delta` is indexed by stock row (order)
+    stock.loc[delta.index, 'adet'] -= delta.values.astype('int64')
+
+
+def _subtract(stock: pd.DataFrame, rows: pd.DataFrame, moves: pd.DataFrame, keys: list):
+    # Exact-key matches of `moves` against `rows`, a same-type slice of `stock`
+    if moves.empty or rows.empty:
+        return
+    matched = rows[keys + ['order']].merge(moves[keys + ['adet']], on=keys, how='inner')
+    _take(stock, matched.groupby('order')['adet'].sum())
+
+
+def compute_stock_vectorized(productions: list, shipments: list, cut_products: list) -> dict:
+    # Productions: Normal rolls only
+    prod = _frame(productions, ['urun_tipi', 'kalinlik', 'en', 'adet', 'renk_kategori', 'renk'])
+    prod = prod[prod['urun_tipi'].fillna('Normal') == 'Normal']
+    prod = prod.assign(
+        k=prod['kalinlik'].astype(float),
+        e=prod['en'].astype(float),
+        renk_kategori=prod['renk_kategori'].fillna('Renksiz'),
+        renk=prod['renk'].fillna('Doğal')
+    )
+    normal = _group(prod, NORMAL_KEY, 'adet')
+
+    # Cuts add Kesilmiş pieces
+    cut_columns = ['kesim_kalinlik', 'kesim_en', 'kesim_boy', 'kesim_renk_kategori', 'kesim_renk', 'kesim_adet',
+                   'ana_kalinlik', 'ana_en', 'ana_renk_kategori', 'ana_renk', 'kullanilan_ana_adet']
+    cuts = _frame(cut_products, cut_columns)
+    pieces = cuts[cuts['kesim_kalinlik'].notna() & cuts['kesim_en'].notna() & cuts['kesim_boy'].notna()]
+    pieces = pieces.assign(
+        k=pieces['kesim_kalinlik'].astype(float),
+        e=pieces['kesim_en'].astype(float),
+        b=pieces['kesim_boy'].astype(float),
+        renk_kategori=pieces['kesim_renk_kategori'].fillna('Renksiz'),
+        renk=pieces['kesim_renk'].fillna('Doğal')
+    )
+    cut = _group(pieces, CUT_KEY, 'kesim_adet')
+
+    # One row per SKU in the reference engine's insertion order: Normal first, then Kesilmiş
+    normal = normal.assign(urun_tipi='Normal', b=np.nan)
+    cut = cut.assign(urun_tipi='Kesilmiş')
+    stock = pd.concat([normal, cut], ignore_index=True)
+    stock['order'] = stock.index
+    stock['adet'] = stock['adet'].astype('int64')
+    normal_rows = stock[stock['urun_tipi'] == 'Normal']
+    cut_rows = stock[stock['urun_tipi'] == 'Kesilmiş']
+
+    # Shipments
+    ship = _frame(shipments, ['urun_tipi', 'kalinlik', 'en', 'metre', 'adet', 'renk_kategori', 'renk'])
+    ship = ship.assign(
+        urun_tipi=ship['urun_tipi'].fillna('Normal'),
+        k=ship['kalinlik'].astype(float),
+        e=ship['en'].astype(float),
+        b=ship['metre'].fillna(0).astype(float),  # Kesilmiş shipments carry boy in CM here
+        renk_kategori=ship['renk_kategori'].fillna('Renksiz'),
+        renk=ship['renk'].fillna('Doğal')
+    )
+    is_cut = ship['urun_tipi'] == 'Kesilmiş'
+    _subtract(stock, normal_rows, _group(ship[~is_cut], NORMAL_KEY, 'adet'), NORMAL_KEY)
+
+    cut_ships = _group(ship[is_cut], CUT_KEY, 'adet')
+    if not cut_ships.empty:
+        exact = cut_ships.merge(cut_rows[CUT_KEY], on=CUT_KEY, how='left', indicator=True)
+        _subtract(stock, cut_rows, exact[exact['_merge'] == 'both'], CUT_KEY)
+
+        # Unmatched: the reference engine takes the first Kesilmiş SKU (in insertion order)
+        # with the same kalinlik/en, any colour, whose boy is within 1 cm. That is "first",
+        # not "nearest", so this is a range join + min(order) rather than merge_asof.
+        unmatched = exact[exact['_merge'] == 'left_only'].drop(columns='_merge').reset_index(drop=True)
+        if not unmatched.empty and not cut_rows.empty:
+            candidates = unmatched.assign(ship=unmatched.index).merge(
+                cut_rows[['k', 'e', 'b', 'order']], on=['k', 'e'], suffixes=('', '_stock')
+            )
+            candidates = candidates[(candidates['b_stock'] - candidates['b']).abs() <= 1]
+            if not candidates.empty:
+                first = candidates.loc[candidates.groupby('ship')['order'].idxmin()]
+                _take(stock, first.groupby('order')['adet'].sum())
+
+    # Parent rolls used by cuts come out of Normal stock
+    parents = cuts[cuts['ana_kalinlik'].notna() & cuts['ana_en'].notna()]
+    parents = parents.assign(
+        k=parents['ana_kalinlik'].astype(float),
+        e=parents['ana_en'].astype(float),
+        renk_kategori=parents['ana_renk_kategori'].fillna('Renksiz'),
+        renk=parents['ana_renk'].fillna('Doğal'),
+        kullanilan_ana_adet=parents['kullanilan_ana_adet'].fillna(0)
+    )
+    _subtract(stock, normal_rows, _group(parents, NORMAL_KEY, 'kullanilan_ana_adet'), NORMAL_KEY)
+
+    # Build the rows from the first source document of each SKU, as the reference does
+    result = {}
+    for row in stock.itertuples(index=False):
+        if row.urun_tipi == 'Normal':
+            first = productions[row.pos]
+            key = normal_stock_key(row.k, row.e, row.renk_kategori, row.renk)
+            result[key] = {
+                'urun_tipi': 'Normal',
+                'kalinlik': first['kalinlik'],
+                'en': first['en'],
+                'boy': None,
+                'renk_kategori': row.renk_kategori,
+                'renk': row.renk,
+                'toplam_metre': first.get('metre', 0),
+                'toplam_metrekare': first.get('metrekare', 0),
+                'toplam_adet': int(row.adet)
+            }
+        else:
+            first = cut_products[row.pos]
+            key = cut_stock_key(row.k, row.e, row.b, row.renk_kategori, row.renk)
+            result[key] = {
+                'urun_tipi': 'Kesilmiş',
+                'kalinlik': first['kesim_kalinlik'],
+                'en': first['kesim_en'],
+                'boy': first['kesim_boy'],
+                'renk_kategori': row.renk_kategori,
+                'renk': row.renk,
+                'toplam_metre': 0,
+                'toplam_metrekare': (first['kesim_en'] / 100) * (first['kesim_boy'] / 100),
+                'toplam_adet': int(row.adet)
+            }
+    return result
+
+
+# Benchmark
+def generate_movements(count: int, seed: int = 0):
+    """Synthetic history with `count` movements split across the three collections."""
+    rng = random.Random(seed)
+    colours = [('Renksiz', 'Doğal'), ('Renkli', 'Sarı'), ('Renkli', 'Mavi'), ('Şeffaf', 'Şeffaf')]
+    thicknesses = [1.0, 1.5, 2.0, 3.0, 5.0]
+    widths = [100.0, 120.0, 150.0, 200.0]
+    boys = [50.0, 100.0, 150.0, 200.0, 250.0]
+
+    productions, shipments, cut_products = [], [], []
+    for _ in range(count):
+        renk_kategori, renk = rng.choice(colours)
+        kalinlik, en = rng.choice(thicknesses), rng.choice(widths)
+        roll = rng.random()
+        if roll < 0.5:
+            productions.append({
+                'kalinlik': kalinlik, 'en': en, 'metre': 100.0, 'metrekare': en, 'adet': rng.randint(1, 20),
+                'renk_kategori': renk_kategori, 'renk': renk, 'urun_tipi': 'Normal'
+            })
+        elif roll < 0.7:
+            cut_products.append({
+                'ana_kalinlik': kalinlik, 'ana_en': en, 'ana_renk_kategori': renk_kategori, 'ana_renk': renk,
+                'kesim_kalinlik': kalinlik, 'kesim_en': en, 'kesim_boy': rng.choice(boys),
+                'kesim_renk_kategori': renk_kategori, 'kesim_renk': renk,
+                'kesim_adet': rng.randint(1, 50), 'kullanilan_ana_adet': rng.randint(1, 3)
+            })
+        elif roll < 0.85:
+            shipments.append({
+                'urun_tipi': 'Normal', 'kalinlik': kalinlik, 'en': en, 'metre': 100.0, 'adet': rng.randint(1, 5),
+                'renk_kategori': renk_kategori, 'renk': renk
+            })
+        else:
+            # Mostly exact boy matches, some within the 1 cm tolerance
+            boy = rng.choice(boys) + rng.choice([0.0, 0.0, 0.0, 0.5, -1.0])
+            shipments.append({
+                'urun_tipi': 'Kesilmiş', 'kalinlik': kalinlik, 'en': en, 'metre': boy, 'adet': rng.randint(1, 10),
+                'renk_kategori': renk_kategori, 'renk': renk
+            })
+    return productions, shipments, cut_products
+
+
+def _benchmark(count: int):
+    import logging
+    from stock import compute_stock
+
+    logging.disable(logging.CRITICAL)
+    productions, shipments, cut_products = generate_movements(count)
+
+    start = time.perf_counter()
+    reference = compute_stock(productions, shipments, cut_products)
+    python_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = compute_stock_vectorized(productions, shipments, cut_products)
+    pandas_seconds = time.perf_counter() - start
+
+    print(f"{count:>9} movements  python {python_seconds:7.3f}s  pandas {pandas_seconds:7.3f}s  "
+          f"speedup {python_seconds / pandas_seconds:5.1f}x  parity {'OK' if reference == vectorized else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:] or ['100000', '1000000']:
+        _benchmark(int(arg))
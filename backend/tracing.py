@@ -0,0 +1,297 @@
+"""In-process request tracing.
+
+A sampled request (TRACE_SAMPLE_RATE, or any request sent with `X-Trace: 1`) gets a
+trace with spans for request validation and dependencies (auth has its own span),
+the endpoint, every MongoDB command and response serialization. Finished traces
+go to a ring buffer of TRACE_BUFFER_SIZE. /api/debug/traces shows them as
+waterfalls, and /api/debug/traces/otlp exports them as OTLP/JSON that any
+OpenTelemetry collector or viewer can load. Nothing is sent anywhere.
+
+An unsampled request costs one random() call, and each instrumented point costs
+one context variable lookup.
+"""
+import contextvars
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from pymongo import monitoring
+
+from config import TRACE_SAMPLE_RATE, TRACE_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span", default=None)
+
+
+def _new_id(length: int) -> str:
+    return os.urandom(length).hex()
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Optional[dict] = None):
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter_ns()
+        self.end = None
+        self.attributes = attributes or {}
+
+
+class Trace:
+    def __init__(self, method: str, path: str, request_id: Optional[str]):
+        self.trace_id = _new_id(16)
+        self.request_id = request_id
+        self.method = method
+        self.route = path
+        self.status = None
+        # Wall-clock anchor for OTLP; span times are monotonic offsets from `origin`
+        self.wall_start = time.time_ns()
+        self.origin = time.perf_counter_ns()
+        self.spans = []
+
+    def to_wall(self, perf_ns: int) -> int:
+        return self.wall_start + perf_ns - self.origin
+
+    def waterfall(self) -> dict:
+        depth = {None: -1}
+        rows = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            depth[s.span_id] = depth.get(s.parent_id, 0) + 1
+            end = s.end if s.end is not None else s.start
+            rows.append({
+                "name": s.name,
+                "depth": depth[s.span_id],
+                "start_ms": round((s.start - self.origin) / 1e6, 3),
+                "duration_ms": round((end - s.start) / 1e6, 3),
+                **({"attributes": s.attributes} if s.attributes else {})
+            })
+        root = self.spans[0] if self.spans else None
+        return {
+            "trace_id": self.trace_id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "route": self.route,
+            "status": self.status,
+            "start": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(self.wall_start / 1e9)),
+            "duration_ms": round(((root.end or root.start) - root.start) / 1e6, 3) if root else 0,
+            "spans": rows
+        }
+
+
+class _NoSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Optional[dict]):
+        self.trace = trace
+        self.span = Span(name, _current_span.get(), attributes)
+
+    def __enter__(self):
+        self.trace.spans.append(self.span)
+        self.token = _current_span.set(self.span.span_id)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        _current_span.reset(self.token)
+        return False
+
+
+def span(name: str, attributes: Optional[dict] = None):
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _SpanContext(trace, name, attributes)
+
+
+def traced(name: str):
+    """Decorator for coroutine functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return await fn(*args, **kwargs)
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TraceBuffer:
+    def __init__(self, size: int):
+        self._traces = deque(maxlen=size)
+
+    def add(self, trace: Trace):
+        self._traces.append(trace)
+
+    def recent(self, limit: int) -> list:
+        return list(self._traces)[-limit:][::-1]
+
+    def find(self, trace_id: str) -> Optional[Trace]:
+        return next((t for t in self._traces if t.trace_id == trace_id), None)
+
+
+trace_buffer = TraceBuffer(TRACE_BUFFER_SIZE)
+
+
+class TracingMiddleware:
+    def __init__(self, app, sample_rate: float = TRACE_SAMPLE_RATE, buffer: TraceBuffer = trace_buffer):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.buffer = buffer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if random.random() >= self.sample_rate and (b"x-trace", b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"], scope.get("state", {}).get("request_id"))
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        try:
+            with span("request", {"http.target": scope["path"]}):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            _current_trace.reset(token)
+            route = scope.get("route")
+            trace.route = getattr(route, "path", None) or scope["path"]
+            self.buffer.add(trace)
+
+
+class TracingCommandListener(monitoring.CommandListener):
+    """Mongo spans. Motor runs commands in executor threads with a copy of the caller's
+    context, so the trace and parent span are visible here."""
+
+    def __init__(self):
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        s = Span(f"mongo.{event.command_name}", _current_span.get(), {
+            "db.collection": collection if isinstance(collection, str) else command.get("collection")
+        })
+        trace.spans.append(s)
+        with self._lock:
+            self._open[(event.connection_id, event.request_id)] = s
+
+    def succeeded(self, event):
+        self._close(event)
+
+    def failed(self, event):
+        self._close(event, failed=True)
+
+    def _close(self, event, failed: bool = False):
+        with self._lock:
+            s = self._open.pop((event.connection_id, event.request_id), None)
+        if s is None:
+            return
+        # Server-reported duration; the listener may run a little after the reply arrived
+        s.end = s.start + event.duration_micros * 1000
+        if failed:
+            s.attributes["error"] = True
+
+
+tracing_listener = TracingCommandListener()
+
+
+# FastAPI has no public hook around these steps, so instrument_routing() wraps the
+# private module functions its request handler calls by name. Checked against the
+# FastAPI pinned in requirements.txt (tests/test_tracing.py fails when that changes).
+ROUTING_HOOKS = {"solve_dependencies": "validate", "run_endpoint_function": "endpoint", "serialize_response": "serialize"}
+
+
+def routing_hooks_available() -> bool:
+    import fastapi.routing as routing
+
+    handler_names = set()
+    for code in (routing.get_request_handler.__code__, *routing.get_request_handler.__code__.co_consts):
+        handler_names.update(getattr(code, "co_names", ()))
+    return all(hasattr(routing, name) and name in handler_names for name in ROUTING_HOOKS)
+
+
+def instrument_routing():
+    """Spans around FastAPI's request validation, endpoint call and response serialization."""
+    import fastapi
+    import fastapi.routing as routing
+
+    if getattr(routing, "_sar_traced", False):
+        return
+    if not routing_hooks_available():
+        logger.warning(f"FastAPI {fastapi.__version__} no longer calls {', '.join(ROUTING_HOOKS)} by name; "
+                       "traces will only have the request and MongoDB spans")
+        return
+    for name, span_name in ROUTING_HOOKS.items():
+        setattr(routing, name, traced(span_name)(getattr(routing, name)))
+    routing._sar_traced = True
+
+
+# OTLP/JSON (https://opentelemetry.io/docs/specs/otlp/#json-protobuf-encoding)
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(traces: list, service_name: str = "sar-backend") -> dict:
+    spans = []
+    for trace in traces:
+        for s in trace.spans:
+            attributes = dict(s.attributes)
+            if s.parent_id is None:
+                attributes.update({
+                    "http.method": trace.method, "http.route": trace.route,
+                    "http.status_code": trace.status or 0, "request.id": trace.request_id or ""
+                })
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": s.span_id,
+                **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                "name": f"{trace.method} {trace.route}" if s.parent_id is None else s.name,
+                "kind": 2 if s.parent_id is None else (3 if s.name.startswith("mongo.") else 1),
+                "startTimeUnixNano": str(trace.to_wall(s.start)),
+                "endTimeUnixNano": str(trace.to_wall(s.end if s.end is not None else s.start)),
+                "attributes": [_attribute(key, value) for key, value in attributes.items()],
+                "status": {"code": 2 if "error" in s.attributes else 1}
+            })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [_attribute("service.name", service_name)]},
+        "scopeSpans": [{"scope": {"name": "sar.tracing"}, "spans": spans}]
+    }]}
@@ -307,6 +307,37 @@ def test_cut_product_stock_scenario(token):
         "Content-Type": "application/json"
     }
     
+    # Step 0: Produce the parent roll (cuts now reserve parent stock)
+    try:
+        parent_production_data = {
+            "tarih": "2025-10-28",
+            "makine": "Makine 1",
+            "kalinlik": 1.5,
+            "en": 100,
+            "metre": 50,
+            "metrekare": 50,
+            "adet": 1,
+            "masura_tipi": "Karton",
+            "renk_kategori": "Renksiz",
+            "renk": "Doğal"
+        }
+        
+        response = requests.post(f"{API_BASE}/production", 
+                               json=parent_production_data, 
+                               headers=headers, 
+                               timeout=10)
+        
+        if response.status_code == 200:
+            results.add_result("Step 0: Add Parent Roll", True, "Parent roll produced")
+        else:
+            results.add_result("Step 0: Add Parent Roll", False, 
+                             f"Status: {response.status_code}, Response: {response.text}")
+            return results
+            
+    except Exception as e:
+        results.add_result("Step 0: Add Parent Roll", False, f"Error: {str(e)}")
+        return results
+    
     # Step 1: Add Cut Product
     try:
         cut_product_data = {
@@ -396,7 +427,7 @@ def test_cut_product_stock_scenario(token):
             "urun_tipi": "Kesilmiş",
             "kalinlik": 1.5,
             "en": 100,
-            "metre": 2.0,  # boy in meters (200cm = 2.0m)
+            "metre": 200,  # Kesilmiş shipments carry boy in CM
             "metrekare": 2.0,
             "adet": 5,
             "renk_kategori": "Renksiz",
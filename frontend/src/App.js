@@ -16,6 +16,7 @@ import logo from '@/assets/logo.png';
 import '@/App.css';
 import { Toaster } from '@/components/ui/sonner';
 import { toast } from 'sonner';
+import { resetSync } from '@/lib/sync';
 
 function ProtectedRoute({ children }) {
   const token = localStorage.getItem('token');
@@ -163,6 +164,7 @@ function App() {
     localStorage.removeItem('token');
     localStorage.removeItem('role');
     localStorage.removeItem('username');
+    resetSync();
     setUser(null);
     toast.success('Çıkış yapıldı');
   };
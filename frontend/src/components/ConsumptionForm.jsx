@@ -10,6 +10,7 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } f
 import { toast } from 'sonner';
 import { Pencil, Trash2, Factory, Flame } from 'lucide-react';
 import api from '@/lib/axios';
+import { fetchSynced } from '@/lib/sync';
 
 const MAKINELER = ['Makine 1', 'Makine 2'];
 
@@ -35,8 +36,7 @@ const ConsumptionForm = ({ userRole }) => {
 
   const fetchConsumptions = async () => {
     try {
-      const response = await api.get('/daily-consumption');
-      setConsumptions(response.data);
+      setConsumptions(await fetchSynced('daily_consumptions'));
     } catch (error) {
       console.error(error);
     }
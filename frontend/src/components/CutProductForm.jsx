@@ -4,11 +4,13 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
-import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { TableCell, TableRow } from '@/components/ui/table';
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from '@/components/ui/alert-dialog';
 import { toast } from 'sonner';
 import { Trash2 } from 'lucide-react';
+import VirtualTable, { DateRangeFilter } from '@/components/VirtualTable';
 import api from '@/lib/axios';
+import { usePagedTable } from '@/lib/pagedTable';
 
 const RENK_KATEGORILER = ['Renkli', 'Renksiz', 'Şeffaf'];
 const RENKLER = {
@@ -35,22 +37,21 @@ const CutProductForm = () => {
 
   const [anaMetrekare, setAnaMetrekare] = useState(0);
   const [kullanilanAnaAdet, setKullanilanAnaAdet] = useState(0);
-  const [cutProducts, setCutProducts] = useState([]);
+  const [sort, setSort] = useState('-tarih');
+  const [filters, setFilters] = useState({ baslangic: '', bitis: '', kesim_en: '' });
+  const cutProducts = usePagedTable('/cut-product/page', sort, filters);
   const [editingId, setEditingId] = useState(null);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
 
-  useEffect(() => {
-    fetchCutProducts();
-  }, []);
-
-  const fetchCutProducts = async () => {
-    try {
-      const response = await api.get('/cut-product');
-      setCutProducts(response.data);
-    } catch (error) {
-      console.error(error);
-    }
-  };
+  const columns = [
+    { label: 'Tarih', sort: 'tarih' },
+    { label: 'Ana Malzeme', sort: 'ana_en' },
+    { label: 'Kesilmiş Ebat', sort: 'kesim_en' },
+    { label: 'Kesilmiş Adet', sort: 'kesim_adet' },
+    { label: 'Kullanılan Ana', sort: 'kullanilan_ana_adet' },
+    { label: 'Renk', sort: 'kesim_renk' },
+    { label: 'İşlemler', className: 'text-right' }
+  ];
 
   useEffect(() => {
     const en = parseFloat(formData.ana_en);
@@ -151,7 +152,7 @@ const CutProductForm = () => {
       });
       setAnaMetrekare(0);
       setKullanilanAnaAdet(0);
-      fetchCutProducts();
+      cutProducts.refresh();
     } catch (error) {
       toast.error('Kesilmiş ürün kaydı eklenirken hata oluştu!');
       console.error(error);
@@ -162,7 +163,7 @@ const CutProductForm = () => {
     try {
       await api.delete(`/cut-product/${id}`);
       toast.success('Kesilmiş ürün kaydı silindi!');
-      fetchCutProducts();
+      cutProducts.refresh();
     } catch (error) {
       toast.error('Silme hatası!');
       console.error(error);
@@ -428,75 +429,73 @@ const CutProductForm = () => {
           <CardTitle className="text-white" style={{ fontFamily: 'Space Grotesk, sans-serif' }}>
             Kesilmiş Ürün Kayıtları
           </CardTitle>
+          <div className="flex flex-wrap gap-2 pt-2">
+            <DateRangeFilter filters={filters} onChange={setFilters} />
+            <Input
+              type="number"
+              step="0.01"
+              value={filters.kesim_en}
+              onChange={(e) => setFilters({ ...filters, kesim_en: e.target.value })}
+              placeholder="Kesim eni (cm)"
+              className="bg-slate-800/50 border-slate-700 text-white w-40"
+            />
+          </div>
         </CardHeader>
         <CardContent>
-          {cutProducts.length === 0 ? (
-            <div className="text-center py-8 text-slate-400">Henüz kesilmiş ürün kaydı yok</div>
-          ) : (
-            <div className="rounded-md border border-slate-800 overflow-hidden">
-              <Table>
-                <TableHeader className="bg-slate-800/50">
-                  <TableRow className="border-slate-700">
-                    <TableHead className="text-slate-200">Tarih</TableHead>
-                    <TableHead className="text-slate-200">Ana Malzeme</TableHead>
-                    <TableHead className="text-slate-200">Kesilmiş Ebat</TableHead>
-                    <TableHead className="text-slate-200">Kesilmiş Adet</TableHead>
-                    <TableHead className="text-slate-200">Kullanılan Ana</TableHead>
-                    <TableHead className="text-slate-200">Renk</TableHead>
-                    <TableHead className="text-slate-200 text-right">İşlemler</TableHead>
-                  </TableRow>
-                </TableHeader>
-                <TableBody>
-                  {cutProducts.map((cut) => (
-                    <TableRow key={cut.id} className="border-slate-800 hover:bg-slate-800/30">
-                      <TableCell className="text-slate-300">{cut.tarih}</TableCell>
-                      <TableCell className="text-slate-300">
-                        {cut.ana_kalinlik}mm x {cut.ana_en}cm x {cut.ana_metre}m
-                        <br />
-                        <span className="text-xs text-slate-500">({cut.ana_metrekare.toFixed(2)} m²)</span>
-                      </TableCell>
-                      <TableCell className="text-amber-400 font-semibold">
-                        {cut.kesim_kalinlik}mm x {cut.kesim_en}cm x {cut.kesim_boy}cm
-                      </TableCell>
-                      <TableCell className="text-amber-400 font-bold">{cut.kesim_adet}</TableCell>
-                      <TableCell className="text-emerald-400 font-bold text-lg">{cut.kullanilan_ana_adet} adet</TableCell>
-                      <TableCell className="text-slate-300">{cut.kesim_renk}</TableCell>
-                      <TableCell className="text-right">
-                        <AlertDialog>
-                          <AlertDialogTrigger asChild>
-                            <Button
-                              variant="ghost"
-                              size="icon"
-                              className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
-                            >
-                              <Trash2 className="h-4 w-4" />
-                            </Button>
-                          </AlertDialogTrigger>
-                          <AlertDialogContent className="bg-slate-900 border-slate-800">
-                            <AlertDialogHeader>
-                              <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
-                              <AlertDialogDescription className="text-slate-400">
-                                Bu kesilmiş ürün kaydı silinecek. Bu işlem geri alınamaz.
-                              </AlertDialogDescription>
-                            </AlertDialogHeader>
-                            <AlertDialogFooter>
-                              <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
-                              <AlertDialogAction 
-                                onClick={() => handleDelete(cut.id)}
-                                className="bg-red-600 hover:bg-red-700"
-                              >
-                                Sil
-                              </AlertDialogAction>
-                            </AlertDialogFooter>
-                          </AlertDialogContent>
-                        </AlertDialog>
-                      </TableCell>
-                    </TableRow>
-                  ))}
-                </TableBody>
-              </Table>
-            </div>
-          )}
+          <VirtualTable
+            table={cutProducts}
+            columns={columns}
+            sort={sort}
+            onSort={setSort}
+            rowHeight={61}
+            emptyText={Object.values(filters).some(Boolean) ? 'Filtreye uyan kayıt yok' : 'Henüz kesilmiş ürün kaydı yok'}
+            renderRow={(cut) => (
+              <TableRow className="border-slate-800 hover:bg-slate-800/30">
+                <TableCell className="text-slate-300">{cut.tarih}</TableCell>
+                <TableCell className="text-slate-300">
+                  {cut.ana_kalinlik}mm x {cut.ana_en}cm x {cut.ana_metre}m
+                  <br />
+                  <span className="text-xs text-slate-500">({cut.ana_metrekare.toFixed(2)} m²)</span>
+                </TableCell>
+                <TableCell className="text-amber-400 font-semibold">
+                  {cut.kesim_kalinlik}mm x {cut.kesim_en}cm x {cut.kesim_boy}cm
+                </TableCell>
+                <TableCell className="text-amber-400 font-bold">{cut.kesim_adet}</TableCell>
+                <TableCell className="text-emerald-400 font-bold text-lg">{cut.kullanilan_ana_adet} adet</TableCell>
+                <TableCell className="text-slate-300">{cut.kesim_renk}</TableCell>
+                <TableCell className="text-right">
+                  <AlertDialog>
+                    <AlertDialogTrigger asChild>
+                      <Button
+                        variant="ghost"
+                        size="icon"
+                        className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
+                      >
+                        <Trash2 className="h-4 w-4" />
+                      </Button>
+                    </AlertDialogTrigger>
+                    <AlertDialogContent className="bg-slate-900 border-slate-800">
+                      <AlertDialogHeader>
+                        <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
+                        <AlertDialogDescription className="text-slate-400">
+                          Bu kesilmiş ürün kaydı silinecek. Bu işlem geri alınamaz.
+                        </AlertDialogDescription>
+                      </AlertDialogHeader>
+                      <AlertDialogFooter>
+                        <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
+                        <AlertDialogAction 
+                          onClick={() => handleDelete(cut.id)}
+                          className="bg-red-600 hover:bg-red-700"
+                        >
+                          Sil
+                        </AlertDialogAction>
+                      </AlertDialogFooter>
+                    </AlertDialogContent>
+                  </AlertDialog>
+                </TableCell>
+              </TableRow>
+            )}
+          />
         </CardContent>
       </Card>
     </div>
@@ -1,15 +1,18 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
-import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { TableCell, TableRow } from '@/components/ui/table';
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from '@/components/ui/alert-dialog';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } from '@/components/ui/dialog';
 import { toast } from 'sonner';
 import { Pencil, Trash2 } from 'lucide-react';
+import VirtualTable, { DateRangeFilter } from '@/components/VirtualTable';
 import api from '@/lib/axios';
+import { usePagedTable } from '@/lib/pagedTable';
+import { flushOutbox, isOffline, isRejected, queueMutation, rejectionReason, reportRejections } from '@/lib/sync';
 
 const RENK_KATEGORILER = ['Renkli', 'Renksiz', 'Şeffaf'];
 const RENKLER = {
@@ -32,24 +35,26 @@ const ProductionForm = ({ userRole }) => {
   });
 
   const [metrekare, setMetrekare] = useState(0);
-  const [productions, setProductions] = useState([]);
+  const [sort, setSort] = useState('-tarih');
+  const [filters, setFilters] = useState({ baslangic: '', bitis: '', makine: '' });
+  const productions = usePagedTable('/production/page', sort, filters);
   const [editingId, setEditingId] = useState(null);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
   
   const isAdmin = userRole === 'admin';
 
-  useEffect(() => {
-    fetchProductions();
-  }, []);
-
-  const fetchProductions = async () => {
-    try {
-      const response = await api.get('/production');
-      setProductions(response.data.filter(p => p.urun_tipi === 'Normal'));
-    } catch (error) {
-      console.error(error);
-    }
-  };
+  const columns = [
+    { label: 'Tarih', sort: 'tarih' },
+    { label: 'Makine', sort: 'makine' },
+    { label: 'Kalınlık', sort: 'kalinlik' },
+    { label: 'En', sort: 'en' },
+    { label: 'Metre', sort: 'metre' },
+    { label: 'm²', sort: 'metrekare' },
+    { label: 'Adet', sort: 'adet' },
+    { label: 'Masura', sort: 'masura_tipi' },
+    { label: 'Renk', sort: 'renk' },
+    ...(isAdmin ? [{ label: 'İşlemler', className: 'text-right' }] : [])
+  ];
 
   const handleChange = (name, value) => {
     setFormData(prev => {
@@ -92,8 +97,26 @@ const ProductionForm = ({ userRole }) => {
         setEditingId(null);
         setIsEditDialogOpen(false);
       } else {
-        await api.post('/production', payload);
-        toast.success('Üretim kaydı eklendi!');
+        const { key } = queueMutation('production', 'create', payload);
+        try {
+          const results = await flushOutbox();
+          reportRejections(results.filter((r) => r.key !== key));
+          const result = results.find((r) => r.key === key);
+          if (isRejected(result)) {
+            toast.error(`Kayıt reddedildi: ${rejectionReason(result)}`);
+            return;
+          }
+          if (result.status === 200) {
+            toast.success('Üretim kaydı eklendi!');
+          } else {
+            toast.warning('Kayıt şu an işlenemedi: kuyrukta bekliyor, tekrar gönderilecek.');
+          }
+        } catch (error) {
+          if (!isOffline(error)) {
+            throw error;
+          }
+          toast.warning('Bağlantı yok: kayıt kuyruğa alındı, bağlantı gelince gönderilecek.');
+        }
       }
       
       setFormData({
@@ -108,7 +131,7 @@ const ProductionForm = ({ userRole }) => {
         renk: ''
       });
       setMetrekare(0);
-      fetchProductions();
+      productions.refresh();
     } catch (error) {
       toast.error('Hata oluştu!');
       console.error(error);
@@ -136,7 +159,7 @@ const ProductionForm = ({ userRole }) => {
     try {
       await api.delete(`/production/${id}`);
       toast.success('Üretim kaydı silindi!');
-      fetchProductions();
+      productions.refresh();
     } catch (error) {
       toast.error('Silme hatası!');
       console.error(error);
@@ -335,89 +358,85 @@ const ProductionForm = ({ userRole }) => {
           <CardTitle className="text-white" style={{ fontFamily: 'Space Grotesk, sans-serif' }}>
             Üretim Kayıtları {!isAdmin && '(Sadece Görüntüleme)'}
           </CardTitle>
+          <div className="flex flex-wrap gap-2 pt-2">
+            <DateRangeFilter filters={filters} onChange={setFilters} />
+            <Select value={filters.makine || 'hepsi'} onValueChange={(value) => setFilters({ ...filters, makine: value === 'hepsi' ? '' : value })}>
+              <SelectTrigger className="bg-slate-800/50 border-slate-700 text-white w-40">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent className="bg-slate-800 border-slate-700">
+                <SelectItem value="hepsi" className="text-white">Tüm makineler</SelectItem>
+                <SelectItem value="Makine 1" className="text-white">Makine 1</SelectItem>
+                <SelectItem value="Makine 2" className="text-white">Makine 2</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </CardHeader>
         <CardContent>
-          {productions.length === 0 ? (
-            <div className="text-center py-8 text-slate-400">Henüz üretim kaydı yok</div>
-          ) : (
-            <div className="rounded-md border border-slate-800 overflow-hidden">
-              <Table>
-                <TableHeader className="bg-slate-800/50">
-                  <TableRow className="border-slate-700">
-                    <TableHead className="text-slate-200">Tarih</TableHead>
-                    <TableHead className="text-slate-200">Makine</TableHead>
-                    <TableHead className="text-slate-200">Kalınlık</TableHead>
-                    <TableHead className="text-slate-200">En</TableHead>
-                    <TableHead className="text-slate-200">Metre</TableHead>
-                    <TableHead className="text-slate-200">m²</TableHead>
-                    <TableHead className="text-slate-200">Adet</TableHead>
-                    <TableHead className="text-slate-200">Masura</TableHead>
-                    <TableHead className="text-slate-200">Renk</TableHead>
-                    {isAdmin && <TableHead className="text-slate-200 text-right">İşlemler</TableHead>}
-                  </TableRow>
-                </TableHeader>
-                <TableBody>
-                  {productions.map((prod) => (
-                    <TableRow key={prod.id} className="border-slate-800 hover:bg-slate-800/30">
-                      <TableCell className="text-slate-300">{prod.tarih}</TableCell>
-                      <TableCell className="text-slate-300">{prod.makine}</TableCell>
-                      <TableCell className="text-slate-300">{prod.kalinlik} mm</TableCell>
-                      <TableCell className="text-slate-300">{prod.en} cm</TableCell>
-                      <TableCell className="text-slate-300">{prod.metre} m</TableCell>
-                      <TableCell className="text-emerald-400 font-semibold">{prod.metrekare.toFixed(2)}</TableCell>
-                      <TableCell className="text-slate-300">{prod.adet}</TableCell>
-                      <TableCell className="text-blue-400">{prod.masura_tipi}</TableCell>
-                      <TableCell className="text-slate-300">{prod.renk}</TableCell>
-                      {isAdmin && (
-                      <TableCell className="text-right">
-                        {isAdmin && (
-                          <div className="flex items-center justify-end gap-2">
-                            <Button
-                              variant="ghost"
-                              size="icon"
-                              onClick={() => handleEdit(prod)}
-                              className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
-                            >
-                              <Pencil className="h-4 w-4" />
-                            </Button>
-                            <AlertDialog>
-                              <AlertDialogTrigger asChild>
-                                <Button
-                                  variant="ghost"
-                                  size="icon"
-                                  className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
-                                >
-                                  <Trash2 className="h-4 w-4" />
-                                </Button>
-                            </AlertDialogTrigger>
-                            <AlertDialogContent className="bg-slate-900 border-slate-800">
-                              <AlertDialogHeader>
-                                <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
-                                <AlertDialogDescription className="text-slate-400">
-                                  Bu üretim kaydı silinecek. Bu işlem geri alınamaz.
-                                </AlertDialogDescription>
-                              </AlertDialogHeader>
-                              <AlertDialogFooter>
-                                <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
-                                <AlertDialogAction 
-                                  onClick={() => handleDelete(prod.id)}
-                                  className="bg-red-600 hover:bg-red-700"
-                                >
-                                  Sil
-                                </AlertDialogAction>
-                              </AlertDialogFooter>
-                            </AlertDialogContent>
-                          </AlertDialog>
-                        </div>
-                        )}
-                      </TableCell>
-                      )}
-                    </TableRow>
-                  ))}
-                </TableBody>
-              </Table>
-            </div>
-          )}
+          <VirtualTable
+            table={productions}
+            columns={columns}
+            sort={sort}
+            onSort={setSort}
+            emptyText={filters.baslangic || filters.bitis || filters.makine ? 'Filtreye uyan kayıt yok' : 'Henüz üretim kaydı yok'}
+            renderRow={(prod) => (
+              <TableRow className="border-slate-800 hover:bg-slate-800/30">
+                <TableCell className="text-slate-300">{prod.tarih}</TableCell>
+                <TableCell className="text-slate-300">{prod.makine}</TableCell>
+                <TableCell className="text-slate-300">{prod.kalinlik} mm</TableCell>
+                <TableCell className="text-slate-300">{prod.en} cm</TableCell>
+                <TableCell className="text-slate-300">{prod.metre} m</TableCell>
+                <TableCell className="text-emerald-400 font-semibold">{prod.metrekare.toFixed(2)}</TableCell>
+                <TableCell className="text-slate-300">{prod.adet}</TableCell>
+                <TableCell className="text-blue-400">{prod.masura_tipi}</TableCell>
+                <TableCell className="text-slate-300">{prod.renk}</TableCell>
+                {isAdmin && (
+                <TableCell className="text-right">
+                  {isAdmin && (
+                    <div className="flex items-center justify-end gap-2">
+                      <Button
+                        variant="ghost"
+                        size="icon"
+                        onClick={() => handleEdit(prod)}
+                        className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
+                      >
+                        <Pencil className="h-4 w-4" />
+                      </Button>
+                      <AlertDialog>
+                        <AlertDialogTrigger asChild>
+                          <Button
+                            variant="ghost"
+                            size="icon"
+                            className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
+                          >
+                            <Trash2 className="h-4 w-4" />
+                          </Button>
+                      </AlertDialogTrigger>
+                      <AlertDialogContent className="bg-slate-900 border-slate-800">
+                        <AlertDialogHeader>
+                          <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
+                          <AlertDialogDescription className="text-slate-400">
+                            Bu üretim kaydı silinecek. Bu işlem geri alınamaz.
+                          </AlertDialogDescription>
+                        </AlertDialogHeader>
+                        <AlertDialogFooter>
+                          <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
+                          <AlertDialogAction 
+                            onClick={() => handleDelete(prod.id)}
+                            className="bg-red-600 hover:bg-red-700"
+                          >
+                            Sil
+                          </AlertDialogAction>
+                        </AlertDialogFooter>
+                      </AlertDialogContent>
+                    </AlertDialog>
+                  </div>
+                  )}
+                </TableCell>
+                )}
+              </TableRow>
+            )}
+          />
         </CardContent>
       </Card>
 
@@ -4,12 +4,15 @@ import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
-import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { TableCell, TableRow } from '@/components/ui/table';
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from '@/components/ui/alert-dialog';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } from '@/components/ui/dialog';
 import { toast } from 'sonner';
 import { Pencil, Trash2, DollarSign, Package } from 'lucide-react';
+import VirtualTable, { DateRangeFilter } from '@/components/VirtualTable';
 import api from '@/lib/axios';
+import { batchedGet } from '@/lib/batch';
+import { usePagedTable } from '@/lib/pagedTable';
 
 const BIRIMLER = ['Kilogram', 'Adet', 'Litre'];
 const PARA_BIRIMLERI = ['TL', 'USD', 'EUR'];
@@ -26,7 +29,9 @@ const RawMaterialForm = ({ userRole }) => {
 
   const [toplamTutar, setToplamTutar] = useState(0);
   const [tlTutar, setTlTutar] = useState(0);
-  const [materials, setMaterials] = useState([]);
+  const [sort, setSort] = useState('-giris_tarihi');
+  const [filters, setFilters] = useState({ baslangic: '', bitis: '', malzeme: '' });
+  const materials = usePagedTable('/raw-materials/page', sort, filters);
   const [currencyRates, setCurrencyRates] = useState({ usd_rate: 1, eur_rate: 1 });
   const [editingId, setEditingId] = useState(null);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
@@ -34,22 +39,23 @@ const RawMaterialForm = ({ userRole }) => {
   const isAdmin = userRole === 'admin';
 
   useEffect(() => {
-    fetchMaterials();
     fetchCurrencyRates();
   }, []);
 
-  const fetchMaterials = async () => {
-    try {
-      const response = await api.get('/raw-materials');
-      setMaterials(response.data);
-    } catch (error) {
-      console.error(error);
-    }
-  };
+  const columns = [
+    { label: 'Tarih', sort: 'giris_tarihi' },
+    { label: 'Malzeme', sort: 'malzeme_adi' },
+    { label: 'Miktar', sort: 'miktar' },
+    { label: 'Birim Fiyat', sort: 'birim_fiyat' },
+    { label: 'Toplam', sort: 'toplam_tutar' },
+    { label: 'Kur', sort: 'kur' },
+    { label: 'TL Tutar', sort: 'tl_tutar' },
+    ...(isAdmin ? [{ label: 'İşlemler', className: 'text-right' }] : [])
+  ];
 
   const fetchCurrencyRates = async () => {
     try {
-      const response = await api.get('/currency-rates');
+      const response = await batchedGet('/currency-rates');
       setCurrencyRates({
         usd_rate: response.data.usd_rate || 1,
         eur_rate: response.data.eur_rate || 1
@@ -110,7 +116,7 @@ const RawMaterialForm = ({ userRole }) => {
         toast.success('Hammadde kaydı eklendi!');
       }
       
-      fetchMaterials();
+      materials.refresh();
       resetForm();
     } catch (error) {
       toast.error('İşlem başarısız!');
@@ -135,7 +141,7 @@ const RawMaterialForm = ({ userRole }) => {
     try {
       await api.delete(`/raw-materials/${id}`);
       toast.success('Hammadde kaydı silindi!');
-      fetchMaterials();
+      materials.refresh();
     } catch (error) {
       toast.error('Silme işlemi başarısız!');
       console.error(error);
@@ -155,9 +161,8 @@ const RawMaterialForm = ({ userRole }) => {
     setTlTutar(0);
   };
 
-  const getTotalTL = () => {
-    return materials.reduce((sum, mat) => sum + mat.tl_tutar, 0);
-  };
+  // Summed by the server over every record matching the filters
+  const getTotalTL = () => materials.summary.toplam_tl || 0;
 
   return (
     <div className="space-y-6">
@@ -309,83 +314,77 @@ const RawMaterialForm = ({ userRole }) => {
               </p>
             </div>
           </div>
+          <div className="flex flex-wrap gap-2 pt-2">
+            <Input
+              value={filters.malzeme}
+              onChange={(e) => setFilters({ ...filters, malzeme: e.target.value })}
+              placeholder="Malzeme adı..."
+              className="bg-slate-800/50 border-slate-700 text-white w-64"
+            />
+            <DateRangeFilter filters={filters} onChange={setFilters} />
+          </div>
         </CardHeader>
         <CardContent>
-          {materials.length === 0 ? (
-            <div className="text-center py-8 text-slate-400">Henüz hammadde kaydı yok</div>
-          ) : (
-            <div className="rounded-md border border-slate-800 overflow-hidden">
-              <Table>
-                <TableHeader className="bg-slate-800/50">
-                  <TableRow className="border-slate-700">
-                    <TableHead className="text-slate-200">Tarih</TableHead>
-                    <TableHead className="text-slate-200">Malzeme</TableHead>
-                    <TableHead className="text-slate-200">Miktar</TableHead>
-                    <TableHead className="text-slate-200">Birim Fiyat</TableHead>
-                    <TableHead className="text-slate-200">Toplam</TableHead>
-                    <TableHead className="text-slate-200">Kur</TableHead>
-                    <TableHead className="text-slate-200">TL Tutar</TableHead>
-                    {isAdmin && <TableHead className="text-slate-200 text-right">İşlemler</TableHead>}
-                  </TableRow>
-                </TableHeader>
-                <TableBody>
-                  {materials.map((mat) => (
-                    <TableRow key={mat.id} className="border-slate-800">
-                      <TableCell className="text-slate-300">{mat.giris_tarihi}</TableCell>
-                      <TableCell className="text-white font-medium">{mat.malzeme_adi}</TableCell>
-                      <TableCell className="text-slate-300">{mat.miktar} {mat.birim}</TableCell>
-                      <TableCell className="text-slate-300">{mat.birim_fiyat.toFixed(2)} {mat.para_birimi}</TableCell>
-                      <TableCell className="text-slate-300">{mat.toplam_tutar.toFixed(2)} {mat.para_birimi}</TableCell>
-                      <TableCell className="text-slate-300">{mat.kur.toFixed(2)}</TableCell>
-                      <TableCell className="text-emerald-400 font-semibold">{mat.tl_tutar.toFixed(2)} ₺</TableCell>
-                      {isAdmin && (
-                        <TableCell className="text-right">
-                          <div className="flex items-center justify-end gap-2">
-                            <Button
-                              variant="ghost"
-                              size="icon"
-                              onClick={() => handleEdit(mat)}
-                              className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
+          <VirtualTable
+            table={materials}
+            columns={columns}
+            sort={sort}
+            onSort={setSort}
+            emptyText={Object.values(filters).some(Boolean) ? 'Filtreye uyan kayıt yok' : 'Henüz hammadde kaydı yok'}
+            renderRow={(mat) => (
+              <TableRow className="border-slate-800">
+                <TableCell className="text-slate-300">{mat.giris_tarihi}</TableCell>
+                <TableCell className="text-white font-medium">{mat.malzeme_adi}</TableCell>
+                <TableCell className="text-slate-300">{mat.miktar} {mat.birim}</TableCell>
+                <TableCell className="text-slate-300">{mat.birim_fiyat.toFixed(2)} {mat.para_birimi}</TableCell>
+                <TableCell className="text-slate-300">{mat.toplam_tutar.toFixed(2)} {mat.para_birimi}</TableCell>
+                <TableCell className="text-slate-300">{mat.kur.toFixed(2)}</TableCell>
+                <TableCell className="text-emerald-400 font-semibold">{mat.tl_tutar.toFixed(2)} ₺</TableCell>
+                {isAdmin && (
+                  <TableCell className="text-right">
+                    <div className="flex items-center justify-end gap-2">
+                      <Button
+                        variant="ghost"
+                        size="icon"
+                        onClick={() => handleEdit(mat)}
+                        className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
+                      >
+                        <Pencil className="h-4 w-4" />
+                      </Button>
+                      <AlertDialog>
+                        <AlertDialogTrigger asChild>
+                          <Button
+                            variant="ghost"
+                            size="icon"
+                            className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
+                          >
+                            <Trash2 className="h-4 w-4" />
+                          </Button>
+                        </AlertDialogTrigger>
+                        <AlertDialogContent className="bg-slate-900 border-slate-800">
+                          <AlertDialogHeader>
+                            <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
+                            <AlertDialogDescription className="text-slate-400">
+                              Bu hammadde kaydı silinecek. Bu işlem geri alınamaz.
+                            </AlertDialogDescription>
+                          </AlertDialogHeader>
+                          <AlertDialogFooter>
+                            <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
+                            <AlertDialogAction 
+                              onClick={() => handleDelete(mat.id)}
+                              className="bg-red-600 hover:bg-red-700"
                             >
-                              <Pencil className="h-4 w-4" />
-                            </Button>
-                            <AlertDialog>
-                              <AlertDialogTrigger asChild>
-                                <Button
-                                  variant="ghost"
-                                  size="icon"
-                                  className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
-                                >
-                                  <Trash2 className="h-4 w-4" />
-                                </Button>
-                              </AlertDialogTrigger>
-                              <AlertDialogContent className="bg-slate-900 border-slate-800">
-                                <AlertDialogHeader>
-                                  <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
-                                  <AlertDialogDescription className="text-slate-400">
-                                    Bu hammadde kaydı silinecek. Bu işlem geri alınamaz.
-                                  </AlertDialogDescription>
-                                </AlertDialogHeader>
-                                <AlertDialogFooter>
-                                  <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
-                                  <AlertDialogAction 
-                                    onClick={() => handleDelete(mat.id)}
-                                    className="bg-red-600 hover:bg-red-700"
-                                  >
-                                    Sil
-                                  </AlertDialogAction>
-                                </AlertDialogFooter>
-                              </AlertDialogContent>
-                            </AlertDialog>
-                          </div>
-                        </TableCell>
-                      )}
-                    </TableRow>
-                  ))}
-                </TableBody>
-              </Table>
-            </div>
-          )}
+                              Sil
+                            </AlertDialogAction>
+                          </AlertDialogFooter>
+                        </AlertDialogContent>
+                      </AlertDialog>
+                    </div>
+                  </TableCell>
+                )}
+              </TableRow>
+            )}
+          />
         </CardContent>
       </Card>
 
@@ -1,16 +1,18 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
-import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { TableCell, TableRow } from '@/components/ui/table';
 import { AlertDialog, AlertDialogAction, AlertDialogCancel, AlertDialogContent, AlertDialogDescription, AlertDialogFooter, AlertDialogHeader, AlertDialogTitle, AlertDialogTrigger } from '@/components/ui/alert-dialog';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } from '@/components/ui/dialog';
 import { toast } from 'sonner';
 import { Pencil, Trash2 } from 'lucide-react';
 import { Badge } from '@/components/ui/badge';
+import VirtualTable, { DateRangeFilter } from '@/components/VirtualTable';
 import api from '@/lib/axios';
+import { usePagedTable } from '@/lib/pagedTable';
 
 const RENK_KATEGORILER = ['Renkli', 'Renksiz', 'Şeffaf'];
 const RENKLER = {
@@ -37,22 +39,23 @@ const ShipmentForm = () => {
   });
 
   const [metrekare, setMetrekare] = useState(0);
-  const [shipments, setShipments] = useState([]);
+  const [sort, setSort] = useState('-tarih');
+  const [filters, setFilters] = useState({ baslangic: '', bitis: '', q: '', urun_tipi: '' });
+  const shipments = usePagedTable('/shipment/page', sort, filters);
   const [editingId, setEditingId] = useState(null);
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false);
 
-  useEffect(() => {
-    fetchShipments();
-  }, []);
-
-  const fetchShipments = async () => {
-    try {
-      const response = await api.get('/shipment');
-      setShipments(response.data);
-    } catch (error) {
-      console.error(error);
-    }
-  };
+  const columns = [
+    { label: 'Tarih', sort: 'tarih' },
+    { label: 'Alıcı', sort: 'alici_firma' },
+    { label: 'Tip', sort: 'urun_tipi' },
+    { label: 'Ebat', sort: 'en' },
+    { label: 'm²', sort: 'metrekare' },
+    { label: 'Adet', sort: 'adet' },
+    { label: 'Renk', sort: 'renk' },
+    { label: 'İrsaliye', sort: 'irsaliye_no' },
+    { label: 'İşlemler', className: 'text-right' }
+  ];
 
   const handleChange = (name, value) => {
     setFormData(prev => {
@@ -115,7 +118,7 @@ const ShipmentForm = () => {
         cikis_saati: ''
       });
       setMetrekare(0);
-      fetchShipments();
+      shipments.refresh();
     } catch (error) {
       toast.error('Hata oluştu!');
       console.error(error);
@@ -147,7 +150,7 @@ const ShipmentForm = () => {
     try {
       await api.delete(`/shipment/${id}`);
       toast.success('Sevkiyat kaydı silindi!');
-      fetchShipments();
+      shipments.refresh();
     } catch (error) {
       toast.error('Silme hatası!');
       console.error(error);
@@ -398,94 +401,97 @@ const ShipmentForm = () => {
           <CardTitle className="text-white" style={{ fontFamily: 'Space Grotesk, sans-serif' }}>
             Sevkiyat Kayıtları
           </CardTitle>
+          <div className="flex flex-wrap gap-2 pt-2">
+            <Input
+              value={filters.q}
+              onChange={(e) => setFilters({ ...filters, q: e.target.value })}
+              placeholder="Alıcı, irsaliye no, plaka..."
+              className="bg-slate-800/50 border-slate-700 text-white w-64"
+            />
+            <DateRangeFilter filters={filters} onChange={setFilters} />
+            <Select value={filters.urun_tipi || 'hepsi'} onValueChange={(value) => setFilters({ ...filters, urun_tipi: value === 'hepsi' ? '' : value })}>
+              <SelectTrigger className="bg-slate-800/50 border-slate-700 text-white w-40">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent className="bg-slate-800 border-slate-700">
+                <SelectItem value="hepsi" className="text-white">Tüm tipler</SelectItem>
+                <SelectItem value="Normal" className="text-white">Normal</SelectItem>
+                <SelectItem value="Kesilmiş" className="text-white">Kesilmiş</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </CardHeader>
         <CardContent>
-          {shipments.length === 0 ? (
-            <div className="text-center py-8 text-slate-400">Henüz sevkiyat kaydı yok</div>
-          ) : (
-            <div className="rounded-md border border-slate-800 overflow-hidden">
-              <Table>
-                <TableHeader className="bg-slate-800/50">
-                  <TableRow className="border-slate-700">
-                    <TableHead className="text-slate-200">Tarih</TableHead>
-                    <TableHead className="text-slate-200">Alıcı</TableHead>
-                    <TableHead className="text-slate-200">Tip</TableHead>
-                    <TableHead className="text-slate-200">Ebat</TableHead>
-                    <TableHead className="text-slate-200">m²</TableHead>
-                    <TableHead className="text-slate-200">Adet</TableHead>
-                    <TableHead className="text-slate-200">Renk</TableHead>
-                    <TableHead className="text-slate-200">İrsaliye</TableHead>
-                    <TableHead className="text-slate-200 text-right">İşlemler</TableHead>
-                  </TableRow>
-                </TableHeader>
-                <TableBody>
-                  {shipments.map((ship) => (
-                    <TableRow key={ship.id} className="border-slate-800 hover:bg-slate-800/30">
-                      <TableCell className="text-slate-300">{ship.tarih}</TableCell>
-                      <TableCell className="text-slate-300">{ship.alici_firma}</TableCell>
-                      <TableCell>
-                        {ship.urun_tipi === 'Kesilmiş' ? (
-                          <Badge className="bg-amber-600">Kesilmiş</Badge>
-                        ) : (
-                          <Badge className="bg-emerald-600">Normal</Badge>
-                        )}
-                      </TableCell>
-                      <TableCell className="text-slate-300">
-                        {ship.urun_tipi === 'Kesilmiş' 
-                          ? `${ship.kalinlik}mm x ${ship.en}cm x ${ship.metre}cm`
-                          : `${ship.kalinlik}mm x ${ship.en}cm x ${ship.metre}m`
-                        }
-                      </TableCell>
-                      <TableCell className="text-emerald-400 font-semibold">{ship.metrekare.toFixed(2)}</TableCell>
-                      <TableCell className="text-slate-300">{ship.adet}</TableCell>
-                      <TableCell className="text-slate-300">{ship.renk}</TableCell>
-                      <TableCell className="text-slate-300">{ship.irsaliye_no}</TableCell>
-                      <TableCell className="text-right">
-                        <div className="flex items-center justify-end gap-2">
-                          <Button
-                            variant="ghost"
-                            size="icon"
-                            onClick={() => handleEdit(ship)}
-                            className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
+          <VirtualTable
+            table={shipments}
+            columns={columns}
+            sort={sort}
+            onSort={setSort}
+            emptyText={Object.values(filters).some(Boolean) ? 'Filtreye uyan kayıt yok' : 'Henüz sevkiyat kaydı yok'}
+            renderRow={(ship) => (
+              <TableRow className="border-slate-800 hover:bg-slate-800/30">
+                <TableCell className="text-slate-300">{ship.tarih}</TableCell>
+                <TableCell className="text-slate-300">{ship.alici_firma}</TableCell>
+                <TableCell>
+                  {ship.urun_tipi === 'Kesilmiş' ? (
+                    <Badge className="bg-amber-600">Kesilmiş</Badge>
+                  ) : (
+                    <Badge className="bg-emerald-600">Normal</Badge>
+                  )}
+                </TableCell>
+                <TableCell className="text-slate-300">
+                  {ship.urun_tipi === 'Kesilmiş' 
+                    ? `${ship.kalinlik}mm x ${ship.en}cm x ${ship.metre}cm`
+                    : `${ship.kalinlik}mm x ${ship.en}cm x ${ship.metre}m`
+                  }
+                </TableCell>
+                <TableCell className="text-emerald-400 font-semibold">{ship.metrekare.toFixed(2)}</TableCell>
+                <TableCell className="text-slate-300">{ship.adet}</TableCell>
+                <TableCell className="text-slate-300">{ship.renk}</TableCell>
+                <TableCell className="text-slate-300">{ship.irsaliye_no}</TableCell>
+                <TableCell className="text-right">
+                  <div className="flex items-center justify-end gap-2">
+                    <Button
+                      variant="ghost"
+                      size="icon"
+                      onClick={() => handleEdit(ship)}
+                      className="h-8 w-8 text-blue-400 hover:text-blue-300 hover:bg-blue-950/30"
+                    >
+                      <Pencil className="h-4 w-4" />
+                    </Button>
+                    <AlertDialog>
+                      <AlertDialogTrigger asChild>
+                        <Button
+                          variant="ghost"
+                          size="icon"
+                          className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
+                        >
+                          <Trash2 className="h-4 w-4" />
+                        </Button>
+                      </AlertDialogTrigger>
+                      <AlertDialogContent className="bg-slate-900 border-slate-800">
+                        <AlertDialogHeader>
+                          <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
+                          <AlertDialogDescription className="text-slate-400">
+                            Bu sevkiyat kaydı silinecek. Bu işlem geri alınamaz.
+                          </AlertDialogDescription>
+                        </AlertDialogHeader>
+                        <AlertDialogFooter>
+                          <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
+                          <AlertDialogAction 
+                            onClick={() => handleDelete(ship.id)}
+                            className="bg-red-600 hover:bg-red-700"
                           >
-                            <Pencil className="h-4 w-4" />
-                          </Button>
-                          <AlertDialog>
-                            <AlertDialogTrigger asChild>
-                              <Button
-                                variant="ghost"
-                                size="icon"
-                                className="h-8 w-8 text-red-400 hover:text-red-300 hover:bg-red-950/30"
-                              >
-                                <Trash2 className="h-4 w-4" />
-                              </Button>
-                            </AlertDialogTrigger>
-                            <AlertDialogContent className="bg-slate-900 border-slate-800">
-                              <AlertDialogHeader>
-                                <AlertDialogTitle className="text-white">Emin misiniz?</AlertDialogTitle>
-                                <AlertDialogDescription className="text-slate-400">
-                                  Bu sevkiyat kaydı silinecek. Bu işlem geri alınamaz.
-                                </AlertDialogDescription>
-                              </AlertDialogHeader>
-                              <AlertDialogFooter>
-                                <AlertDialogCancel className="bg-slate-800 text-white border-slate-700">İptal</AlertDialogCancel>
-                                <AlertDialogAction 
-                                  onClick={() => handleDelete(ship.id)}
-                                  className="bg-red-600 hover:bg-red-700"
-                                >
-                                  Sil
-                                </AlertDialogAction>
-                              </AlertDialogFooter>
-                            </AlertDialogContent>
-                          </AlertDialog>
-                        </div>
-                      </TableCell>
-                    </TableRow>
-                  ))}
-                </TableBody>
-              </Table>
-            </div>
-          )}
+                            Sil
+                          </AlertDialogAction>
+                        </AlertDialogFooter>
+                      </AlertDialogContent>
+                    </AlertDialog>
+                  </div>
+                </TableCell>
+              </TableRow>
+            )}
+          />
         </CardContent>
       </Card>
 
@@ -3,7 +3,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/com
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
 import { Badge } from '@/components/ui/badge';
 import { toast } from 'sonner';
-import api from '@/lib/axios';
+import { batchedGet } from '@/lib/batch';
 
 const StockView = () => {
   const [stocks, setStocks] = useState([]);
@@ -11,7 +11,7 @@ const StockView = () => {
 
   const fetchStocks = async () => {
     try {
-      const response = await api.get('/stock');
+      const response = await batchedGet('/stock');
       setStocks(response.data);
       setLoading(false);
     } catch (error) {
@@ -0,0 +1,94 @@
+import { cloneElement, useEffect, useState } from 'react';
+import { Input } from '@/components/ui/input';
+import { TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table';
+import { ArrowDown, ArrowUp } from 'lucide-react';
+
+const OVERSCAN = 10;  // Rows rendered beyond each edge of the viewport
+
+// Renders only the rows in view of a `usePagedTable` list; the rest of the scroll height
+// is two spacer rows, so the DOM stays the same size however many records there are.
+// `columns`: [{ label, sort (field name, when sortable), className }]
+const VirtualTable = ({ table, columns, sort, onSort, renderRow, rowHeight = 53, height = 600, emptyText }) => {
+  const [scrollTop, setScrollTop] = useState(0);
+  const total = table.total || 0;
+  const first = Math.max(0, Math.floor(scrollTop / rowHeight) - OVERSCAN);
+  const last = Math.min(total, Math.ceil((scrollTop + height) / rowHeight) + OVERSCAN);
+  const { ensureRange } = table;
+
+  useEffect(() => {
+    if (last > first) {
+      ensureRange(first, last - 1);
+    }
+  }, [ensureRange, first, last]);
+
+  if (table.total === 0) {
+    return <div className="text-center py-8 text-slate-400">{emptyText}</div>;
+  }
+
+  const toggleSort = (field) => onSort(sort === `-${field}` ? field : `-${field}`);
+
+  const rows = [];
+  for (let index = first; index < last; index++) {
+    const record = table.rowAt(index);
+    rows.push(record ? cloneElement(renderRow(record), { key: record.id, style: { height: rowHeight } }) : (
+      <TableRow key={`bekliyor-${index}`} className="border-slate-800" style={{ height: rowHeight }}>
+        <TableCell colSpan={columns.length} className="text-slate-600">…</TableCell>
+      </TableRow>
+    ));
+  }
+
+  return (
+    <div
+      className="rounded-md border border-slate-800 overflow-auto"
+      style={{ maxHeight: height }}
+      onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+    >
+      <table className="w-full caption-bottom text-sm">
+        <TableHeader className="bg-slate-800 sticky top-0 z-10">
+          <TableRow className="border-slate-700">
+            {columns.map(({ label, sort: field, className = '' }) => (
+              <TableHead
+                key={label}
+                className={`text-slate-200 ${field ? 'cursor-pointer select-none' : ''} ${className}`}
+                onClick={field ? () => toggleSort(field) : undefined}
+              >
+                <span className="inline-flex items-center gap-1">
+                  {label}
+                  {sort === field && <ArrowUp className="h-3 w-3" />}
+                  {sort === `-${field}` && <ArrowDown className="h-3 w-3" />}
+                </span>
+              </TableHead>
+            ))}
+          </TableRow>
+        </TableHeader>
+        <TableBody>
+          {first > 0 && <tr style={{ height: first * rowHeight }} />}
+          {rows}
+          {last < total && <tr style={{ height: (total - last) * rowHeight }} />}
+        </TableBody>
+      </table>
+    </div>
+  );
+};
+
+// Date range filter shared by the record tables
+export const DateRangeFilter = ({ filters, onChange }) => (
+  <>
+    <Input
+      type="date"
+      value={filters.baslangic}
+      onChange={(e) => onChange({ ...filters, baslangic: e.target.value })}
+      className="bg-slate-800/50 border-slate-700 text-white w-40"
+      aria-label="Başlangıç tarihi"
+    />
+    <Input
+      type="date"
+      value={filters.bitis}
+      onChange={(e) => onChange({ ...filters, bitis: e.target.value })}
+      className="bg-slate-800/50 border-slate-700 text-white w-40"
+      aria-label="Bitiş tarihi"
+    />
+  </>
+);
+
+export default VirtualTable;
@@ -0,0 +1,78 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+import api from '@/lib/axios';
+
+export const PAGE_SIZE = 100;
+const KEEP_PAGES = 10;  // Pages held around the one last loaded; the rest are fetched again if scrolled back to
+const FILTER_DELAY_MS = 300;
+
+// Rows of a server-paginated list (`/production/page` and the like), fetched a page at a
+// time as the table scrolls. Sorting and filters go to the server; changing them starts over.
+// `summary` is the rest of the latest page response: `total` and any figures over all matches.
+export const usePagedTable = (path, sort, filters) => {
+  const [query, setQuery] = useState({ sort, ...filters });
+  const [summary, setSummary] = useState({ total: null });
+  const [pages, setPages] = useState({});
+  const requested = useRef(new Set());
+  const generation = useRef(0);
+
+  // Typed filters settle before they are sent
+  const key = JSON.stringify({ sort, ...filters });
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(JSON.parse(key)), FILTER_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [key]);
+
+  const loadPage = useCallback(async (page) => {
+    if (requested.current.has(page)) {
+      return;
+    }
+    requested.current.add(page);
+    const current = generation.current;
+    const params = Object.fromEntries(Object.entries(query).filter(([, value]) => value !== '' && value != null));
+    try {
+      const { data } = await api.get(path, { params: { ...params, page, page_size: PAGE_SIZE } });
+      if (current !== generation.current) {
+        return;  // Sort or filters changed meanwhile
+      }
+      const { items, ...rest } = data;
+      setSummary(rest);
+      setPages((prev) => {
+        const next = { ...prev, [page]: items };
+        Object.keys(next).map(Number).filter((p) => Math.abs(p - page) > KEEP_PAGES).forEach((p) => {
+          delete next[p];
+          requested.current.delete(p);
+        });
+        return next;
+      });
+    } catch (error) {
+      requested.current.delete(page);
+      console.error(error);
+    }
+  }, [path, query]);
+
+  useEffect(() => {
+    generation.current += 1;
+    requested.current = new Set();
+    setPages({});
+    setSummary({ total: null });
+    loadPage(1);
+  }, [loadPage]);
+
+  const ensureRange = useCallback((first, last) => {
+    for (let page = Math.floor(first / PAGE_SIZE) + 1; page <= Math.floor(last / PAGE_SIZE) + 1; page++) {
+      loadPage(page);
+    }
+  }, [loadPage]);
+
+  // After a save: fetch the pages on screen again, keeping the old rows until they arrive
+  const refresh = useCallback(() => {
+    generation.current += 1;
+    const loaded = Array.from(requested.current);
+    requested.current = new Set();
+    (loaded.length ? loaded : [1]).forEach(loadPage);
+  }, [loadPage]);
+
+  const rowAt = (index) => pages[Math.floor(index / PAGE_SIZE) + 1]?.[index % PAGE_SIZE];
+
+  return { total: summary.total, summary, rowAt, ensureRange, refresh };
+};
@@ -0,0 +1,129 @@
+import api from '@/lib/axios';
+import { batchedGet } from '@/lib/batch';
+import { toast } from 'sonner';
+
+// Local copy of the synced collections, kept current with /sync deltas
+// so forms only transfer what changed since the last fetch.
+const state = {
+  seq: 0,
+  collections: {}
+};
+
+let pending = null;
+
+const applyChanges = (data) => {
+  Object.entries(data.upserts).forEach(([name, docs]) => {
+    const records = state.collections[name] || (state.collections[name] = new Map());
+    docs.forEach((doc) => records.set(doc.id, doc));
+  });
+
+  Object.entries(data.deletes).forEach(([name, ids]) => {
+    const records = state.collections[name];
+    if (records) {
+      ids.forEach((id) => records.delete(id));
+    }
+  });
+
+  state.seq = data.seq;
+};
+
+export const syncCollections = () => {
+  // Share one round-trip between components that sync at the same time
+  if (!pending) {
+    // Queued entries first, so the pulled copy includes them
+    pending = flushOutbox()
+      .then(reportRejections, () => {})
+      .then(() => batchedGet('/sync', { since: state.seq }))
+      .then((response) => applyChanges(response.data))
+      .finally(() => {
+        pending = null;
+      });
+  }
+  return pending;
+};
+
+export const fetchSynced = async (name) => {
+  await syncCollections();
+  return Array.from((state.collections[name] || new Map()).values());
+};
+
+// Outbox: mutations entered on the shop floor are queued locally with an idempotency
+// key and pushed in one batch, so a dropped connection never loses or doubles an entry.
+const OUTBOX_KEY = 'syncOutbox';
+
+const loadOutbox = () => JSON.parse(localStorage.getItem(OUTBOX_KEY) || '[]');
+const saveOutbox = (mutations) => localStorage.setItem(OUTBOX_KEY, JSON.stringify(mutations));
+
+const newKey = () => (
+  window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`
+);
+
+export const outboxSize = () => loadOutbox().length;
+
+export const queueMutation = (entity, op, data = {}, id = null) => {
+  const mutation = { key: newKey(), entity, op, id, data };
+  saveOutbox([...loadOutbox(), mutation]);
+  return mutation;
+};
+
+// What became of a pushed entry: applied, refused for good (the same data would be
+// refused again), or unknown - still being applied (409) or a server fault - so sent again
+const settledBy = (result) => {
+  if (result.status === 200) {
+    return 'applied';
+  }
+  return result.status >= 400 && result.status < 500 && result.status !== 409 ? 'rejected' : 'retry';
+};
+
+export const isRejected = (result) => settledBy(result) === 'rejected';
+
+export const rejectionReason = (result) => (typeof result.detail === 'string' ? result.detail : 'geçersiz veri');
+
+// Refused entries leave the outbox, so the user has to hear about them
+export const reportRejections = (results) => {
+  results.filter(isRejected).forEach((result) => toast.error(`Kuyruktaki kayıt reddedildi: ${rejectionReason(result)}`));
+};
+
+const pushOutbox = async () => {
+  const queued = loadOutbox();
+  if (!queued.length) {
+    return [];
+  }
+  const response = await api.post('/sync/push', { mutations: queued });
+  const settled = new Set(response.data.results.filter((r) => settledBy(r) !== 'retry').map((r) => r.key));
+  saveOutbox(loadOutbox().filter((m) => !settled.has(m.key)));
+  return response.data.results;
+};
+
+let flushing = null;
+let nextFlush = null;
+
+export const flushOutbox = () => {
+  // Resolves with the per-item results of a push that included every entry queued before
+  // the call; rejects without a response when still offline. A push already under way may
+  // have read the outbox too early, so the caller gets a fresh one started after it.
+  if (!flushing) {
+    flushing = pushOutbox().finally(() => {
+      flushing = null;
+    });
+    return flushing;
+  }
+  if (!nextFlush) {
+    nextFlush = flushing.catch(() => {}).then(() => {
+      nextFlush = null;
+      return flushOutbox();
+    });
+  }
+  return nextFlush;
+};
+
+export const isOffline = (error) => !error.response;
+
+window.addEventListener('online', () => {
+  flushOutbox().then(reportRejections, () => {});
+});
+
+export const resetSync = () => {
+  state.seq = 0;
+  state.collections = {};
+};
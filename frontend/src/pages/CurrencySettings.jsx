@@ -6,6 +6,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/com
 import { toast } from 'sonner';
 import { DollarSign, Euro, TrendingUp } from 'lucide-react';
 import api from '@/lib/axios';
+import { batchedGet } from '@/lib/batch';
 
 const CurrencySettings = () => {
   const [rates, setRates] = useState({
@@ -21,7 +22,7 @@ const CurrencySettings = () => {
 
   const fetchRates = async () => {
     try {
-      const response = await api.get('/currency-rates');
+      const response = await batchedGet('/currency-rates');
       setCurrentRates(response.data);
       setRates({
         usd_rate: response.data.usd_rate || '',
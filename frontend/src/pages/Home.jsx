@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Package, Scissors, TrendingUp } from 'lucide-react';
-import api from '@/lib/axios';
+import { batchedGet } from '@/lib/batch';
 
 const Home = () => {
   const [stats, setStats] = useState({
@@ -28,94 +28,26 @@ const Home = () => {
 
   const fetchStats = async () => {
     try {
-      const [stockRes, prodRes, shipRes, rawMatRes, consumptionRes] = await Promise.all([
-        api.get('/stock'),
-        api.get('/production'),
-        api.get('/shipment'),
-        api.get('/raw-materials'),
-        api.get('/daily-consumption')
-      ]);
-
-      const stocks = stockRes.data;
-      const normalStock = stocks
-        .filter(s => s.urun_tipi === 'Normal')
-        .reduce((sum, s) => sum + s.toplam_adet, 0);
-      
-      const cutStock = stocks
-        .filter(s => s.urun_tipi === 'Kesilmiş')
-        .reduce((sum, s) => sum + s.toplam_adet, 0);
-
-      // Calculate raw material stocks - start with inputs
-      const rawMaterials = {
-        gaz: 0,
-        petkim: 0,
-        estol: 0,
-        talk: 0,
-        masura100: 0,
-        masura120: 0,
-        masura150: 0,
-        masura200: 0,
-        sari: 0
-      };
-
-      // Add raw material inputs
-      rawMatRes.data.forEach(mat => {
-        const name = mat.malzeme_adi.toLowerCase();
-        const miktar = mat.miktar || 0;
-        
-        if (name.includes('gaz')) {
-          rawMaterials.gaz += miktar;
-        } else if (name.includes('petkim') || name.includes('pet')) {
-          rawMaterials.petkim += miktar;
-        } else if (name.includes('estol')) {
-          rawMaterials.estol += miktar;
-        } else if (name.includes('talk')) {
-          rawMaterials.talk += miktar;
-        } else if (name.includes('masura') && name.includes('100')) {
-          rawMaterials.masura100 += miktar;
-        } else if (name.includes('masura') && name.includes('120')) {
-          rawMaterials.masura120 += miktar;
-        } else if (name.includes('masura') && name.includes('150')) {
-          rawMaterials.masura150 += miktar;
-        } else if (name.includes('masura') && name.includes('200')) {
-          rawMaterials.masura200 += miktar;
-        } else if (name.includes('sarı') || name.includes('sari')) {
-          rawMaterials.sari += miktar;
-        }
-      });
-
-      // Subtract consumption from daily consumption records
-      consumptionRes.data.forEach(cons => {
-        rawMaterials.petkim -= cons.toplam_petkim_tuketim || 0;
-        rawMaterials.estol -= cons.toplam_estol_tuketim || 0;
-        rawMaterials.talk -= cons.toplam_talk_tuketim || 0;
-      });
-
-      // Subtract masura used in production (adet per production)
-      prodRes.data.forEach(prod => {
-        const masuraTipi = prod.masura_tipi;
-        const adet = prod.adet || 0;  // Üretilen adet kadar masura kullanılıyor
-        
-        if (!masuraTipi) return;
-        
-        // Handle both "100" and "Masura 100" formats
-        if (masuraTipi.includes('100')) {
-          rawMaterials.masura100 -= adet;  // Üretilen adet kadar düş
-        } else if (masuraTipi.includes('120')) {
-          rawMaterials.masura120 -= adet;
-        } else if (masuraTipi.includes('150')) {
-          rawMaterials.masura150 -= adet;
-        } else if (masuraTipi.includes('200')) {
-          rawMaterials.masura200 -= adet;
-        }
-      });
+      // Totals are kept up to date by the server on every write
+      const { data } = await batchedGet('/dashboard');
+      const toplam = data.toplam;
 
       setStats({
-        normalStock,
-        cutStock,
-        totalProduction: prodRes.data.filter(p => p.urun_tipi === 'Normal').length,
-        totalShipment: shipRes.data.length,
-        rawMaterials
+        normalStock: toplam.normal_stok,
+        cutStock: toplam.kesilmis_stok,
+        totalProduction: toplam.uretim_kayit,
+        totalShipment: toplam.sevkiyat_kayit,
+        rawMaterials: {
+          gaz: toplam.hammadde_gaz,
+          petkim: toplam.hammadde_petkim,
+          estol: toplam.hammadde_estol,
+          talk: toplam.hammadde_talk,
+          masura100: toplam.hammadde_masura100,
+          masura120: toplam.hammadde_masura120,
+          masura150: toplam.hammadde_masura150,
+          masura200: toplam.hammadde_masura200,
+          sari: toplam.hammadde_sari
+        }
       });
     } catch (error) {
       console.error('Stats fetch error:', error);
@@ -0,0 +1,58 @@
+"""Shared setup: the backend on the import path and the app running over mongomock.
+
+`client` is an admin-authenticated TestClient on a fresh in-memory database. A module
+that needs records in place before startup overrides the `history` fixture with
+{collection: [docs]}.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'sar_test')
+
+
+@pytest.fixture
+def auth_header():
+    # Tokens are minted directly: logging in for every test would trip the login throttle
+    from security import create_access_token
+
+    def header(username: str = 'admin', role: str = 'admin') -> dict:
+        return {'Authorization': f"Bearer {create_access_token({'sub': username, 'role': role})}"}
+    return header
+
+
+@pytest.fixture
+def history():
+    return {}
+
+
+@pytest.fixture
+def mongo(history):
+    from mongomock_motor import AsyncMongoMockClient
+    import database
+
+    db = AsyncMongoMockClient()['sar_test']
+    for collection, docs in history.items():
+        asyncio.run(db[collection].insert_many(docs))
+    database.use_database(db)
+    return db
+
+
+@pytest.fixture
+def anonymous_client(mongo):
+    from fastapi.testclient import TestClient
+    import server
+
+    with TestClient(server.create_app()) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def client(anonymous_client, auth_header):
+    anonymous_client.headers.update(auth_header())
+    return anonymous_client
@@ -0,0 +1,86 @@
+"""Opening balances replay to the same stock as the archived movements, and movement
+writes stay out of the way while a job runs."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from archive import ArchiveError, movements_locked, roll_up, expand_openings
+from stock import compute_stock
+from stock_vectorized import compute_stock_vectorized, generate_movements
+
+
+def replay(archived, hot):
+    productions, shipments, cut_products = expand_openings(roll_up(*archived))
+    return productions + hot[0], shipments + hot[1], cut_products + hot[2]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("split", [0.0, 0.4, 1.0])
+def test_openings_match_full_history(seed, split):
+    movements = generate_movements(4000, seed=seed)
+    archived = tuple(docs[:int(len(docs) * split)] for docs in movements)
+    hot = tuple(docs[int(len(docs) * split):] for docs in movements)
+
+    expected = compute_stock(*movements)
+    assert compute_stock(*replay(archived, hot)) == expected
+    assert compute_stock_vectorized(*replay(archived, hot)) == expected
+
+
+def test_kesilmis_shipments_keep_their_raw_boy():
+    cut_products = [
+        {'kesim_kalinlik': 2.0, 'kesim_en': 100.0, 'kesim_boy': 200.0, 'kesim_adet': 10,
+         'ana_kalinlik': 2.0, 'ana_en': 100.0, 'kullanilan_ana_adet': 1},
+    ]
+    shipments = [
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2.0, 'en': 100.0, 'metre': 200.5, 'adet': 2},
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2.0, 'en': 100.0, 'metre': 200.5, 'adet': 3},
+    ]
+    openings = roll_up([], shipments, cut_products)
+
+    assert [o['kind'] for o in openings] == ['kesim', 'ana', 'sevkiyat']
+    assert openings[2]['movement']['metre'] == 200.5
+    assert openings[2]['movement']['adet'] == 5
+
+
+PRODUCTION = {
+    'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50,
+    'adet': 5, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+}
+
+
+def test_movement_writes_are_refused_while_a_job_runs(client, mongo):
+    asyncio.run(mongo.maintenance.insert_one({'_id': 'movements'}))
+
+    response = client.post('/api/production', json=PRODUCTION)
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    assert client.get('/api/production').json() == []
+    # Everything else carries on
+    assert client.post('/api/currency-rates', json={'usd_rate': 40, 'eur_rate': 45}).status_code == 200
+
+    asyncio.run(mongo.maintenance.delete_one({'_id': 'movements'}))
+    assert client.post('/api/production', json=PRODUCTION).status_code == 200
+
+
+def test_job_waits_for_writes_under_way(mongo):
+    async def scenario():
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
+        await mongo.movement_writes.insert_one({'expires_at': expires_at})
+        started = asyncio.Event()
+
+        async def job():
+            async with movements_locked(mongo):
+                started.set()
+                with pytest.raises(ArchiveError):
+                    async with movements_locked(mongo):
+                        pass
+
+        running = asyncio.ensure_future(job())
+        await asyncio.sleep(0.3)
+        waited = not started.is_set()
+        await mongo.movement_writes.delete_many({})
+        await running
+        return waited, await mongo.maintenance.count_documents({})
+
+    assert asyncio.run(scenario()) == (True, 0)
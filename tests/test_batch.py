@@ -0,0 +1,40 @@
+"""Batch reads: per-item statuses, one token check, only /api GETs."""
+import security
+
+
+def test_items_run_like_direct_requests_with_one_token_check(anonymous_client, auth_header, monkeypatch):
+    client = anonymous_client
+    client.headers.update(auth_header('izleyici', 'viewer'))
+    direct_stock = client.get('/api/stock').json()
+
+    decoded = []
+    decode = security.jwt.decode
+    monkeypatch.setattr(security.jwt, 'decode', lambda *a, **kw: decoded.append(1) or decode(*a, **kw))
+    response = client.post('/api/batch', json={'requests': [
+        {'id': 'me', 'path': '/api/auth/me'},
+        {'path': '/api/stock'},
+        {'path': '/api/shipment/search', 'params': {'page': '1'}},
+        {'path': '/api/auth/throttle-stats'},
+        {'path': '/api/yok'},
+        {'path': '/api/stock.xlsx'},
+        {'path': '/api/batch'},
+    ]})
+
+    assert response.status_code == 200
+    assert len(decoded) == 1
+    items = response.json()['responses']
+    assert [item['id'] for item in items[:2]] == ['me', '/api/stock']
+    assert [item['status'] for item in items] == [200, 200, 422, 403, 404, 415, 400]
+    assert items[0]['body'] == {'username': 'izleyici', 'role': 'viewer'}
+    assert items[1]['body'] == direct_stock
+    assert items[2]['body']['detail'][0]['loc'] == ['query', 'q']
+
+
+def test_batch_needs_a_token_and_api_paths(anonymous_client, auth_header):
+    client = anonymous_client
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/stock'}]}).status_code == 403
+
+    client.headers.update(auth_header())
+    assert client.post('/api/batch', json={'requests': [{'path': '/docs'}]}).status_code == 422
+    assert client.post('/api/batch', json={'requests': []}).status_code == 422
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/stock'}] * 21}).status_code == 422
@@ -0,0 +1,35 @@
+"""Machine buckets move with production creates, edits and deletes."""
+import asyncio
+
+from buckets import bucket_hour
+
+PRODUCTION = {
+    'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50,
+    'adet': 5, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+}
+
+
+def buckets(mongo) -> dict:
+    async def read():
+        return {(b['makine'], b['tarih'], b['saat']): (b['metrekare'], b['adet'])
+                async for b in mongo.machine_buckets.find({})}
+    return asyncio.run(read())
+
+
+def test_buckets_follow_the_record(client, mongo):
+    created = client.post('/api/production', json=PRODUCTION).json()
+    saat = bucket_hour(created['timestamp'])
+    assert buckets(mongo) == {('Makine 1', '2025-01-01', saat): (50, 5)}
+
+    client.put(f"/api/production/{created['id']}", json={'makine': 'Makine 2', 'adet': 3, 'metrekare': 30})
+    assert buckets(mongo) == {
+        ('Makine 1', '2025-01-01', saat): (0, 0),
+        ('Makine 2', '2025-01-01', saat): (30, 3),
+    }
+    [machine] = client.get('/api/analytics/machines', params={
+        'baslangic': '2025-01-01', 'bitis': '2025-01-31', 'makine': 'Makine 2'
+    }).json()
+    assert (machine['toplam_adet'], machine['aktif_saat']) == (3, 1)
+
+    client.delete(f"/api/production/{created['id']}")
+    assert buckets(mongo)[('Makine 2', '2025-01-01', saat)] == (0, 0)
@@ -0,0 +1,214 @@
+"""Caches: request coalescing, and invalidation through the bus and its change stream watcher."""
+import asyncio
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import database
+from cache import InvalidationBus, SingleFlight, TTLCache
+from core import rates_cache
+from routers import raw_materials
+
+
+class Computation:
+    def __init__(self):
+        self.runs = 0
+        self.release = None
+
+    async def __call__(self):
+        self.runs += 1
+        run = self.runs
+        await self.release.wait()
+        return run
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight('stock')
+    compute = Computation()
+
+    async def scenario():
+        compute.release = asyncio.Event()
+        calls = [asyncio.ensure_future(flight.do('stock', compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(scenario()) == [1] * 5
+    assert flight.stats == {'calls': 5, 'executions': 1, 'coalesced': 4, 'window_hits': 0}
+    assert flight.snapshot()['in_flight'] == 0
+
+
+def test_window_serves_the_finished_result():
+    flight = SingleFlight('stock', window=60)
+    compute = Computation()
+
+    async def scenario():
+        compute.release = asyncio.Event()
+        compute.release.set()
+        return [await flight.do('stock', compute), await flight.do('stock', compute)]
+
+    assert asyncio.run(scenario()) == [1, 1]
+    assert flight.stats['window_hits'] == 1
+
+
+def test_result_computed_across_a_forget_is_not_kept():
+    flight = SingleFlight('stock', window=60)
+    compute = Computation()
+
+    async def scenario():
+        compute.release = asyncio.Event()
+        before = asyncio.ensure_future(flight.do('stock', compute))
+        await asyncio.sleep(0)
+        flight.forget()  # A write landed while the first computation was reading
+        after = asyncio.ensure_future(flight.do('stock', compute))
+        await asyncio.sleep(0)
+        compute.release.set()
+        results = await asyncio.gather(before, after)
+        return results, await flight.do('stock', compute)
+
+    results, later = asyncio.run(scenario())
+
+    # The late caller did not join the stale run, and only the fresh result is served on
+    assert results == [1, 2]
+    assert later == 2
+    assert compute.runs == 2
+
+
+def test_forgetting_one_key_leaves_the_others():
+    flight = SingleFlight('analytics', window=60)
+    compute = Computation()
+
+    async def scenario():
+        compute.release = asyncio.Event()
+        compute.release.set()
+        await flight.do('a', compute)
+        await flight.do('b', compute)
+        flight.forget('a')
+        return await flight.do('a', compute), await flight.do('b', compute)
+
+    assert asyncio.run(scenario()) == (3, 2)
+
+
+def test_publish_reaches_every_subscriber_of_the_collection():
+    bus = InvalidationBus(None, ['productions', 'currency_rates'])
+    stock, rates = TTLCache(300), TTLCache(300)
+    bus.register_cache(stock, 'productions')
+    bus.register_cache(rates, 'currency_rates')
+    seen = []
+    bus.subscribe('productions', lambda _c: 1 / 0)  # A broken subscriber does not stop the rest
+    bus.subscribe('productions', seen.append)
+    stock.set('stock', [1])
+    rates.set('latest', 2)
+
+    bus.publish('productions')
+
+    assert stock.get('stock') is None
+    assert rates.get('latest') == 2
+    assert seen == ['productions']
+
+
+def test_result_overtaken_by_an_invalidation_is_dropped():
+    cache = TTLCache(300)
+    generation = cache.generation
+    cache.clear()
+    cache.set('stock', 'computed before the write', generation=generation)
+    assert cache.get('stock') is None
+
+
+class ChangeStream:
+    def __init__(self, changes, then):
+        self.changes = changes
+        self.then = then
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for token, collection in self.changes:
+            self.resume_token = token
+            yield {'ns': {'coll': collection}}
+        if self.then is None:
+            await asyncio.Event().wait()  # Stays open
+        raise self.then
+
+
+class WatchedDatabase:
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.resumed_after = []
+
+    def watch(self, pipeline, resume_after=None):
+        self.resumed_after.append(resume_after)
+        return self.streams.pop(0)
+
+
+def test_watcher_publishes_changes_and_resumes_after_a_disconnect():
+    db = WatchedDatabase(
+        ChangeStream([('t1', 'productions')], then=AutoReconnect('connection reset')),
+        ChangeStream([('t2', 'shipments')], then=None),
+    )
+    bus = InvalidationBus(db, ['productions', 'shipments'])
+    cache = TTLCache(300)
+    bus.register_cache(cache, 'productions')
+    seen = []
+    bus.subscribe('productions', seen.append)
+    bus.subscribe('shipments', seen.append)
+
+    async def scenario():
+        await bus.start()
+        while len(seen) < 2:
+            await asyncio.sleep(0.01)
+        active = bus.change_streams_active
+        await bus.stop()
+        return active
+
+    assert asyncio.run(scenario())
+    assert seen == ['productions', 'shipments']
+    # Picks up where it left off, and clears caches for events it may have missed meanwhile
+    assert db.resumed_after == [None, 't1']
+    assert cache.generation == 2
+    assert not bus.change_streams_active
+
+
+def test_watcher_falls_back_to_short_ttl_without_change_streams():
+    db = WatchedDatabase(ChangeStream([], then=OperationFailure('not a replica set', code=40573)))
+    bus = InvalidationBus(db, ['productions'], fallback_ttl=5)
+    cache = TTLCache(300)
+    bus.register_cache(cache, 'productions')
+
+    async def scenario():
+        await bus.start()
+        await bus._task
+
+    asyncio.run(scenario())
+    assert cache.ttl == 5
+    assert not bus.change_streams_active
+
+
+class RatesWrittenDuringRead:
+    # Another worker's rate update lands (and invalidates) while this one is reading
+    def __init__(self, target, cache):
+        self._target = target
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return self._target[name]
+
+    def __getitem__(self, name):
+        return self._target[name]
+
+    @property
+    def currency_rates(self):
+        self._cache.clear()
+        return self._target.currency_rates
+
+
+def test_rates_read_overtaken_by_an_update_is_not_cached(mongo):
+    database.use_database(RatesWrittenDuringRead(mongo, rates_cache))
+
+    asyncio.run(raw_materials.get_latest_rates())
+
+    assert rates_cache.get('latest') is None
@@ -0,0 +1,25 @@
+"""Catalog facets follow the stock ledger, not the movement that caused the change."""
+import asyncio
+
+from ledger import add_stock, normal_stock_fields
+
+PRODUCTION = {
+    'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50,
+    'adet': 5, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+}
+
+
+def widths(client, **params) -> dict:
+    facets = client.get('/api/catalog/facets', params=params).json()
+    return {value['deger']: value['toplam_adet'] for value in facets['en']}
+
+
+def test_facets_see_every_ledger_change(client):
+    assert widths(client) == {}
+    client.post('/api/production', json=PRODUCTION)
+    assert widths(client) == {100.0: 5}
+
+    # A ledger write on its own (e.g. from another worker's handler) clears the cached facets
+    asyncio.run(add_stock('Normal_2.0_120.0_Renksiz_Doğal', normal_stock_fields(2, 120, 'Renksiz', 'Doğal'), 3))
+    assert widths(client) == {100.0: 5, 120.0: 3}
+
@@ -0,0 +1,81 @@
+"""Encoding negotiation, thresholds and streaming in the compression middleware."""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, choose_encoding
+
+brotli = pytest.importorskip("brotli")
+zstandard = pytest.importorskip("zstandard")
+
+LARGE = b'{"alici_firma": "\xc5\x9e\xc4\xb0\xc5\x9eECAM"}' * 500
+
+
+def make_client(minimum_size=1024):
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return Response(LARGE, media_type="application/json")
+
+    @app.get("/small")
+    def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/xlsx")
+    def xlsx():
+        return Response(LARGE, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((LARGE[i:i + 100] for i in range(0, len(LARGE), 100)), media_type="application/json")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("zstd;q=0, br;q=0, gzip;q=0", None),
+    ("identity", None),
+    ("*", "zstd"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ["zstd", "br", "gzip"]) == expected
+
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    ("br", lambda data: brotli.decompress(data)),
+    ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+])
+def test_large_responses_are_compressed(encoding, decompress):
+    # Read the raw bytes: the client would transparently decode gzip/br itself
+    with make_client().stream("GET", "/large", headers={"Accept-Encoding": encoding}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw) < len(LARGE)
+    assert decompress(raw) == LARGE
+
+
+def test_small_and_precompressed_responses_pass_through():
+    client = make_client()
+    for path in ("/small", "/xlsx"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+
+def test_streaming_responses_are_compressed_chunk_by_chunk():
+    response = make_client().get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == LARGE
@@ -0,0 +1,81 @@
+"""Cut planning: layouts fit their rolls, cut exactly what was asked and account for scrap."""
+import pytest
+
+from cutplan import plan_cuts
+
+
+def cut_pieces(plan):
+    pieces = {}
+    for roll in plan['rulolar']:
+        for lane in roll['seritler']:
+            for piece in lane['parcalar']:
+                key = (lane['en'], piece['kesim_boy'])
+                pieces[key] = pieces.get(key, 0) + roll['adet'] * lane['adet'] * piece['adet']
+    return pieces
+
+
+def test_plan_meets_demand_inside_the_rolls():
+    parents = [{'en': 100, 'metre': 50, 'adet': 100}, {'en': 150, 'metre': 25, 'adet': 100}]
+    pieces = [
+        {'kesim_en': 30, 'kesim_boy': 120, 'adet': 140},
+        {'kesim_en': 40, 'kesim_boy': 200, 'adet': 75},
+        {'kesim_en': 30, 'kesim_boy': 90, 'adet': 60},
+        {'kesim_en': 75, 'kesim_boy': 333, 'adet': 12},
+    ]
+    plan = plan_cuts(parents, pieces, budget_ms=200)
+
+    assert cut_pieces(plan) == {(30, 120): 140, (40, 200): 75, (30, 90): 60, (75, 333): 12}
+    assert plan['karsilanamayan'] == []
+
+    total_roll_m2 = 0
+    for roll in plan['rulolar']:
+        width = sum(lane['en'] * lane['adet'] for lane in roll['seritler'])
+        assert width + roll['kenar_fire_cm'] == roll['ana_en']
+        for lane in roll['seritler']:
+            assert sum(p['kesim_boy'] * p['adet'] for p in lane['parcalar']) <= roll['ana_metre'] * 100
+        total_roll_m2 += roll['ana_en'] * roll['ana_metre'] / 100 * roll['adet']
+    demand_m2 = sum(p['kesim_en'] * p['kesim_boy'] * p['adet'] for p in pieces) / 1e4
+    assert plan['toplam_fire_m2'] == pytest.approx(total_roll_m2 - demand_m2, abs=1e-3)
+    assert plan['toplam_rulo'] == sum(s['kullanilan'] for s in plan['ana_stok'])
+
+
+def test_improves_on_the_greedy_pass():
+    parents = [{'en': 100, 'metre': 10, 'adet': 1000}, {'en': 160, 'metre': 10, 'adet': 1000}]
+    pieces = [{'kesim_en': w, 'kesim_boy': b, 'adet': n}
+              for w, b, n in [(45, 230, 40), (55, 310, 33), (35, 170, 80), (25, 410, 21), (60, 150, 50)]]
+    greedy = plan_cuts(parents, pieces, budget_ms=0)
+    planned = plan_cuts(parents, pieces, budget_ms=300)
+
+    assert greedy['iterasyon'] == 1 and planned['iterasyon'] > 1
+    assert planned['toplam_fire_m2'] <= greedy['toplam_fire_m2']
+
+
+def test_shortage_and_oversized_pieces_are_reported():
+    parents = [{'en': 100, 'metre': 2, 'adet': 1}]
+    plan = plan_cuts(parents, [
+        {'kesim_en': 50, 'kesim_boy': 100, 'adet': 6},
+        {'kesim_en': 120, 'kesim_boy': 100, 'adet': 1},
+    ], budget_ms=50)
+
+    assert plan['toplam_rulo'] == 1 and plan['toplam_fire_m2'] == 0
+    assert plan['karsilanamayan'] == [
+        {'kesim_en': 50, 'kesim_boy': 100, 'adet': 2},
+        {'kesim_en': 120, 'kesim_boy': 100, 'adet': 1},
+    ]
+
+
+def test_endpoint_plans_against_normal_stock(client):
+    client.post('/api/production', json={
+        'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 20, 'metrekare': 20,
+        'adet': 3, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+    })
+
+    response = client.post('/api/cut-plan', json={
+        'kalinlik': 2, 'parcalar': [{'kesim_en': 50, 'kesim_boy': 200, 'adet': 30}], 'sure_limiti_ms': 50
+    })
+
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan['ana_stok'] == [{'ana_en': 100.0, 'ana_metre': 20.0, 'mevcut': 3, 'kullanilan': 2}]
+    # 20 pieces fill the first roll; the other 10 leave half of the second as scrap
+    assert plan['toplam_fire_m2'] == 10 and plan['karsilanamayan'] == []
@@ -0,0 +1,58 @@
+"""Dashboard summary: maintained on write, and identical to a fresh fold of the history."""
+import asyncio
+
+from dashboard import plant_today, init_dashboard
+
+PRODUCT = {'kalinlik': 2, 'en': 100, 'renk_kategori': 'Renksiz', 'renk': 'Doğal'}
+
+
+def test_summary_follows_writes_and_matches_a_reseed(mongo, client):
+    today = plant_today().strftime('%Y-%m-%d')
+    production = client.post('/api/production', json={
+        **PRODUCT, 'tarih': today, 'makine': 'Makine 1', 'metre': 50, 'metrekare': 50, 'adet': 10,
+        'masura_tipi': 'Masura 100'
+    }).json()
+    client.post('/api/production', json={
+        **PRODUCT, 'tarih': '2024-12-31', 'makine': 'Makine 2', 'metre': 50, 'metrekare': 50, 'adet': 4,
+        'masura_tipi': 'Masura 120'
+    })
+    client.post('/api/shipment', json={
+        **PRODUCT, 'tarih': today, 'alici_firma': 'Firma', 'urun_tipi': 'Normal', 'metre': 50,
+        'metrekare': 150, 'adet': 3, 'irsaliye_no': 'A-1', 'arac_plaka': '34 ABC 1', 'sofor': 'Ali',
+        'cikis_saati': '08:00'
+    })
+    client.post('/api/cut-product', json={
+        'tarih': today, 'ana_kalinlik': 2, 'ana_en': 100, 'ana_metre': 50, 'ana_metrekare': 50,
+        'ana_renk_kategori': 'Renksiz', 'ana_renk': 'Doğal', 'kesim_kalinlik': 2, 'kesim_en': 50,
+        'kesim_boy': 100, 'kesim_renk_kategori': 'Renksiz', 'kesim_renk': 'Doğal', 'kesim_adet': 40,
+        'kullanilan_ana_adet': 2
+    })
+    client.post('/api/raw-materials', json={
+        'giris_tarihi': today, 'malzeme_adi': 'Masura 100', 'birim': 'Adet', 'miktar': 500,
+        'para_birimi': 'TL', 'birim_fiyat': 2
+    })
+    client.post('/api/daily-consumption', json={'tarih': today, 'makine': 'Makine 1', 'petkim_kg': 100, 'fire_kg': 0})
+    client.post('/api/currency-rates', json={'usd_rate': 41.5, 'eur_rate': 48.2})
+    client.put(f"/api/production/{production['id']}", json={'adet': 12})
+
+    summary = client.get('/api/dashboard').json()
+
+    assert summary['toplam']['normal_stok'] == 12 + 4 - 3 - 2
+    assert summary['toplam']['kesilmis_stok'] == 40
+    assert summary['toplam']['uretim_kayit'] == 2 and summary['bugun']['uretim_kayit'] == 1
+    assert summary['bugun']['uretim_adet'] == 12 and summary['bugun']['sevkiyat_m2'] == 150
+    assert summary['toplam']['hammadde_masura100'] == 500 - 12
+    assert summary['toplam']['hammadde_masura120'] == -4
+    assert summary['toplam']['hammadde_petkim'] == -100 and summary['bugun']['hammadde_tl'] == 1000
+    assert summary['son_kurlar']['usd_rate'] == 41.5
+
+    # Folding the history from scratch gives the same documents
+    async def reseed():
+        maintained = {doc['_id']: doc async for doc in mongo.dashboard_summary.find({})}
+        await mongo.dashboard_summary.drop()
+        await init_dashboard()
+        return maintained, {doc['_id']: doc async for doc in mongo.dashboard_summary.find({})}
+
+    maintained, seeded = asyncio.run(reseed())
+    strip = lambda docs: {k: {f: v for f, v in d.items() if v != 0} for k, d in docs.items()}
+    assert strip(seeded) == strip(maintained)
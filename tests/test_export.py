@@ -0,0 +1,46 @@
+"""xlsx export: Turkish headers, real dates and number formats."""
+import zipfile
+
+import pytest
+
+pytest.importorskip('xlsxwriter')
+
+from export import EXPORTS, TL, write_workbook  # noqa: E402
+
+
+def read_parts(path):
+    with zipfile.ZipFile(path) as archive:
+        return {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+
+
+def test_workbook_has_headers_dates_and_formats(tmp_path):
+    spec = EXPORTS['raw-materials']
+    rows = [
+        {'giris_tarihi': '2025-03-01', 'malzeme_adi': 'Petkim', 'birim': 'Kilogram', 'miktar': 1000,
+         'para_birimi': 'USD', 'birim_fiyat': 1.2, 'toplam_tutar': 1200, 'kur': 32.5, 'tl_tutar': 39000},
+        {'giris_tarihi': 'bilinmiyor', 'malzeme_adi': 'Talk', 'birim': 'Kilogram', 'miktar': 50,
+         'para_birimi': 'TL', 'birim_fiyat': 10, 'toplam_tutar': 500, 'tl_tutar': 500},
+    ]
+    path = tmp_path / 'hammadde.xlsx'
+
+    assert write_workbook(str(path), spec.sheet, spec.columns, iter(rows), spec.defaults) == 2
+
+    parts = read_parts(path)
+    text = ''.join(parts.values())
+    assert 'Hammadde' in parts['xl/workbook.xml']
+    assert 'Giriş Tarihi' in text and 'TL Tutar' in text
+    assert TL.replace('"', '&quot;') in parts['xl/styles.xml']
+    sheet = parts['xl/worksheets/sheet1.xml']
+    # 2025-03-01 as an Excel serial date; the unparseable one stays text
+    assert '<v>45717</v>' in sheet
+    assert 'bilinmiyor' in text
+    assert '<autoFilter ref="A1:I3"/>' in sheet
+
+
+def test_defaults_fill_old_records(tmp_path):
+    spec = EXPORTS['production']
+    path = tmp_path / 'uretim.xlsx'
+    write_workbook(str(path), spec.sheet, spec.columns,
+                   [{'tarih': '2025-01-01', 'makine': 'M1', 'adet': 2}], spec.defaults)
+
+    assert 'Doğal' in ''.join(read_parts(path).values())
@@ -0,0 +1,85 @@
+"""Sparse fieldsets: ?fields= validation, the Mongo projection and the trimmed response."""
+import json
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+
+from core import field_projection, parse_fields, sparse_response
+from models import CutProduct, DailyConsumption, Production, RawMaterial, Shipment, Stock, UserInfo
+
+PRODUCTION = {
+    'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50,
+    'adet': 5, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+}
+
+
+class Dimensions(BaseModel):
+    en: float
+    boy: Optional[float] = None
+
+
+class Piece(BaseModel):
+    id: str
+    olcu: Dimensions
+    etiketler: List[str] = []
+    not_: Optional[str] = Field(None, alias='not')
+    created_at: datetime
+
+
+def test_unknown_and_nested_names_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        parse_fields(Piece, 'olcu.en,renk,etiketler')
+    assert error.value.status_code == 400
+    assert error.value.detail == 'Unknown fields: olcu.en, renk'
+
+    # Selection is by attribute name, not alias
+    with pytest.raises(HTTPException):
+        parse_fields(Piece, 'not')
+    assert parse_fields(Piece, 'not_') == ('id', 'not_')
+
+
+def test_selection_is_in_model_order_with_id():
+    assert parse_fields(Piece, ' created_at, olcu ,,olcu') == ('id', 'olcu', 'created_at')
+    assert parse_fields(Stock, 'toplam_adet,en') == ('en', 'toplam_adet')
+    assert parse_fields(Piece, None) is None
+    assert parse_fields(Piece, ' , ') is None
+
+
+@pytest.mark.parametrize('model', [Production, Shipment, CutProduct, RawMaterial, DailyConsumption, Stock, UserInfo])
+def test_projection_of_every_field_matches_the_response_model(model):
+    selected = parse_fields(model, ','.join(model.model_fields))
+
+    assert selected == tuple(model.model_fields)
+    assert field_projection(selected) == {'_id': 0, **{name: 1 for name in model.model_fields}}
+    assert field_projection(None) == {'_id': 0}
+    # Fields the endpoint needs for itself are fetched as well
+    assert field_projection(('id',), 'urun_tipi') == {'_id': 0, 'id': 1, 'urun_tipi': 1}
+
+
+def test_sparse_response_keeps_nested_values_whole():
+    docs = [{
+        'id': 'p1', 'olcu': {'en': 50, 'boy': 200}, 'etiketler': ['acil'],
+        'created_at': datetime(2025, 1, 1, 8), 'fazla': 'dropped'
+    }]
+
+    body = json.loads(sparse_response(Piece, ('id', 'olcu'), docs).body)
+
+    assert body == [{'id': 'p1', 'olcu': {'en': 50.0, 'boy': 200.0}}]
+
+
+def test_list_endpoints_return_only_the_selection(client):
+    client.post('/api/production', json=PRODUCTION)
+
+    [production] = client.get('/api/production', params={'fields': 'adet,tarih'}).json()
+    assert set(production) == {'id', 'tarih', 'adet'}
+    assert client.get('/api/production', params={'fields': 'adet,sifre'}).status_code == 400
+
+    [stock] = client.get('/api/stock', params={'fields': 'toplam_adet'}).json()
+    assert stock == {'toplam_adet': 5}
+
+    [user] = client.get('/api/users', params={'fields': 'username'}).json()
+    assert set(user) == {'id', 'username'}
+    assert client.get('/api/users', params={'fields': 'password_hash'}).status_code == 400
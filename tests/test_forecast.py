@@ -0,0 +1,48 @@
+"""Raw material forecast: on-hand and rates kept current by purchase and consumption writes."""
+from datetime import timedelta
+
+from forecast import material_key, plant_today
+
+
+def forecast(client):
+    response = client.get('/api/forecast/materials')
+    assert response.status_code == 200
+    return {row['malzeme']: row for row in response.json()}
+
+
+def test_material_names():
+    assert material_key('PETKİM LDPE 2420') == 'petkim'
+    assert material_key('Estol katkı') == 'estol'
+    assert material_key('TALK') == 'talk'
+    assert material_key('Masura') is None
+
+
+def test_forecast_follows_writes(client):
+    today = plant_today()
+    purchase = client.post('/api/raw-materials', json={
+        'giris_tarihi': today.strftime('%Y-%m-%d'), 'malzeme_adi': 'Petkim LDPE', 'birim': 'Kilogram',
+        'miktar': 1000, 'para_birimi': 'TL', 'birim_fiyat': 50
+    }).json()
+    client.post('/api/raw-materials', json={
+        'giris_tarihi': today.strftime('%Y-%m-%d'), 'malzeme_adi': 'Talk', 'birim': 'Kilogram',
+        'miktar': 30, 'para_birimi': 'TL', 'birim_fiyat': 10
+    })
+    consumption = client.post('/api/daily-consumption', json={
+        'tarih': today.strftime('%Y-%m-%d'), 'makine': 'Makine 1', 'petkim_kg': 80, 'fire_kg': 20
+    }).json()
+
+    rows = forecast(client)
+    petkim = rows['petkim']
+    assert (petkim['eldeki_kg'], petkim['gunluk_tuketim_kg'], petkim['kalan_gun']) == (900, 100, 9.0)
+    assert petkim['makineler'] == [{'makine': 'Makine 1', 'gunluk_tuketim_kg': 100}]
+    assert petkim['siparis_tarihi'] == (today + timedelta(days=2)).strftime('%Y-%m-%d')
+    assert (rows['talk']['eldeki_kg'], rows['talk']['kalan_gun']) == (28.5, 19.0)
+    # Consumed without any recorded purchase: already out
+    assert (rows['estol']['eldeki_kg'], rows['estol']['kalan_gun']) == (-3, 0)
+
+    client.put(f"/api/daily-consumption/{consumption['id']}", json={'petkim_kg': 180})
+    assert forecast(client)['petkim']['eldeki_kg'] == 800
+    client.delete(f"/api/raw-materials/{purchase['id']}")
+    client.delete(f"/api/daily-consumption/{consumption['id']}")
+    rows = forecast(client)
+    assert rows['petkim']['eldeki_kg'] == 0 and rows['petkim']['kalan_gun'] is None
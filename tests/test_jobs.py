@@ -0,0 +1,78 @@
+"""Background job runner: reports run in the process pool and land in job_results."""
+import asyncio
+
+import mongomock_motor
+import pytest
+
+import reports
+from jobqueue import JobRunner, JobQueueFull, Report
+
+PRODUCTIONS = [
+    {'tarih': '2025-01-03', 'makine': 'M1', 'kalinlik': 2, 'en': 100, 'metrekare': 500, 'adet': 5},
+    {'tarih': '2025-01-20', 'makine': 'M1', 'kalinlik': 2, 'en': 100, 'metrekare': 200, 'adet': 2},
+    {'tarih': '2025-02-01', 'makine': 'M2', 'kalinlik': 3, 'en': 120, 'metrekare': 300, 'adet': 3,
+     'renk_kategori': 'Renkli', 'renk': 'Mavi'},
+]
+
+
+async def load_fixture(params):
+    return PRODUCTIONS
+
+async def fail(params):
+    raise ValueError("no data")
+
+REPORTS = {
+    "summary": Report(load_fixture, reports.production_summary),
+    "broken": Report(fail, reports.production_summary),
+}
+
+
+async def wait_for(runner, job_id):
+    for _ in range(300):
+        job = await runner.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_in_pool_and_stores_result():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['jobs_check']
+        runner = JobRunner(db, REPORTS, workers=1, queue_size=5, ttl_seconds=60)
+        await runner.start()
+        try:
+            job = await runner.submit("summary", {}, "admin")
+            assert job.status == "queued"
+            done = await wait_for(runner, job.id)
+            failed = await wait_for(runner, (await runner.submit("broken", {}, "admin")).id)
+            return done, await runner.result(job.id), failed
+        finally:
+            await runner.stop()
+
+    done, result, failed = asyncio.run(scenario())
+
+    assert done['status'] == 'done' and done['progress'] == 100
+    assert done['result_url'] == f"/api/jobs/{done['id']}/result"
+    assert result == reports.production_summary(PRODUCTIONS, {})
+    assert [(row['ay'], row['adet'], row['metrekare']) for row in result] == [
+        ('2025-01', 7, 700.0), ('2025-02', 3, 300.0)
+    ]
+    assert failed['status'] == 'failed' and failed['error'] == 'no data'
+
+
+def test_submit_rejects_when_queue_is_full():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['jobs_check']
+        runner = JobRunner(db, REPORTS, workers=0, queue_size=1, ttl_seconds=60)
+        await runner.start()
+        try:
+            await runner.submit("summary", {}, "admin")
+            with pytest.raises(JobQueueFull):
+                await runner.submit("summary", {}, "admin")
+        finally:
+            await runner.stop()
+        return await db.jobs.find_one({}, {"_id": 0})
+
+    # Stopping fails the job that never ran
+    assert asyncio.run(scenario())['status'] == 'failed'
@@ -0,0 +1,112 @@
+"""Login throttling: bucket refill, 429 with Retry-After, the verification cap and client addresses."""
+import asyncio
+from ipaddress import ip_network
+
+import pytest
+from starlette.requests import Request
+
+import ratelimit
+from ratelimit import LoginThrottle, MemoryBucketStore
+from routers import auth
+
+
+@pytest.fixture
+def throttle(monkeypatch):
+    fresh = LoginThrottle(
+        MemoryBucketStore(), user_capacity=3, user_refill_per_minute=6,
+        ip_capacity=5, ip_refill_per_minute=60, max_concurrent_verifications=2
+    )
+    monkeypatch.setattr(auth, 'login_throttle', fresh)
+    return fresh
+
+
+def test_bucket_refills_at_its_rate(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    store = MemoryBucketStore()
+
+    async def take():
+        return await store.take('user:ayse', 2, 0.5)
+
+    assert asyncio.run(take()) == 0
+    assert asyncio.run(take()) == 0
+    assert asyncio.run(take()) == pytest.approx(2)
+    now[0] += 1
+    assert asyncio.run(take()) == pytest.approx(1)
+    now[0] += 1
+    assert asyncio.run(take()) == 0
+    # Never more than the burst, however long it sat idle
+    now[0] += 3600
+    assert [asyncio.run(take()) for _ in range(3)][-1] == pytest.approx(2)
+
+
+def test_prune_drops_only_buckets_that_have_refilled(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    store = MemoryBucketStore(max_keys=2, prune_every=4)
+
+    async def take(key, capacity, refill_per_second):
+        return await store.take(key, capacity, refill_per_second)
+
+    asyncio.run(take('user:ayse', 5, 5 / 60))  # Full again after 12 s
+    for ip in ('10.0.0.1', '10.0.0.2'):
+        asyncio.run(take(f'ip:{ip}', 20, 0.5))  # After 2 s
+    now[0] += 5
+    asyncio.run(take('ip:10.0.0.3', 20, 0.5))
+    # Swept on the 4th take, against each bucket's own refill rate
+    assert len(store) == 2
+    asyncio.run(take('ip:10.0.0.4', 20, 0.5))
+    # ...and not again until 4 more takes, however far over the limit
+    assert len(store) == 3
+
+
+def test_username_bucket_answers_429_with_retry_after(anonymous_client, throttle):
+    attempts = [
+        anonymous_client.post('/api/auth/login', json={'username': 'yok', 'password': 'x'}) for _ in range(4)
+    ]
+
+    assert [r.status_code for r in attempts] == [401, 401, 401, 429]
+    assert attempts[-1].headers['Retry-After'] == '10'
+    assert throttle.counters['throttled_username'] == 1
+    # Another username still gets through from the same address
+    assert anonymous_client.post('/api/auth/login', json={'username': 'baska', 'password': 'x'}).status_code == 401
+
+
+def test_password_change_is_throttled_like_a_login(client, throttle):
+    for _ in range(3):
+        response = client.post('/api/auth/change-password', json={'current_password': 'x', 'new_password': 'yeni'})
+        assert response.status_code == 401
+    response = client.post('/api/auth/change-password', json={'current_password': 'x', 'new_password': 'yeni'})
+    assert response.status_code == 429
+    assert 'Retry-After' in response.headers
+    assert throttle.in_flight_verifications == 0
+
+
+def test_verifications_over_the_cap_are_turned_away(anonymous_client, throttle):
+    assert throttle.try_acquire_verification()
+    assert throttle.try_acquire_verification()
+    assert not throttle.try_acquire_verification()
+
+    response = anonymous_client.post('/api/auth/login', json={'username': 'admin', 'password': 'x'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert throttle.counters['rejected_busy'] == 2
+
+    throttle.release_verification()
+    assert anonymous_client.post('/api/auth/login', json={'username': 'yok', 'password': 'x'}).status_code == 401
+
+
+def request_from(peer: str, *forwarded: str) -> Request:
+    headers = [(b'x-forwarded-for', value.encode()) for value in forwarded]
+    return Request({'type': 'http', 'client': (peer, 50000), 'headers': headers})
+
+
+def test_forwarded_for_is_only_believed_from_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(auth, 'trusted_proxies', [ip_network('10.0.0.0/8')])
+
+    # Sent straight to us: the header is whatever the client wants it to be
+    assert auth.client_ip(request_from('203.0.113.7', '198.51.100.1')) == '203.0.113.7'
+    # Through the ingress: the hop it appended, not the one the client made up
+    assert auth.client_ip(request_from('10.0.0.2', '198.51.100.1, 203.0.113.7')) == '203.0.113.7'
+    assert auth.client_ip(request_from('10.0.0.2', '198.51.100.1', '203.0.113.7, 10.0.0.3')) == '203.0.113.7'
+    assert auth.client_ip(request_from('10.0.0.2')) == '10.0.0.2'
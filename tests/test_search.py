@@ -0,0 +1,49 @@
+"""Turkish folding and prefix queries for shipment search."""
+import re
+
+import pytest
+
+from search import fold, search_terms, query_words, prefix_filter
+
+
+@pytest.mark.parametrize("text", ["ŞİŞECAM", "Şişecam", "şişecam", "SISECAM", "sisecam"])
+def test_fold_is_case_and_diacritic_insensitive(text):
+    assert fold(text) == "sisecam"
+
+
+def test_fold_turkish_i():
+    assert fold("IĞDIR") == fold("Iğdır") == "igdir"
+    assert fold("İzmir") == "izmir"
+
+
+def test_search_terms_cover_words_and_compact_values():
+    terms = search_terms({'alici_firma': 'Özgür Ambalaj A.Ş.', 'irsaliye_no': 'A-1024', 'arac_plaka': '34 ABC 123'})
+
+    assert {'ozgur', 'ambalaj', 'a1024', '34', 'abc', '123', '34abc123'} <= set(terms)
+
+
+def test_search_terms_tolerate_missing_fields():
+    assert search_terms({'alici_firma': 'Cam'}) == ['cam']
+
+
+def matches(query, ship):
+    terms = search_terms(ship)
+    conditions = prefix_filter(query_words(query))
+    patterns = [c['arama'] for c in conditions.get('$and', [conditions])]
+    return all(any(re.match(p, term) for term in terms) for p in patterns)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("şişe", True),
+    ("SISE cam", False),
+    ("şişecam", True),
+    ("34 abc", True),
+    ("34abc", True),
+    ("35", False),
+    ("a.1024", False),
+    ("a-1024", False),
+    ("a1024", True),
+])
+def test_prefix_filter(query, expected):
+    ship = {'alici_firma': 'ŞİŞECAM A.Ş.', 'irsaliye_no': 'A1024', 'arac_plaka': '34 ABC 123'}
+    assert matches(query, ship) is expected
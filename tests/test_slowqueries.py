@@ -0,0 +1,79 @@
+"""Slow query capture: shapes, plan summaries and the listener threshold."""
+import asyncio
+from types import SimpleNamespace
+
+import slowqueries
+from slowqueries import SlowQueryListener, SlowQueryRecorder, command_shape, plan_summary, request_scope
+
+
+def test_same_query_with_other_values_has_one_shape():
+    first = command_shape("find", {"find": "shipments", "filter": {"arama": {"$regex": "^ozg"}}, "limit": 10})
+    second = command_shape("find", {"find": "shipments", "filter": {"arama": {"$regex": "^abc"}}, "limit": 50})
+
+    assert first == second == {
+        "command": "find", "collection": "shipments", "filter": {"arama": {"$regex": "str"}}, "sort": None
+    }
+
+
+def test_plan_summary_for_find_and_aggregate():
+    find_explain = {"queryPlanner": {
+        "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "arama_1"}},
+        "rejectedPlans": [{}]
+    }}
+    aggregate_explain = {"stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}, "rejectedPlans": []}}},
+        {"$group": {}}
+    ]}
+
+    assert plan_summary(find_explain) == {
+        "stages": ["FETCH", "IXSCAN"], "indexes": ["arama_1"], "collscan": False, "rejected_plans": 1
+    }
+    assert plan_summary(aggregate_explain)["collscan"] is True
+
+
+def test_listener_records_only_slow_commands_with_their_route():
+    async def scenario():
+        listener = SlowQueryListener(threshold_ms=100)
+        queue = asyncio.Queue()
+        listener.attach(asyncio.get_running_loop(), queue)
+        request_scope.set({
+            "method": "GET", "path": "/api/stock/x", "route": SimpleNamespace(path="/api/stock"),
+            "state": {"request_id": "req-1"}
+        })
+        for request_id, duration_ms in enumerate([250, 20]):
+            event = SimpleNamespace(
+                command_name="find", command={"find": "productions", "filter": {}, "$db": "sar", "lsid": {}},
+                connection_id=("localhost", 27017), request_id=request_id, database_name="sar",
+                duration_micros=duration_ms * 1000
+            )
+            listener.started(event)
+            listener.succeeded(event)
+        await asyncio.sleep(0)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    [(record, command)] = asyncio.run(scenario())
+
+    assert record["duration_ms"] == 250
+    assert record["route"] == "GET /api/stock" and record["request_id"] == "req-1"
+    # Session and routing fields never reach explain
+    assert command == {"find": "productions", "filter": {}}
+
+
+def test_plan_cache_keeps_the_most_recently_used_shapes(monkeypatch):
+    monkeypatch.setattr(slowqueries, "PLAN_CACHE_SIZE", 2)
+    explained = []
+
+    async def command(explain):
+        explained.append(explain["explain"]["find"])
+        return {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+    recorder = SlowQueryRecorder(SimpleNamespace(command=command), SlowQueryListener(100), 1024)
+
+    async def scenario():
+        for collection in ["productions", "shipments", "productions", "cut_products", "productions", "shipments"]:
+            await recorder._plan(collection, {"find": collection})
+
+    asyncio.run(scenario())
+
+    # shipments was the least recently used when cut_products came in
+    assert explained == ["productions", "shipments", "cut_products", "shipments"]
+    assert list(recorder._plans) == ["productions", "shipments"]
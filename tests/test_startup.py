@@ -0,0 +1,56 @@
+"""Import and startup time budget for a fresh worker."""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent / 'backend'
+BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', '2.0'))
+
+# Only loaded by the endpoints that need them
+HEAVY_MODULES = ['pandas', 'numpy', 'boto3', 'passlib', 'stock_vectorized', 'xlsxwriter']
+
+MEASURE = '''
+import json, sys, time
+start = time.perf_counter()
+import server
+imported = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+
+started = None
+if {with_startup!r}:
+    from fastapi.testclient import TestClient
+    from mongomock_motor import AsyncMongoMockClient
+    import database
+    database.use_database(AsyncMongoMockClient()['startup_check'])
+    start = time.perf_counter()
+    with TestClient(server.create_app()):
+        started = time.perf_counter() - start
+print(json.dumps({{"imported": imported, "started": started, "heavy": heavy}}))
+'''
+
+
+def measure(with_startup: bool) -> dict:
+    env = {**os.environ, 'MONGO_URL': 'mongodb://localhost:27017', 'DB_NAME': 'startup_check'}
+    script = MEASURE.format(heavy=HEAVY_MODULES, with_startup=with_startup)
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_within_budget_without_heavy_dependencies():
+    result = measure(with_startup=False)
+
+    assert result['heavy'] == []
+    assert result['imported'] < BUDGET_SECONDS
+
+
+def test_import_plus_startup_within_budget():
+    result = measure(with_startup=True)
+
+    # Startup on an empty database includes creating the admin user (one bcrypt hash)
+    assert result['imported'] + result['started'] < BUDGET_SECONDS
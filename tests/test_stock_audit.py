@@ -0,0 +1,75 @@
+"""Offline recomputation from dumps matches compute_stock over the same history."""
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+bson = pytest.importorskip('bson')
+
+from stock import compute_stock  # noqa: E402
+from stock_audit import diff_against, find_dumps, recompute  # noqa: E402
+from stock_vectorized import generate_movements  # noqa: E402
+
+COLLECTIONS = ["productions", "shipments", "cut_products"]
+
+
+def write_dump(directory: Path, name: str, docs: list, fmt: str):
+    if fmt == 'bson':
+        (directory / f"{name}.bson").write_bytes(b"".join(bson.encode(doc) for doc in docs))
+    else:
+        lines = "".join(json.dumps(doc, ensure_ascii=False) + "\n" for doc in docs).encode()
+        (directory / f"{name}.json.gz").write_bytes(gzip.compress(lines))
+
+
+@pytest.mark.parametrize('seed,fmt', [(0, 'bson'), (1, 'json'), (2, 'bson')])
+def test_recompute_matches_reference(tmp_path, seed, fmt):
+    movements = generate_movements(4000, seed=seed)
+    for name, docs in zip(COLLECTIONS, movements):
+        # Part of the history sits in an archive year, replayed first
+        split = len(docs) // 3
+        write_dump(tmp_path, f"{name}_archive_2024", docs[:split], fmt)
+        write_dump(tmp_path, name, docs[split:], fmt)
+
+    # Small chunks so SKUs are first seen, and tolerance matches resolved, across chunks
+    recomputed = recompute(find_dumps([str(tmp_path)]), workers=2, chunk_bytes=16 * 1024)
+    expected = compute_stock(*movements)
+
+    assert recomputed == expected
+    assert list(recomputed) == list(expected)
+
+
+def test_tolerance_match_follows_first_cut_sku(tmp_path):
+    cut_products = [
+        {'kesim_kalinlik': 2, 'kesim_en': 50, 'kesim_boy': 100.8, 'kesim_adet': 10,
+         'kesim_renk_kategori': 'Renkli', 'kesim_renk': 'Mavi'},
+        {'kesim_kalinlik': 2, 'kesim_en': 50, 'kesim_boy': 100, 'kesim_adet': 10},
+    ]
+    shipments = [
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 100.2, 'adet': 2},
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 120, 'adet': 4},
+    ]
+    write_dump(tmp_path, "cut_products", cut_products, 'json')
+    write_dump(tmp_path, "shipments", shipments, 'json')
+
+    assert recompute(find_dumps([str(tmp_path)]), workers=1) == compute_stock([], shipments, cut_products)
+
+
+def test_diff_reports_changed_missing_and_extra_skus():
+    recomputed = compute_stock(
+        [{'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50, 'adet': 4},
+         {'kalinlik': 3, 'en': 100, 'metre': 50, 'metrekare': 50, 'adet': 1}], [], []
+    )
+    live = [
+        {**recomputed['Normal_2.0_100.0_Renksiz_Doğal'], 'toplam_adet': 3},
+        {'urun_tipi': 'Normal', 'kalinlik': 9, 'en': 9, 'boy': None, 'renk_kategori': 'Renksiz', 'renk': 'Doğal',
+         'toplam_metre': 1, 'toplam_metrekare': 1, 'toplam_adet': 1},
+    ]
+
+    differences = diff_against(recomputed, live)
+
+    assert [d['key'] for d in differences] == [
+        'Normal_2.0_100.0_Renksiz_Doğal', 'Normal_3.0_100.0_Renksiz_Doğal', 'Normal_9.0_9.0_Renksiz_Doğal'
+    ]
+    assert differences[0]['fields'] == {'toplam_adet': {'recomputed': 4, 'live': 3}}
+    assert differences[1]['live'] is None and differences[2]['recomputed'] is None
@@ -0,0 +1,67 @@
+"""Parity between the reference and vectorized stock engines."""
+import pytest
+
+from stock import compute_stock
+from stock_vectorized import compute_stock_vectorized, generate_movements
+
+
+def assert_parity(productions, shipments, cut_products):
+    expected = compute_stock(productions, shipments, cut_products)
+    actual = compute_stock_vectorized(productions, shipments, cut_products)
+    assert actual == expected
+    assert list(actual) == list(expected)
+
+
+def test_empty_history():
+    assert_parity([], [], [])
+
+
+def test_legacy_records_without_colour_or_type():
+    productions = [
+        {'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50, 'adet': 4},
+        {'kalinlik': 2.0, 'en': 100.0, 'metre': 60, 'metrekare': 60, 'adet': 3, 'renk_kategori': 'Renksiz', 'renk': 'Doğal'},
+        {'kalinlik': 2.0, 'en': 100.0, 'metre': 60, 'metrekare': 60, 'adet': 9, 'urun_tipi': 'Kesilmiş'},
+    ]
+    shipments = [{'kalinlik': 2, 'en': 100, 'metre': 50, 'adet': 2}]
+    assert_parity(productions, shipments, [])
+
+
+def test_cut_products_move_parent_rolls():
+    productions = [{'kalinlik': 1.5, 'en': 100, 'metre': 50, 'metrekare': 50, 'adet': 5, 'renk_kategori': 'Renkli', 'renk': 'Sarı'}]
+    cut_products = [
+        {'ana_kalinlik': 1.5, 'ana_en': 100, 'ana_renk_kategori': 'Renkli', 'ana_renk': 'Sarı',
+         'kesim_kalinlik': 1.5, 'kesim_en': 100, 'kesim_boy': 200, 'kesim_renk_kategori': 'Renkli', 'kesim_renk': 'Sarı',
+         'kesim_adet': 10, 'kullanilan_ana_adet': 2},
+        # Legacy cut: no colours, no parent count
+        {'ana_kalinlik': 1.5, 'ana_en': 100, 'kesim_kalinlik': 1.5, 'kesim_en': 100, 'kesim_boy': 200, 'kesim_adet': 4},
+        # Parent that was never produced
+        {'ana_kalinlik': 9, 'ana_en': 9, 'kesim_kalinlik': 9, 'kesim_en': 9, 'kesim_boy': 9, 'kesim_adet': 1, 'kullanilan_ana_adet': 1},
+        # Old format without cut dimensions
+        {'ana_kalinlik': 1.5, 'ana_en': 100, 'kullanilan_ana_adet': 1, 'ana_renk_kategori': 'Renkli', 'ana_renk': 'Sarı'},
+    ]
+    assert_parity(productions, [], cut_products)
+
+
+def test_kesilmis_shipments_within_tolerance_use_first_matching_sku():
+    cut_products = [
+        {'kesim_kalinlik': 2, 'kesim_en': 50, 'kesim_boy': 100.8, 'kesim_adet': 10, 'kesim_renk_kategori': 'Renkli', 'kesim_renk': 'Mavi'},
+        {'kesim_kalinlik': 2, 'kesim_en': 50, 'kesim_boy': 100, 'kesim_adet': 10},
+        {'kesim_kalinlik': 2, 'kesim_en': 50, 'kesim_boy': 99.5, 'kesim_adet': 10},
+    ]
+    shipments = [
+        # Exact match
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 100, 'adet': 1},
+        # No exact key: first SKU in insertion order within 1 cm wins, even across colours
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 100.2, 'adet': 2},
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 98.6, 'adet': 3},
+        # Nothing within tolerance
+        {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 120, 'adet': 4},
+        # Unknown Normal SKU is ignored
+        {'urun_tipi': 'Normal', 'kalinlik': 7, 'en': 7, 'metre': 1, 'adet': 5},
+    ]
+    assert_parity([], shipments, cut_products)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_histories(seed):
+    assert_parity(*generate_movements(5000, seed=seed))
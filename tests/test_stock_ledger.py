@@ -0,0 +1,156 @@
+"""Stock ledger: concurrent shipments, cuts and production edits never drive a SKU negative."""
+import asyncio
+import random
+
+import pytest
+from fastapi import HTTPException
+
+import database
+from ledger import resolve_shipment_stock_key
+from models import CutProductCreate, ProductionCreate, ShipmentCreate, ShipmentUpdate
+from routers import cut, production, shipment
+from stock import compute_stock
+
+ADMIN = {'username': 'admin', 'role': 'admin'}
+ROLLS_PER_SKU = 40
+
+
+class Interleaved:
+    # A collection as over the network: every call lets the other tasks run before it
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return await attr(*args, **kwargs)
+        return call
+
+
+class InterleavedDatabase:
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        return Interleaved(self._target[name])
+
+    def __getitem__(self, name):
+        return Interleaved(self._target[name])
+
+
+def roll(en: float, adet: int = ROLLS_PER_SKU) -> dict:
+    return {
+        'tarih': '2025-10-28', 'makine': 'Makine 1', 'kalinlik': 3, 'en': en, 'metre': 100, 'metrekare': en,
+        'adet': adet, 'masura_tipi': 'Karton', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+    }
+
+
+def shipment_of(en: float, adet: int = 1) -> dict:
+    return {
+        'tarih': '2025-10-28', 'alici_firma': 'Stres Test', 'urun_tipi': 'Normal', 'kalinlik': 3, 'en': en,
+        'metre': 100, 'metrekare': en, 'adet': adet, 'renk_kategori': 'Renksiz', 'renk': 'Doğal',
+        'irsaliye_no': 'STRES', 'arac_plaka': '34 STR 34', 'sofor': 'Ali', 'cikis_saati': '10:00'
+    }
+
+
+def cut_of(en: float) -> CutProductCreate:
+    return CutProductCreate(
+        tarih='2025-10-28', ana_kalinlik=3, ana_en=en, ana_metre=100, ana_metrekare=en,
+        ana_renk_kategori='Renksiz', ana_renk='Doğal', kesim_kalinlik=3, kesim_en=en, kesim_boy=150,
+        kesim_renk_kategori='Renksiz', kesim_renk='Doğal', kesim_adet=5, kullanilan_ana_adet=1
+    )
+
+
+async def outcome(write) -> int:
+    try:
+        await write
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def test_parallel_writes_never_oversell(mongo):
+    database.use_database(InterleavedDatabase(mongo))
+    widths = [300.0, 450.0, 600.0]
+
+    async def scenario():
+        produced = [await production.create_production(ProductionCreate(**roll(en)), admin_user=ADMIN)
+                    for en in widths]
+        # 3x more requests than there are rolls, interleaved across SKUs, and deletes of the productions
+        # themselves; each job is (en, rolls it takes out of stock, write)
+        jobs = [(en, 1, shipment.create_shipment(ShipmentCreate(**shipment_of(en)), admin_user=ADMIN) if i % 2 == 0
+                 else cut.create_cut_product(cut_of(en), admin_user=ADMIN))
+                for i in range(ROLLS_PER_SKU * 3) for en in widths]
+        jobs += [(prod.en, ROLLS_PER_SKU, production.delete_production(prod.id, admin_user=ADMIN)) for prod in produced]
+        random.Random(7).shuffle(jobs)
+        codes = await asyncio.gather(*(outcome(write) for _, _, write in jobs))
+
+        ledger = {doc['key']: doc['adet'] async for doc in mongo.stock_ledger.find({})}
+        history = [await mongo[name].find({}).to_list(None) for name in ('productions', 'shipments', 'cut_products')]
+        taken = {en: sum(rolls for (w, rolls, _), code in zip(jobs, codes) if w == en and code == 200) for en in widths}
+        return codes, ledger, compute_stock(*history), taken
+
+    codes, ledger, stock, taken = asyncio.run(scenario())
+
+    assert set(codes) <= {200, 400, 409}
+    assert ledger == {key: item['toplam_adet'] for key, item in stock.items()}
+    for en in widths:
+        left = ledger[f'Normal_3.0_{en}_Renksiz_Doğal']
+        assert left >= 0
+        assert left == ROLLS_PER_SKU - taken[en]
+
+
+def test_concurrent_edits_of_one_shipment_give_its_rolls_back_once(mongo):
+    database.use_database(InterleavedDatabase(mongo))
+
+    async def scenario():
+        await production.create_production(ProductionCreate(**roll(300)), admin_user=ADMIN)
+        ship = await shipment.create_shipment(ShipmentCreate(**shipment_of(300, adet=10)), admin_user=ADMIN)
+        codes = await asyncio.gather(*(
+            outcome(shipment.update_shipment(ship.id, ShipmentUpdate(adet=adet), admin_user=ADMIN)) for adet in (4, 6)
+        ))
+        ledger = {doc['key']: doc['adet'] async for doc in mongo.stock_ledger.find({})}
+        history = [await mongo[name].find({}).to_list(None) for name in ('productions', 'shipments', 'cut_products')]
+        return codes, ledger, compute_stock(*history)
+
+    codes, ledger, stock = asyncio.run(scenario())
+
+    assert sorted(codes) == [200, 409]
+    assert ledger == {key: item['toplam_adet'] for key, item in stock.items()}
+
+
+def test_production_cannot_be_undone_once_its_rolls_have_left(client):
+    created = client.post('/api/production', json=roll(500, adet=5)).json()
+    assert client.post('/api/shipment', json=shipment_of(500, adet=3)).status_code == 200
+
+    assert client.delete(f"/api/production/{created['id']}").status_code == 409
+    assert client.put(f"/api/production/{created['id']}", json={'adet': 1}).status_code == 409
+    assert client.put(f"/api/production/{created['id']}", json={'en': 550}).status_code == 409
+    assert client.get('/api/stock').json()[0]['toplam_adet'] == 2
+
+    # Shrinking by no more than is left is fine
+    assert client.put(f"/api/production/{created['id']}", json={'adet': 3}).status_code == 200
+    [stock] = client.get('/api/stock').json()
+    assert stock['toplam_adet'] == 0
+
+
+# Two cut SKUs within the 1 cm shipment tolerance, the longer one seen first
+TOLERANCE_LEDGER = {'stock_ledger': [
+    {'key': f'Kesilmiş_2.0_50.0_{boy}_Renksiz_Doğal', 'urun_tipi': 'Kesilmiş', 'kalinlik': 2.0, 'en': 50.0,
+     'boy': boy, 'renk_kategori': 'Renksiz', 'renk': 'Doğal', 'adet': 10, 'version': 0}
+    for boy in (200.5, 199.5)
+]}
+
+
+@pytest.mark.parametrize('history', [TOLERANCE_LEDGER])
+def test_tolerant_shipment_matches_the_first_sku_seen(mongo):
+    async def resolve():
+        return await resolve_shipment_stock_key(
+            {'urun_tipi': 'Kesilmiş', 'kalinlik': 2, 'en': 50, 'metre': 200}
+        )
+
+    assert asyncio.run(resolve()) == 'Kesilmiş_2.0_50.0_200.5_Renksiz_Doğal'
@@ -0,0 +1,42 @@
+"""Delta sync: a client never advances past a write that has not landed yet."""
+import asyncio
+
+from core import change_seq
+
+
+def synced_ids(body: dict) -> list:
+    return [doc['id'] for doc in body['upserts']['raw_materials']]
+
+
+def test_sync_stops_short_of_a_write_still_in_flight(client, mongo):
+    async def scenario():
+        async with change_seq() as slow:
+            # A second writer takes the next number and finishes first
+            async with change_seq() as fast:
+                await mongo.raw_materials.insert_one({'id': 'fast', 'seq': fast})
+            during = client.get('/api/sync').json()
+            await mongo.raw_materials.insert_one({'id': 'slow', 'seq': slow})
+        after = client.get('/api/sync', params={'since': during['seq']}).json()
+        return slow, during, after
+
+    slow, during, after = asyncio.run(scenario())
+
+    assert during['seq'] < slow
+    assert synced_ids(during) == []
+    assert synced_ids(after) == ['slow', 'fast']
+    assert after['seq'] == slow + 1
+
+
+def test_sync_covers_finished_writes_and_deletes(client):
+    created = client.post('/api/raw-materials', json={
+        'giris_tarihi': '2025-03-01', 'malzeme_adi': 'Petkim', 'birim': 'Kilogram', 'miktar': 100,
+        'para_birimi': 'TL', 'birim_fiyat': 2
+    }).json()
+    first = client.get('/api/sync').json()
+    assert synced_ids(first) == [created['id']]
+
+    client.delete(f"/api/raw-materials/{created['id']}")
+    second = client.get('/api/sync', params={'since': first['seq']}).json()
+    assert synced_ids(second) == []
+    assert second['deletes']['raw_materials'] == [created['id']]
+    assert second['seq'] > first['seq']
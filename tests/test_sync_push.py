@@ -0,0 +1,98 @@
+"""Offline sync push: idempotent replays and per-item results through the real handlers."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from routers import sync
+
+PRODUCTION = {
+    'tarih': '2025-01-01', 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 50, 'metrekare': 50,
+    'adet': 5, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+}
+SHIPMENT = {
+    'tarih': '2025-01-02', 'alici_firma': 'Özgür Ambalaj', 'urun_tipi': 'Normal', 'kalinlik': 2, 'en': 100,
+    'metre': 50, 'metrekare': 50, 'adet': 3, 'renk_kategori': 'Renksiz', 'renk': 'Doğal',
+    'irsaliye_no': 'A-1', 'arac_plaka': '34 ABC 123', 'sofor': 'Ali', 'cikis_saati': '08:00'
+}
+
+
+def push(client, *mutations):
+    response = client.post('/api/sync/push', json={'mutations': list(mutations)})
+    assert response.status_code == 200
+    return [(r['status'], r['replayed']) for r in response.json()['results']]
+
+
+def test_replayed_batch_applies_once(client):
+    batch = [
+        {'key': 'tablet-1-0001', 'entity': 'production', 'op': 'create', 'data': PRODUCTION},
+        {'key': 'tablet-1-0002', 'entity': 'shipment', 'op': 'create', 'data': SHIPMENT},
+        {'key': 'tablet-1-0003', 'entity': 'shipment', 'op': 'create', 'data': {**SHIPMENT, 'adet': 10}},
+    ]
+
+    assert push(client, *batch) == [(200, False), (200, False), (400, False)]
+    # The connection dropped before the response arrived; the tablet sends the same batch again
+    assert push(client, *batch) == [(200, True), (200, True), (400, False)]
+
+    assert len(client.get('/api/production').json()) == 1
+    assert client.get('/api/stock').json()[0]['toplam_adet'] == 2
+    # Pushed shipments are searchable like posted ones
+    assert client.get('/api/shipment/search', params={'q': 'ozgur'}).json()['total'] == 1
+
+
+def test_key_reused_for_other_mutation_is_rejected(client):
+    push(client, {'key': 'tablet-1-0001', 'entity': 'production', 'op': 'create', 'data': PRODUCTION})
+
+    assert push(client, {'key': 'tablet-1-0001', 'entity': 'shipment', 'op': 'create', 'data': SHIPMENT}) == [
+        (422, False)
+    ]
+
+
+def test_rejected_mutation_can_be_retried(client):
+    shipment = {'key': 'tablet-1-0005', 'entity': 'shipment', 'op': 'create', 'data': SHIPMENT}
+
+    assert push(client, shipment) == [(400, False)]
+    push(client, {'key': 'tablet-1-0006', 'entity': 'production', 'op': 'create', 'data': PRODUCTION})
+    assert push(client, shipment) == [(200, False)]
+
+
+def test_failed_mutation_is_applied_on_retry(client, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError('connection reset')
+    handler, model = sync.MUTATIONS[('production', 'create')]
+    monkeypatch.setitem(sync.MUTATIONS, ('production', 'create'), (broken, model))
+    production = {'key': 'tablet-1-0007', 'entity': 'production', 'op': 'create', 'data': PRODUCTION}
+
+    assert push(client, production) == [(500, False)]
+    monkeypatch.setitem(sync.MUTATIONS, ('production', 'create'), (handler, model))
+    assert push(client, production) == [(200, False)]
+    assert push(client, production) == [(200, True)]
+
+
+def test_retry_after_a_late_failure_does_not_write_twice(client, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError('connection reset')
+    shipment = {'key': 'tablet-1-0008', 'entity': 'shipment', 'op': 'create', 'data': SHIPMENT}
+    push(client, {'key': 'tablet-1-0009', 'entity': 'production', 'op': 'create', 'data': PRODUCTION})
+
+    # The shipment is in before the failure
+    monkeypatch.setattr(sync.shipment, 'move_dashboard', broken)
+    assert push(client, shipment) == [(500, False)]
+    monkeypatch.undo()
+    assert push(client, shipment) == [(200, False)]
+
+    assert len(client.get('/api/shipment').json()) == 1
+    assert client.get('/api/stock').json()[0]['toplam_adet'] == 2
+
+
+def test_claim_left_by_a_dead_worker_is_taken_over(client, mongo):
+    production = {'key': 'tablet-1-0010', 'entity': 'production', 'op': 'create', 'data': PRODUCTION}
+    claimed_at = datetime.now(timezone.utc)
+    claim = {'_id': 'admin:tablet-1-0010', 'entity': 'production', 'op': 'create', 'target': None, 'status': None,
+             'claimed_at': claimed_at, 'expires_at': claimed_at + timedelta(days=7)}
+    asyncio.run(mongo.idempotency_keys.insert_one(claim))
+
+    assert push(client, production) == [(409, False)]
+    asyncio.run(mongo.idempotency_keys.update_one(
+        {'_id': claim['_id']}, {'$set': {'claimed_at': claimed_at - timedelta(minutes=5)}}
+    ))
+    assert push(client, production) == [(200, False)]
+    assert len(client.get('/api/production').json()) == 1
@@ -0,0 +1,78 @@
+"""Table pages: windows of records sorted and filtered on the server."""
+import pytest
+
+from search import search_terms
+
+
+def production(i: int) -> dict:
+    return {
+        'id': f'p{i:03}', 'tarih': f'2025-01-{i % 28 + 1:02}', 'makine': f'Makine {i % 2 + 1}',
+        'kalinlik': 2, 'en': 100 + i % 3 * 50, 'metre': 50, 'metrekare': 50, 'adet': i,
+        'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal',
+        'timestamp': '2025-01-01T00:00:00+00:00'
+    }
+
+
+@pytest.fixture
+def history():
+    productions = [production(i) for i in range(120)]
+    del productions[0]['renk']  # Written before colours existed
+    shipments = [
+        {'id': 's1', 'tarih': '2025-02-01', 'alici_firma': 'Akdeniz Yapı', 'kalinlik': 2, 'en': 100, 'metre': 50,
+         'metrekare': 50, 'adet': 1, 'irsaliye_no': 'A-1', 'arac_plaka': '34 ABC 1', 'sofor': 'Ali',
+         'cikis_saati': '08:00', 'timestamp': '2025-02-01T08:00:00+00:00'},
+        {'id': 's2', 'tarih': '2025-02-02', 'alici_firma': 'Bora Ltd', 'urun_tipi': 'Kesilmiş', 'kalinlik': 2,
+         'en': 50, 'metre': 100, 'metrekare': 5, 'adet': 10, 'irsaliye_no': 'A-2', 'arac_plaka': '34 ABC 2',
+         'sofor': 'Veli', 'cikis_saati': '09:00', 'timestamp': '2025-02-02T09:00:00+00:00'},
+    ]
+    for ship in shipments:
+        ship['arama'] = search_terms(ship)
+    return {'productions': productions, 'shipments': shipments}
+
+
+def test_pages_cover_the_sorted_collection_once(client):
+    ids = []
+    for page in (1, 2, 3):
+        body = client.get('/api/production/page', params={'page': page, 'page_size': 50, 'sort': '-adet'}).json()
+        assert body['total'] == 120
+        ids += [item['id'] for item in body['items']]
+    assert ids == [f'p{i:03}' for i in range(119, -1, -1)]
+
+    last = client.get('/api/production/page', params={'page': 3, 'page_size': 50, 'sort': '-adet'}).json()
+    assert last['items'][-1]['renk'] == 'Doğal'
+
+    newest = client.get('/api/production/page', params={'page_size': 5}).json()['items']
+    assert [item['tarih'] for item in newest] == sorted((item['tarih'] for item in newest), reverse=True)
+    assert newest[0]['tarih'] == '2025-01-28'
+
+
+def test_filters_apply_before_paging(client):
+    body = client.get('/api/production/page', params={
+        'makine': 'Makine 1', 'en': 150, 'baslangic': '2025-01-10', 'bitis': '2025-01-20', 'sort': 'adet'
+    }).json()
+    expected = [
+        production(i) for i in range(120)
+        if i % 2 == 0 and i % 3 == 1 and '2025-01-10' <= production(i)['tarih'] <= '2025-01-20'
+    ]
+    assert body['total'] == len(expected) > 0
+    assert [item['id'] for item in body['items']] == [p['id'] for p in expected]
+
+    assert client.get('/api/production/page', params={'sort': 'timestamp'}).status_code == 400
+
+    found = client.get('/api/shipment/page', params={'q': 'akd'}).json()
+    assert [item['id'] for item in found['items']] == ['s1']
+    normal = client.get('/api/shipment/page', params={'urun_tipi': 'Normal'}).json()
+    assert [item['id'] for item in normal['items']] == ['s1']
+    assert client.get('/api/shipment/page').json()['total'] == 2
+
+
+def test_raw_material_page_totals_every_match(client):
+    for name, miktar in (('PETKİM LDPE', 1000), ('Petkim 2', 500), ('Estol', 100)):
+        client.post('/api/raw-materials', json={
+            'giris_tarihi': '2025-03-01', 'malzeme_adi': name, 'birim': 'Kilogram', 'miktar': miktar,
+            'para_birimi': 'TL', 'birim_fiyat': 2
+        })
+    body = client.get('/api/raw-materials/page', params={'malzeme': 'petk', 'page_size': 1}).json()
+    assert body['total'] == 2
+    assert len(body['items']) == 1
+    assert body['toplam_tl'] == 3000
@@ -0,0 +1,72 @@
+"""Request tracing: sampled waterfalls, Mongo spans and the OTLP export."""
+from types import SimpleNamespace
+
+
+def test_forced_trace_is_a_waterfall(client):
+    client.get('/api/production', headers={'X-Trace': '1', 'X-Request-ID': 'req-42'})
+
+    trace = client.get('/api/debug/traces').json()[0]
+    assert (trace['method'], trace['route'], trace['status'], trace['request_id']) == \
+        ('GET', '/api/production', 200, 'req-42')
+    spans = {span['name']: span for span in trace['spans']}
+    assert spans['request']['depth'] == 0
+    assert spans['validate']['depth'] == 1
+    assert spans['auth.get_current_user']['depth'] == 2
+    assert spans['endpoint']['depth'] == 1 and spans['serialize']['depth'] == 1
+    assert client.get(f"/api/debug/traces/{trace['trace_id']}").json() == trace
+
+
+def test_unsampled_requests_leave_no_trace(client, monkeypatch):
+    import random
+    from tracing import trace_buffer, span
+
+    monkeypatch.setattr(random, 'random', lambda: 0.5)
+    before = len(trace_buffer._traces)
+    client.get('/api/production')
+    assert len(trace_buffer._traces) == before
+    with span('outside a request') as s:
+        assert s is None
+
+
+def test_otlp_export(client):
+    client.get('/api/stock', headers={'X-Trace': '1'})
+
+    response = client.get('/api/debug/traces/otlp')
+    assert 'attachment' in response.headers['content-disposition']
+    spans = response.json()['resourceSpans'][0]['scopeSpans'][0]['spans']
+    root = next(s for s in spans if 'parentSpanId' not in s)
+    assert root['name'] == 'GET /api/stock' and len(root['traceId']) == 32 and len(root['spanId']) == 16
+    assert {'key': 'http.status_code', 'value': {'intValue': '200'}} in root['attributes']
+    assert all(int(s['endTimeUnixNano']) >= int(s['startTimeUnixNano']) for s in spans)
+
+
+def test_mongo_commands_become_child_spans():
+    from tracing import Trace, span, tracing_listener, _current_trace
+
+    trace = Trace('GET', '/api/stock', None)
+    token = _current_trace.set(trace)
+    try:
+        with span('endpoint'):
+            event = SimpleNamespace(command_name='find', command={'find': 'productions'},
+                                    connection_id=('db', 27017), request_id=7, duration_micros=1500)
+            tracing_listener.started(event)
+            tracing_listener.succeeded(event)
+    finally:
+        _current_trace.reset(token)
+
+    endpoint, find = trace.spans
+    assert find.parent_id == endpoint.span_id
+    assert find.attributes == {'db.collection': 'productions'}
+    assert find.end - find.start == 1_500_000
+
+
+def test_fastapi_still_calls_the_wrapped_functions_by_name():
+    # instrument_routing() patches private fastapi.routing functions; a FastAPI upgrade must re-check them
+    from pathlib import Path
+
+    import fastapi
+    from tracing import routing_hooks_available
+
+    requirements = Path(__file__).resolve().parent.parent / 'backend' / 'requirements.txt'
+    assert f'fastapi=={fastapi.__version__}' in requirements.read_text().split()
+    assert routing_hooks_available()
@@ -0,0 +1,67 @@
+"""Unit cost: consumption priced at the moving purchase average, rolled up per day and machine."""
+import pytest
+
+DAY = '2025-03-10'
+
+
+def purchase(client, kg, price, name='Petkim LDPE'):
+    return client.post('/api/raw-materials', json={
+        'giris_tarihi': DAY, 'malzeme_adi': name, 'birim': 'Kilogram', 'miktar': kg,
+        'para_birimi': 'TL', 'birim_fiyat': price
+    }).json()
+
+def consume(client, petkim_kg, fire_kg=0):
+    return client.post('/api/daily-consumption', json={
+        'tarih': DAY, 'makine': 'Makine 1', 'petkim_kg': petkim_kg, 'fire_kg': fire_kg
+    }).json()
+
+def report(client):
+    response = client.get('/api/reports/unit-cost', params={'baslangic': DAY, 'bitis': DAY})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_costs_follow_purchases_and_consumption(client):
+    purchase(client, 1000, 50)
+    first = consume(client, 80, 20)
+    client.post('/api/production', json={
+        'tarih': DAY, 'makine': 'Makine 1', 'kalinlik': 2, 'en': 100, 'metre': 100, 'metrekare': 200,
+        'adet': 2, 'masura_tipi': 'Masura 100', 'renk_kategori': 'Renksiz', 'renk': 'Doğal'
+    })
+
+    day = report(client)['gunler'][0]
+    assert (day['metrekare'], day['petkim_kg'], day['maliyet_tl'], day['m2_maliyet_tl']) == (200, 100, 5000, 25)
+
+    # The average moves to 60 TL/kg; what was already booked keeps its price
+    purchase(client, 1000, 70)
+    consume(client, 50)
+    result = report(client)
+    assert result['gunler'][0]['maliyet_tl'] == 5000 + 3000
+    assert {'malzeme': 'petkim', 'kg_fiyat_tl': 60} in result['birim_fiyatlar']
+
+    client.delete(f"/api/daily-consumption/{first['id']}")
+    result = report(client)
+    assert result['toplam_maliyet_tl'] == 3000 and result['m2_maliyet_tl'] == 15
+
+
+HISTORY = {
+    'raw_materials': [
+        {'id': 'r1', 'giris_tarihi': '2025-01-01', 'malzeme_adi': 'PETKİM', 'birim': 'Kilogram',
+         'miktar': 100, 'tl_tutar': 1000},
+        {'id': 'r2', 'giris_tarihi': '2025-01-03', 'malzeme_adi': 'PETKİM', 'birim': 'Kilogram',
+         'miktar': 100, 'tl_tutar': 3000},
+    ],
+    'daily_consumptions': [
+        {'id': f'c{i}', 'tarih': tarih, 'makine': 'Makine 1', 'petkim_kg': 10, 'fire_kg': 0,
+         'toplam_petkim_tuketim': 10, 'toplam_estol_tuketim': 0.3, 'toplam_talk_tuketim': 0.15,
+         'timestamp': f'{tarih}T08:00:00+00:00'}
+        for i, tarih in enumerate(['2025-01-02', '2025-01-04'])
+    ],
+}
+
+
+@pytest.mark.parametrize('history', [HISTORY])
+def test_history_is_priced_in_date_order(client):
+    response = client.get('/api/reports/unit-cost', params={'baslangic': '2025-01-01', 'bitis': '2025-01-31'})
+    costs = [day['maliyet_tl'] for day in response.json()['gunler']]
+    assert costs == [100, 200]  # 10 TL/kg before the second purchase, 20 TL/kg after